@@ -0,0 +1,123 @@
+import os
+import time
+import hashlib
+import sqlite3
+import threading
+
+# Cache location and size budget, overridable from the environment
+CACHE_DIR = os.environ.get("SCRAPER_AUDIO_CACHE_DIR", os.path.join("cache", "audio"))
+MAX_BYTES = int(os.environ.get("SCRAPER_AUDIO_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+
+def make_key(content_hash, prompt, voice, tts_model, llm_model):
+    """
+    Returns the content-addressed key of a speech: the hash of the page
+    content, the prompt, and the voice and models that produced it.
+    """
+    payload = "\n".join([content_hash, prompt, voice, tts_model, llm_model])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class AudioCache:
+    """
+    Cache of synthesized speech. Each entry is an MP3 file named after its
+    key, indexed in SQLite with the answer it reads out. Files are only
+    ever moved in whole, so readers never see a partial file. Entries
+    beyond `max_bytes` are evicted, least recently used first.
+    """
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(directory, "index.db"), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute('''CREATE TABLE IF NOT EXISTS speeches (
+                                key TEXT PRIMARY KEY,
+                                answer TEXT,
+                                size INTEGER,
+                                created REAL,
+                                used REAL
+                            )''')
+        self._conn.execute("CREATE INDEX IF NOT EXISTS speeches_used ON speeches (used)")
+        self._conn.commit()
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.mp3")
+
+    def get(self, key):
+        """Returns the (audio path, answer) of a cached speech, or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT answer FROM speeches WHERE key = ?", (key,)).fetchone()
+            if row is not None and not os.path.exists(self.path(key)):
+                # The file was removed behind our back
+                self._conn.execute("DELETE FROM speeches WHERE key = ?", (key,))
+                self._conn.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute("UPDATE speeches SET used = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        return self.path(key), row[0]
+
+    def put(self, key, audio_path, answer):
+        """
+        Moves a finished audio file into the cache under `key`.
+        Returns the path of the cached file.
+        """
+        target = self.path(key)
+        size = os.path.getsize(audio_path)
+        with self._lock:
+            os.replace(audio_path, target)
+            now = time.time()
+            self._conn.execute(
+                '''INSERT OR REPLACE INTO speeches (key, answer, size, created, used)
+                   VALUES (?, ?, ?, ?, ?)''',
+                (key, answer, size, now, now)
+            )
+            self._evict(keep=key)
+            self._conn.commit()
+        return target
+
+    def _evict(self, keep):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM speeches").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        stale = []
+        for key, size in self._conn.execute("SELECT key, size FROM speeches ORDER BY used"):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            stale.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM speeches WHERE key = ?", stale)
+        for (key,) in stale:
+            try:
+                os.remove(self.path(key))
+            except FileNotFoundError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM speeches").fetchone()
+        return {"entries": entries, "bytes": size, "hits": self.hits, "misses": self.misses}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_audio_cache():
+    """Returns the process-wide audio cache."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = AudioCache()
+        return _cache
@@ -0,0 +1,169 @@
+"""
+Batch scraping: runs many scrapes concurrently and streams every result
+to a JSONL file as soon as it completes.
+
+Usage:
+    python batch.py urls.txt --provider DeepAI --api-key KEY -o results.jsonl
+
+The input is either a plain list of URLs (one per line) or a JSONL file with
+one object per line, e.g. {"request_id": "1", "url": "...", "prompt": "..."}.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+from providers import PROVIDER_URLS
+
+DEFAULT_CONCURRENCY = 20
+DEFAULT_PER_HOST = 4
+
+
+def _parse_entry(line):
+    """Returns the entry of one input line, or raises ValueError saying what is wrong with it."""
+    if line.startswith("{"):
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"invalid JSON ({e.msg})") from None
+        if not isinstance(entry, dict):
+            raise ValueError("not a JSON object")
+    else:
+        entry = {"url": line}
+    url = entry.get("url")
+    if not isinstance(url, str) or not url.strip():
+        raise ValueError("no \"url\"")
+    parts = urlsplit(url.strip())
+    if parts.scheme not in ("http", "https") or not parts.netloc:
+        raise ValueError(f"not an http(s) URL: {url[:80]}")
+    return entry
+
+
+def parse_jobs(lines, prompt="", schema=None, provider=None, errors=None):
+    """
+    Parses URL list or JSONL lines into scrape jobs.
+        Arguments:
+        - lines (iterable of str): input lines
+        - prompt, schema, provider: defaults for entries that do not set them
+        - errors (list): when given, invalid lines are skipped and described
+          here as "line N: reason"; otherwise the first one raises ValueError
+        Return:
+        - generator of job dicts with request_id, url, prompt, schema and provider
+    """
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            entry = _parse_entry(line)
+        except ValueError as e:
+            if errors is None:
+                raise ValueError(f"line {number}: {e}") from None
+            errors.append(f"line {number}: {e}")
+            continue
+        yield {
+            "request_id": str(entry.get("request_id", number)),
+            "url": entry["url"].strip(),
+            "prompt": entry.get("prompt", prompt),
+            "schema": entry.get("schema", schema),
+            "provider": entry.get("provider", provider)
+        }
+
+
+def load_jobs(path, errors=None, **defaults):
+    """Reads scrape jobs from a URL list or JSONL file, see `parse_jobs`."""
+    with open(path, encoding="utf-8") as f:
+        return list(parse_jobs(f, errors=errors, **defaults))
+
+
+async def run_batch(jobs, output_path, credentials, concurrency=DEFAULT_CONCURRENCY,
+                    per_host=DEFAULT_PER_HOST, on_result=None):
+    """
+    Runs scrape jobs concurrently and appends each result to a JSONL file.
+        Arguments:
+        - jobs (list of dict): jobs as returned by `parse_jobs`
+        - output_path (str): JSONL file the results are streamed to
+        - credentials (dict): provider name -> (api_key, api_id)
+        - concurrency (int): maximum number of scrapes in flight
+        - per_host (int): maximum number of scrapes in flight per host
+        - on_result (callable): optional callback invoked with each record
+        Return:
+        - summary (dict): number of jobs, failures and total duration
+    """
+    # Imported here so the UI can render the batch form without loading aiohttp
+    from scraper import run_scraper_async
+
+    global_limit = asyncio.Semaphore(concurrency)
+    host_limits = defaultdict(lambda: asyncio.Semaphore(per_host))
+
+    async def run_job(job):
+        api_key, api_id = credentials.get(job["provider"], (None, None))
+        host = urlsplit(job["url"]).netloc.lower()
+        # Wait for the host slot first so queued jobs for a busy host
+        # do not hold global slots other hosts could use
+        async with host_limits[host], global_limit:
+            start_time = time.perf_counter()
+            result = await run_scraper_async(
+                job["url"], job["prompt"], job["provider"], api_key, api_id, job["schema"]
+            )
+            return {
+                "request_id": job["request_id"],
+                "url": job["url"],
+                "duration": round(time.perf_counter() - start_time, 3),
+                "result": result
+            }
+
+    start_time = time.perf_counter()
+    failed = 0
+    with open(output_path, "a", encoding="utf-8") as f:
+        for completed in asyncio.as_completed([run_job(job) for job in jobs]):
+            record = await completed
+            if "error" in record["result"]:
+                failed += 1
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            if on_result is not None:
+                on_result(record)
+
+    return {
+        "jobs": len(jobs),
+        "failed": failed,
+        "duration": round(time.perf_counter() - start_time, 3)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape many URLs concurrently.")
+    parser.add_argument("input", help="URL list or JSONL file")
+    parser.add_argument("-o", "--output", default="batch_results.jsonl", help="JSONL output file")
+    parser.add_argument("--provider", choices=list(PROVIDER_URLS.keys()), default="DeepAI")
+    parser.add_argument("--api-key", default=os.environ.get("SCRAPER_API_KEY"))
+    parser.add_argument("--api-id", default=os.environ.get("SCRAPER_API_ID"))
+    parser.add_argument("--prompt", default="", help="prompt for entries without one")
+    parser.add_argument("--schema", default=None, help="schema for entries without one")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--per-host", type=int, default=DEFAULT_PER_HOST)
+    args = parser.parse_args(argv)
+
+    import http_session
+
+    errors = []
+    jobs = load_jobs(args.input, errors=errors, prompt=args.prompt, schema=args.schema, provider=args.provider)
+    for error in errors:
+        print(f"Skipped {error}", file=sys.stderr)
+    credentials = {args.provider: (args.api_key, args.api_id)}
+    summary = http_session.run(run_batch(
+        jobs, args.output, credentials,
+        concurrency=args.concurrency,
+        per_host=args.per_host
+    ))
+    print(json.dumps(summary))
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
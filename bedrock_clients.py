@@ -0,0 +1,82 @@
+import os
+import hashlib
+import threading
+
+# Connection pool per client, shared by parallel embedding and generation calls
+MAX_POOL_CONNECTIONS = int(os.environ.get("BEDROCK_MAX_POOL_CONNECTIONS", 50))
+MAX_ATTEMPTS = int(os.environ.get("BEDROCK_MAX_ATTEMPTS", 5))
+CONNECT_TIMEOUT = float(os.environ.get("BEDROCK_CONNECT_TIMEOUT", 5))
+READ_TIMEOUT = float(os.environ.get("BEDROCK_READ_TIMEOUT", 120))
+# Points the clients at a stand-in, e.g. benchmarks/mock_bedrock.py
+ENDPOINT_URL = os.environ.get("BEDROCK_ENDPOINT_URL") or None
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def credentials_identity(aws_access_key_id=None, aws_secret_access_key=None, aws_session_token=None):
+    """
+    Returns a fingerprint of a set of credentials, so clients can be told
+    apart without keeping the secrets in the registry keys. Empty values
+    mean the default credential chain.
+    """
+    if not (aws_access_key_id or aws_secret_access_key or aws_session_token):
+        return "default"
+    payload = "\0".join([aws_access_key_id or "", aws_secret_access_key or "", aws_session_token or ""])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def client_config():
+    """botocore settings of the pooled clients."""
+    # Imported here so pages can render without loading botocore
+    from botocore.config import Config
+    return Config(
+        max_pool_connections=MAX_POOL_CONNECTIONS,
+        retries={"mode": "adaptive", "max_attempts": MAX_ATTEMPTS},
+        tcp_keepalive=True,
+        connect_timeout=CONNECT_TIMEOUT,
+        read_timeout=READ_TIMEOUT
+    )
+
+
+def get_bedrock_client(region_name, aws_access_key_id=None, aws_secret_access_key=None,
+                       aws_session_token=None, endpoint_url=None):
+    """
+    Returns the process-wide bedrock-runtime client of a region and set of
+    credentials, creating it on first use.
+        Arguments:
+        - region_name (str): AWS region
+        - aws_access_key_id, aws_secret_access_key, aws_session_token (str):
+          optional credentials, the default chain is used when omitted
+        - endpoint_url (str): optional endpoint override, BEDROCK_ENDPOINT_URL by default
+        Return:
+        - client: boto3 bedrock-runtime client, safe to share across threads
+    """
+    endpoint_url = endpoint_url or ENDPOINT_URL
+    identity = credentials_identity(aws_access_key_id, aws_secret_access_key, aws_session_token)
+    key = (region_name, identity, endpoint_url)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            import boto3
+            session = boto3.Session(
+                aws_access_key_id=aws_access_key_id or None,
+                aws_secret_access_key=aws_secret_access_key or None,
+                aws_session_token=aws_session_token or None,
+                region_name=region_name
+            )
+            client = session.client(
+                "bedrock-runtime",
+                config=client_config(),
+                endpoint_url=endpoint_url
+            )
+            _clients[key] = client
+        return client
+
+
+def clear_clients():
+    """Closes and forgets every pooled client, e.g. after credentials were revoked."""
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
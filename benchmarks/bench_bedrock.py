@@ -0,0 +1,110 @@
+"""
+Compares a pooled bedrock-runtime client with one client per call.
+
+Usage:
+    python benchmarks/bench_bedrock.py --calls 200 --threads 16 --latency-ms 20
+
+Runs against the local stand-in of mock_bedrock.py, so no AWS account is
+needed. Each mode sends the same mix of embedding and generation calls from
+a thread pool and reports the wall time, per-call percentiles and how many
+TCP connections the stand-in accepted.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import bedrock_clients
+from timings import percentiles
+from mock_bedrock import start_server
+
+EMBED_MODEL = "amazon.titan-embed-text-v1"
+TEXT_MODEL = "anthropic.claude-3-haiku-20240307-v1:0"
+REGION = "us-east-1"
+# The stand-in does not check signatures
+CREDENTIALS = {"aws_access_key_id": "mock", "aws_secret_access_key": "mock"}
+
+
+def call(client, number):
+    start_time = time.perf_counter()
+    if number % 2:
+        body = {"inputText": f"chunk {number}"}
+        model = EMBED_MODEL
+    else:
+        body = {
+            "anthropic_version": "bedrock-2023-05-31",
+            "max_tokens": 64,
+            "messages": [{"role": "user", "content": f"question {number}"}]
+        }
+        model = TEXT_MODEL
+    response = client.invoke_model(modelId=model, body=json.dumps(body))
+    json.loads(response["body"].read())
+    return time.perf_counter() - start_time
+
+
+def pooled_client(endpoint):
+    return bedrock_clients.get_bedrock_client(REGION, endpoint_url=endpoint, **CREDENTIALS)
+
+
+def fresh_client(endpoint):
+    import boto3
+    session = boto3.Session(region_name=REGION, **CREDENTIALS)
+    return session.client("bedrock-runtime", endpoint_url=endpoint)
+
+
+def run_mode(server, make_client, calls, threads):
+    server.stats.update(connections=0, requests=0)
+
+    def job(number):
+        return call(make_client(server.url), number)
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(threads) as executor:
+        durations = list(executor.map(job, range(calls)))
+    wall = time.perf_counter() - start_time
+    p50, p95, p99 = percentiles(durations)
+    return {
+        "wall_s": round(wall, 3),
+        "calls_per_s": round(calls / wall, 1),
+        "p50_ms": round(p50 * 1000, 1),
+        "p95_ms": round(p95 * 1000, 1),
+        "p99_ms": round(p99 * 1000, 1),
+        "connections": server.stats["connections"]
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark pooled Bedrock clients against a local stand-in.")
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    args = parser.parse_args(argv)
+
+    server = start_server(latency_ms=args.latency_ms)
+    # Warm up boto3's model loading so neither mode pays for it
+    call(fresh_client(server.url), 0)
+
+    results = {
+        "per_call_client": run_mode(server, fresh_client, args.calls, args.threads),
+        "pooled_client": run_mode(server, pooled_client, args.calls, args.threads)
+    }
+    for mode, result in results.items():
+        print(
+            f"{mode}: {result['wall_s']:.2f}s, {result['calls_per_s']} calls/s, "
+            f"p50 {result['p50_ms']} ms, p95 {result['p95_ms']} ms, "
+            f"{result['connections']} connections"
+        )
+    # The same client must come back for the same region and credentials
+    assert pooled_client(server.url) is pooled_client(server.url)
+    server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
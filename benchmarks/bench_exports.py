@@ -0,0 +1,91 @@
+"""
+Compares the streaming exporters with the former up-front pandas export.
+
+Usage:
+    python benchmarks/bench_exports.py --rows 20000
+
+Writes a synthetic batch output of nested scrape records to a temporary
+JSONL file, then exports it in every format: the old way (load every
+record, json.dumps with indent, a pandas DataFrame and a full CSV string)
+and with exporters.export reading the file line by line. Reports the time,
+the peak Python memory (tracemalloc, in a second run) and the export size.
+"""
+import os
+import io
+import sys
+import json
+import time
+import tempfile
+import argparse
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import exporters
+
+
+def make_record(number):
+    return {
+        "request_id": number,
+        "url": f"https://example.com/page/{number}",
+        "ok": number % 17 != 0,
+        "result": {
+            "title": f"Page {number}",
+            "length": 1000 + number,
+            "schema_data": {"h1": [f"Heading {number}"], "a": [f"link {i}" for i in range(3)]},
+            "api_result": {"summary": "Lorem ipsum dolor sit amet. " * 4, "score": number / 7}
+        }
+    }
+
+
+def old_export(path):
+    with open(path, encoding="utf-8") as f:
+        result = [json.loads(line) for line in f]
+    import pandas as pd
+    data = json.dumps(result, indent=4)
+    csv = pd.DataFrame(result).to_csv(index=False)
+    return len(data) + len(csv)
+
+
+def measure(func):
+    """Times `func`, then runs it again under tracemalloc, which slows it down, for its peak memory."""
+    start_time = time.perf_counter()
+    size = func()
+    duration = time.perf_counter() - start_time
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return duration, peak, size
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the streaming exporters.")
+    parser.add_argument("--rows", type=int, default=20000)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "batch.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            for number in range(args.rows):
+                f.write(json.dumps(make_record(number)) + "\n")
+        print(f"{args.rows} records, {os.path.getsize(path) / 1e6:.1f} MB of JSONL")
+
+        # Load pandas outside the measurement, the page would have it loaded
+        import pandas  # noqa: F401
+        duration, peak, size = measure(lambda: old_export(path))
+        print(f"json.dumps + DataFrame + CSV: {duration:.2f}s, peak {peak / 1e6:.0f} MB, {size / 1e6:.1f} MB")
+
+        for fmt in exporters.available_formats():
+            def run():
+                out = io.BytesIO()
+                exporters.export(fmt, out, records=lambda: exporters.read_jsonl(path))
+                return out.tell()
+            duration, peak, size = measure(run)
+            print(f"{fmt}: {duration:.2f}s, peak {peak / 1e6:.0f} MB (output included), {size / 1e6:.1f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
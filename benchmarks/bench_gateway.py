@@ -0,0 +1,115 @@
+"""
+Exercises the provider gateway against local provider stand-ins.
+
+Usage:
+    python benchmarks/bench_gateway.py --calls 40 --latency-ms 50
+
+Sends the same burst of provider calls through providers.call_provider in
+several scenarios of mock_providers.py: a healthy provider, one failing a
+share of its calls, one throttling with 429 and Retry-After, one slower
+than the deadline and one that is down. For each it reports how many calls
+succeeded, the requests the provider actually received, the call
+percentiles and the gateway's counters and circuit state.
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from timings import percentiles
+from mock_providers import start_server
+
+PROVIDER = "DeepAI"
+
+SCENARIOS = {
+    "healthy": {},
+    "flaky": {"error_rate": 0.3},
+    "throttled": {"throttle": 5, "retry_after": 1},
+    "slow": {"latency_ms": 3000},
+    "down": {"down": True}
+}
+
+
+async def timed_call(number):
+    from providers import call_provider
+    start_time = time.perf_counter()
+    try:
+        await call_provider(PROVIDER, f"text {number}", "https://example.com", "key")
+        error = None
+    except Exception as e:
+        error = type(e).__name__
+    return time.perf_counter() - start_time, error
+
+
+async def burst(calls):
+    return await asyncio.gather(*(timed_call(number) for number in range(calls)))
+
+
+def run_scenario(server, name, calls, latency_ms):
+    import http_session
+    import provider_gateway
+
+    behaviour = server.behaviours[PROVIDER.lower()]
+    defaults = {"latency_ms": latency_ms, "error_rate": 0.0, "throttle": 0, "retry_after": 1, "down": False, "tail_rate": 0.0}
+    for field, value in dict(defaults, **SCENARIOS[name]).items():
+        setattr(behaviour, "latency" if field == "latency_ms" else field, value / 1000 if field == "latency_ms" else value)
+    server.stats.clear()
+    # Every scenario starts with a closed circuit and a full bucket
+    provider_gateway._gateways.clear()
+
+    start_time = time.perf_counter()
+    outcomes = http_session.run(burst(calls))
+    wall = time.perf_counter() - start_time
+    durations = [duration for duration, _ in outcomes]
+    errors = {}
+    for _, error in outcomes:
+        if error:
+            errors[error] = errors.get(error, 0) + 1
+    p50, p95, p99 = percentiles(durations)
+    stats = provider_gateway.get_gateway(PROVIDER).stats()
+    return {
+        "wall_s": round(wall, 2),
+        "ok": calls - sum(errors.values()),
+        "errors": errors,
+        "sent": server.stats.get(PROVIDER.lower(), {}).get("requests", 0),
+        "p50_ms": round(p50 * 1000),
+        "p95_ms": round(p95 * 1000),
+        "p99_ms": round(p99 * 1000),
+        "retries": stats["retries"],
+        "rejected": stats["rejected"],
+        "circuit": stats["state"]
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exercise the provider gateway against local stand-ins.")
+    parser.add_argument("--calls", type=int, default=40)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS))
+    args = parser.parse_args(argv)
+
+    server = start_server(latency_ms=args.latency_ms)
+    # Set before the provider modules are imported, which read them once
+    os.environ["SCRAPER_PROVIDER_BASE_URL"] = server.url
+    os.environ.setdefault("SCRAPER_PROVIDER_QPS", "20")
+    os.environ.setdefault("SCRAPER_PROVIDER_DEADLINE", "2")
+
+    for name in args.scenario or SCENARIOS:
+        result = run_scenario(server, name, args.calls, args.latency_ms)
+        print(
+            f"{name}: {result['ok']}/{args.calls} ok in {result['wall_s']}s, "
+            f"{result['sent']} requests sent, {result['retries']} retries, "
+            f"{result['rejected']} rejected, circuit {result['circuit']}, "
+            f"p50 {result['p50_ms']} ms, p95 {result['p95_ms']} ms, errors {result['errors']}"
+        )
+    server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+"""
+Compares single-provider, fastest-of and hedged provider calls on tail latency.
+
+Usage:
+    python benchmarks/bench_hedging.py --calls 300 --tail-rate 0.05 --tail-ms 1500
+
+Runs against the stand-ins of mock_providers.py. Every provider answers
+most calls after --latency-ms and a share of them after --tail-ms. The same
+calls are made with the primary provider alone, raced against a backup, and
+hedged (the backup is only asked once the primary is slower than its
+observed p95). Reports the percentiles and how many requests each mode sent,
+which is the extra load the mode puts on the providers.
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from timings import percentiles
+from mock_providers import start_server
+
+PRIMARY = "DeepAI"
+BACKUP = "TextRazor"
+CREDENTIALS = {PRIMARY: ("key", None), BACKUP: ("key", None)}
+
+
+async def timed_call(mode, number):
+    from providers import call_provider, race_providers
+    start_time = time.perf_counter()
+    text = f"text {number}"
+    if mode == "single":
+        await call_provider(PRIMARY, text, "https://example.com", "key")
+    else:
+        await race_providers([PRIMARY, BACKUP], text, "https://example.com", CREDENTIALS, mode)
+    return time.perf_counter() - start_time
+
+
+async def sequence(mode, calls, concurrency):
+    limit = asyncio.Semaphore(concurrency)
+
+    async def run(number):
+        async with limit:
+            return await timed_call(mode, number)
+
+    return await asyncio.gather(*(run(number) for number in range(calls)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare provider modes on tail latency against local stand-ins.")
+    parser.add_argument("--calls", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--tail-rate", type=float, default=0.05)
+    parser.add_argument("--tail-ms", type=float, default=1500)
+    args = parser.parse_args(argv)
+
+    server = start_server(latency_ms=args.latency_ms, tail_rate=args.tail_rate, tail_ms=args.tail_ms)
+    # Set before the provider modules are imported, which read them once
+    os.environ["SCRAPER_PROVIDER_BASE_URL"] = server.url
+    os.environ.setdefault("SCRAPER_PROVIDER_QPS", "1000")
+    import http_session
+    import provider_gateway
+
+    for mode in ("single", "fastest", "hedged"):
+        server.stats.clear()
+        durations = http_session.run(sequence(mode, args.calls, args.concurrency))
+        p50, p95, p99 = percentiles(durations)
+        sent = sum(stats["requests"] for stats in server.stats.values())
+        print(
+            f"{mode}: p50 {p50 * 1000:.0f} ms, p95 {p95 * 1000:.0f} ms, p99 {p99 * 1000:.0f} ms, "
+            f"max {max(durations) * 1000:.0f} ms, {sent} requests for {args.calls} calls"
+        )
+    print(f"{PRIMARY} p95 seen by the gateway: {provider_gateway.get_gateway(PRIMARY).stats()['p95_ms']} ms")
+    server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
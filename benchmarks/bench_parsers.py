@@ -0,0 +1,77 @@
+"""
+Compares the HTML parsing backends on saved pages.
+
+Usage:
+    python benchmarks/bench_parsers.py page1.html page2.html --schema div,h1,img,a --repeat 5
+
+For every page it times parsing, preview text and schema extraction with each
+installed backend, next to the previous BeautifulSoup html.parser code path
+that calls find_all once per schema tag.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import html_parsing
+
+
+def legacy_parse(html, tags):
+    """The original run_scraper_async parsing: one find_all walk per tag."""
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, "html.parser")
+    soup.get_text()[:1000]
+    return {tag: [el.get_text(strip=True) for el in soup.find_all(tag)] for tag in tags}
+
+
+def backend_parse(backend):
+    def run(html, tags):
+        document = html_parsing.parse(html, backend)
+        document.text()[:1000]
+        return document.extract(tags)
+    return run
+
+
+def time_it(func, html, tags, repeat):
+    timings = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        func(html, tags)
+        timings.append(time.perf_counter() - start_time)
+    return statistics.median(timings)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the HTML parsing backends.")
+    parser.add_argument("pages", nargs="+", help="saved HTML pages")
+    parser.add_argument("--schema", default="div,h1,h2,p,a,img", help="comma-separated tags or selectors")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", dest="json_path", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    tags = [tag.strip() for tag in args.schema.split(",") if tag.strip()]
+    candidates = {"legacy (html.parser, find_all per tag)": legacy_parse}
+    for backend in html_parsing.AVAILABLE_BACKENDS:
+        candidates[f"{backend} (single pass)"] = backend_parse(backend)
+
+    results = []
+    for path in args.pages:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            html = f.read()
+        print(f"\n{os.path.basename(path)} ({len(html) / 1024:.0f} KB)")
+        for name, func in candidates.items():
+            seconds = time_it(func, html, tags, args.repeat)
+            print(f"  {name:<40} {seconds * 1000:9.2f} ms")
+            results.append({"page": path, "bytes": len(html), "candidate": name, "median_seconds": seconds})
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Startup-time budget for the Streamlit entry points.
+
+Usage:
+    python benchmarks/bench_startup.py --budget-ms 1500
+
+Every entry point is rendered headlessly with Streamlit's AppTest in a fresh
+interpreter. "cold" is the first script run of the process, including the
+imports it triggers; "warm" is a rerun, as after a widget interaction. The
+heavy dependencies loaded by the first render are listed, so an import that
+moves back to module level shows up. Exits with 1 if a cold start is over
+budget.
+"""
+import os
+import sys
+import json
+import glob
+import tempfile
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Dependencies that must not load before they are needed
+HEAVY_MODULES = ["pandas", "aiohttp", "bs4", "lxml", "selectolax", "boto3", "scrapegraphai.graphs", "langchain_core", "langchain"]
+
+# Runs inside the child interpreter
+CHILD = """
+import sys, time, json
+start_time = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+streamlit_import = time.perf_counter() - start_time
+baseline = set(sys.modules)
+
+app = AppTest.from_file({path!r}, default_timeout=120)
+start_time = time.perf_counter()
+app.run()
+cold = time.perf_counter() - start_time
+loaded = set(sys.modules) - baseline
+
+start_time = time.perf_counter()
+app.run()
+warm = time.perf_counter() - start_time
+
+print(json.dumps({{
+    "streamlit_import_ms": round(streamlit_import * 1000, 1),
+    "cold_ms": round(cold * 1000, 1),
+    "warm_ms": round(warm * 1000, 1),
+    "modules_loaded": len(loaded),
+    "heavy_modules": sorted(m for m in {heavy!r} if m in loaded),
+    "exception": [str(e.value) for e in app.exception]
+}}))
+"""
+
+
+def entry_points():
+    scripts = [os.path.join(ROOT, "main.py"), os.path.join(ROOT, "main_DeepAI_API-7.py")]
+    return scripts + sorted(glob.glob(os.path.join(ROOT, "pages", "*.py")))
+
+
+def measure(path, env):
+    completed = subprocess.run(
+        [sys.executable, "-c", CHILD.format(path=path, heavy=HEAVY_MODULES)],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        return {"error": completed.stderr.strip().splitlines()[-1:]}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure cold and warm start of the entry points.")
+    parser.add_argument("--budget-ms", type=float, default=None, help="fail if a cold start exceeds this")
+    parser.add_argument("--json", dest="json_path", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    # Pretend the playwright browsers are installed so no install is started
+    env = dict(os.environ)
+    env["PLAYWRIGHT_BROWSERS_PATH"] = tempfile.mkdtemp(prefix="bench-playwright-")
+    os.environ["PLAYWRIGHT_BROWSERS_PATH"] = env["PLAYWRIGHT_BROWSERS_PATH"]
+    import helper
+    open(helper._marker_path(), "w").close()
+    # Rendering a page must not leave a worker pool behind
+    env["SCRAPER_QUEUE_WORKERS"] = "0"
+
+    results = {}
+    over_budget = []
+    for path in entry_points():
+        name = os.path.relpath(path, ROOT)
+        result = measure(path, env)
+        results[name] = result
+        if "error" in result:
+            print(f"{name}: failed {result['error']}")
+            continue
+        print(
+            f"{name}: cold {result['cold_ms']:.0f} ms, warm {result['warm_ms']:.0f} ms, "
+            f"{result['modules_loaded']} modules, heavy: {', '.join(result['heavy_modules']) or 'none'}"
+        )
+        for exception in result["exception"]:
+            print(f"  script raised: {exception}")
+        if args.budget_ms is not None and result["cold_ms"] > args.budget_ms:
+            over_budget.append(name)
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if over_budget:
+        print(f"Over the {args.budget_ms:.0f} ms budget: {', '.join(over_budget)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
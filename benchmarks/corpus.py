@@ -0,0 +1,87 @@
+"""
+Deterministic corpus of pages for the benchmarks.
+
+Pages are generated from a seed, so every run and every commit scrapes the
+same bytes. They mimic real marketing and listing pages: a head with
+inline styles and scripts, navigation, headings, paragraphs, product cards,
+tables and a footer. "large" matches the 418 KB page behind
+scrape_result.json.
+"""
+import random
+
+# Target size in bytes of each page of the corpus
+SIZES = {
+    "small": 8 * 1024,
+    "medium": 80 * 1024,
+    "large": 418 * 1024
+}
+
+WORDS = (
+    "campaign fundraising platform donors community project goal raise support creators "
+    "share story reward backers launch crowdfunding service provider category marketing "
+    "design legal video production consulting payment secure global team start today "
+    "learn more how it works success stories pricing features contact help center"
+).split()
+
+
+def _sentence(generator, words=12):
+    text = " ".join(generator.choice(WORDS) for _ in range(words))
+    return text.capitalize() + "."
+
+
+def _section(generator, number):
+    parts = [f'<section id="s{number}"><h2>{_sentence(generator, 4)[:-1]}</h2>']
+    kind = number % 3
+    if kind == 0:
+        parts.extend(f"<p>{' '.join(_sentence(generator) for _ in range(4))}</p>" for _ in range(3))
+    elif kind == 1:
+        parts.append('<div class="cards">')
+        for card in range(6):
+            parts.append(
+                f'<div class="card"><img src="/img/{number}-{card}.jpg" alt="{_sentence(generator, 3)}">'
+                f'<h3><a href="/campaign/{number}-{card}">{_sentence(generator, 3)[:-1]}</a></h3>'
+                f'<p>{_sentence(generator, 16)}</p><span class="price">${generator.randint(5, 5000)}</span></div>'
+            )
+        parts.append("</div>")
+    else:
+        parts.append("<table><tr><th>Provider</th><th>Category</th><th>Rating</th></tr>")
+        for _ in range(8):
+            parts.append(
+                f"<tr><td>{generator.choice(WORDS).title()} {generator.choice(WORDS).title()}</td>"
+                f"<td>{generator.choice(WORDS)}</td><td>{generator.randint(1, 5)}</td></tr>"
+            )
+        parts.append("</table>")
+    parts.append("</section>")
+    return "".join(parts)
+
+
+def build_page(name, size, seed=0):
+    """Returns an HTML page of about `size` bytes, the same for the same arguments."""
+    generator = random.Random(f"{name}-{seed}")
+    head = (
+        f"<!DOCTYPE html><html lang=\"en\"><head><meta charset=\"utf-8\">"
+        f"<title>{_sentence(generator, 5)[:-1]} | Benchmark {name}</title>"
+        "<style>" + " ".join(f".c{number}{{margin:{number}px}}" for number in range(200)) + "</style>"
+        "<script>" + "var tracking=" + repr([generator.random() for _ in range(50)]) + ";</script>"
+        "</head><body><nav>" + "".join(f'<a href="/{word}">{word}</a>' for word in WORDS[:20]) + "</nav><main>"
+    )
+    foot = "</main><footer><p>" + _sentence(generator, 20) + "</p></footer></body></html>"
+    sections = []
+    length = len(head) + len(foot)
+    number = 0
+    while length < size:
+        section = _section(generator, number)
+        sections.append(section)
+        length += len(section)
+        number += 1
+    return (head + "".join(sections) + foot).encode("utf-8")
+
+
+_corpus = {}
+
+
+def get_page(name):
+    """Returns the bytes of a corpus page, built once per process."""
+    if name not in _corpus:
+        _corpus[name] = build_page(name, SIZES[name])
+    return _corpus[name]
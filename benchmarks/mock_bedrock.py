@@ -0,0 +1,124 @@
+"""
+Local stand-in for the Bedrock runtime API.
+
+Usage:
+    python benchmarks/mock_bedrock.py --port 8790 --latency-ms 50
+    BEDROCK_ENDPOINT_URL=http://127.0.0.1:8790 streamlit run main.py
+
+Answers InvokeModel for Titan embedding models and Anthropic messages
+models, and Converse for any model, after a fixed delay. Embeddings are
+derived from a hash of the input, so equal texts get equal vectors. The
+server counts the TCP connections it accepts, which shows whether clients
+reuse their connections.
+"""
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from urllib.parse import unquote
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+EMBEDDING_SIZE = 1536
+
+
+def fake_embedding(text, size=EMBEDDING_SIZE):
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+    generator = random.Random(seed)
+    return [round(generator.uniform(-1, 1), 6) for _ in range(size)]
+
+
+class BedrockHandler(BaseHTTPRequestHandler):
+    # Keep-alive, like the real endpoint
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.stats_lock:
+            self.server.stats["connections"] += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        parts = self.path.strip("/").split("/")
+        with self.server.stats_lock:
+            self.server.stats["requests"] += 1
+        if len(parts) != 3 or parts[0] != "model":
+            self._reply(404, {"message": f"Unknown operation {self.path}"})
+            return
+        model_id, operation = unquote(parts[1]), parts[2]
+        time.sleep(self.server.latency)
+
+        if operation == "invoke" and "embed" in model_id:
+            text = request.get("inputText", "")
+            self._reply(200, {
+                "embedding": fake_embedding(text),
+                "inputTextTokenCount": len(text.split())
+            })
+        elif operation == "invoke":
+            self._reply(200, {
+                "id": "msg_mock",
+                "type": "message",
+                "role": "assistant",
+                "model": model_id,
+                "content": [{"type": "text", "text": json.dumps({"content": "mock answer"})}],
+                "stop_reason": "end_turn",
+                "usage": {"input_tokens": 10, "output_tokens": 5}
+            })
+        elif operation == "converse":
+            self._reply(200, {
+                "output": {"message": {"role": "assistant", "content": [{"text": json.dumps({"content": "mock answer"})}]}},
+                "stopReason": "end_turn",
+                "usage": {"inputTokens": 10, "outputTokens": 5, "totalTokens": 15},
+                "metrics": {"latencyMs": int(self.server.latency * 1000)}
+            })
+        else:
+            self._reply(400, {"message": f"Unsupported operation {operation}"})
+
+
+def start_server(port=0, latency_ms=50):
+    """
+    Starts the stand-in on a background thread.
+    Returns the server; its `url` is the endpoint and `stats` holds the
+    number of connections and requests served.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), BedrockHandler)
+    server.daemon_threads = True
+    server.latency = latency_ms / 1000
+    server.stats = {"connections": 0, "requests": 0}
+    server.stats_lock = threading.Lock()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, name="mock-bedrock", daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a local Bedrock runtime stand-in.")
+    parser.add_argument("--port", type=int, default=8790)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    args = parser.parse_args(argv)
+    server = start_server(args.port, args.latency_ms)
+    print(f"Mock Bedrock listening on {server.url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""
+Local stand-in for an OpenAI-compatible LLM API.
+
+Usage:
+    python benchmarks/mock_llm.py --port 8793 --latency-ms 300
+
+Answers chat completions with a small JSON answer, embeddings with
+vectors derived from a hash of the input, and speech with a few bytes of
+fake MP3, each after a fixed delay. Point a graph at it with
+`base_url=http://127.0.0.1:8793/v1`. Counts the requests per endpoint.
+"""
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+EMBEDDING_SIZE = 256
+
+
+def fake_embedding(text, size=EMBEDDING_SIZE):
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+    generator = random.Random(seed)
+    return [round(generator.uniform(-1, 1), 6) for _ in range(size)]
+
+
+class LLMHandler(BaseHTTPRequestHandler):
+    # Keep-alive, like the real API
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, body, content_type="application/json"):
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        endpoint = self.path.split("?")[0].rstrip("/")
+        with self.server.stats_lock:
+            self.server.stats[endpoint] = self.server.stats.get(endpoint, 0) + 1
+        time.sleep(self.server.latency)
+
+        model = request.get("model", "mock")
+        if endpoint.endswith("/chat/completions"):
+            prompt_tokens = sum(len(str(message.get("content", "")).split()) for message in request.get("messages", []))
+            self._reply(200, {
+                "id": "chatcmpl-mock",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": json.dumps({"content": "mock answer"})},
+                    "finish_reason": "stop"
+                }],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": 5, "total_tokens": prompt_tokens + 5}
+            })
+        elif endpoint.endswith("/embeddings"):
+            inputs = request.get("input", [])
+            inputs = [inputs] if isinstance(inputs, str) else inputs
+            self._reply(200, {
+                "object": "list",
+                "data": [
+                    {"object": "embedding", "index": index, "embedding": fake_embedding(str(text))}
+                    for index, text in enumerate(inputs)
+                ],
+                "model": model,
+                "usage": {"prompt_tokens": len(inputs), "total_tokens": len(inputs)}
+            })
+        elif endpoint.endswith("/audio/speech"):
+            self._reply(200, b"ID3" + request.get("input", "").encode("utf-8")[:64], "audio/mpeg")
+        else:
+            self._reply(404, {"error": {"message": f"Unknown endpoint {endpoint}"}})
+
+
+def start_server(port=0, latency_ms=300):
+    """
+    Starts the stand-in on a background thread.
+    Returns the server; its `url` is the API base (ending in /v1) and `stats`
+    counts requests per endpoint.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), LLMHandler)
+    server.daemon_threads = True
+    server.latency = latency_ms / 1000
+    server.stats = {}
+    server.stats_lock = threading.Lock()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    threading.Thread(target=server.serve_forever, name="mock-llm", daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a local OpenAI-compatible stand-in.")
+    parser.add_argument("--port", type=int, default=8793)
+    parser.add_argument("--latency-ms", type=float, default=300)
+    args = parser.parse_args(argv)
+    server = start_server(args.port, args.latency_ms)
+    print(f"Mock LLM API on {server.url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+"""
+Local stand-ins for the summarization providers.
+
+Usage:
+    python benchmarks/mock_providers.py --port 8791 --latency-ms 100 --error-rate 0.1
+    SCRAPER_PROVIDER_BASE_URL=http://127.0.0.1:8791 streamlit run main.py
+
+Serves every provider of providers.PROVIDER_URLS under its lower-case name,
+e.g. /deepai, with a JSON answer after a delay. Each provider can be made
+to misbehave: answer a share of its calls slowly, fail a share with 503,
+throttle with 429 and a Retry-After, or be down altogether. The server counts the requests each
+provider received, which shows how many calls retries and open circuits
+let through.
+"""
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PROVIDERS = ["deepai", "meaningcloud", "diffbot", "textrazor", "aylien"]
+
+ANSWERS = {
+    "deepai": lambda text: {"output": text[:200]},
+    "meaningcloud": lambda text: {"summary": text[:200], "status": {"code": "0"}},
+    "diffbot": lambda text: {"objects": [{"text": text[:200]}]},
+    "textrazor": lambda text: {"response": {"entities": [], "topics": []}},
+    "aylien": lambda text: {"sentences": [text[:200]]}
+}
+
+
+class ProviderBehaviour:
+    """How one stand-in provider answers; change the fields at any time."""
+
+    def __init__(self, latency_ms=50, error_rate=0.0, throttle=0, retry_after=1, down=False, tail_rate=0.0,
+                 tail_ms=1000):
+        self.latency = latency_ms / 1000
+        # Share of calls that take `tail_ms` instead, a slow tail
+        self.tail_rate = tail_rate
+        self.tail = tail_ms / 1000
+        self.error_rate = error_rate
+        # Number of upcoming calls answered with 429
+        self.throttle = throttle
+        self.retry_after = retry_after
+        self.down = down
+
+
+class ProviderHandler(BaseHTTPRequestHandler):
+    # Keep-alive, like the real endpoints
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written apart, which Nagle's algorithm would delay
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _answer(self):
+        length = int(self.headers.get("Content-Length", 0))
+        text = self.rfile.read(length).decode("utf-8", "replace")
+        name = self.path.strip("/").split("?")[0].split("/")[0]
+        behaviour = self.server.behaviours.get(name)
+        if behaviour is None:
+            self._reply(404, {"error": f"Unknown provider {name}"})
+            return
+
+        with self.server.stats_lock:
+            stats = self.server.stats.setdefault(name, {"requests": 0, "ok": 0, "throttled": 0, "failed": 0})
+            stats["requests"] += 1
+            throttled = behaviour.throttle > 0
+            if throttled:
+                behaviour.throttle -= 1
+        time.sleep(behaviour.tail if random.random() < behaviour.tail_rate else behaviour.latency)
+
+        if behaviour.down or random.random() < behaviour.error_rate:
+            outcome = "failed"
+            self._reply(503, {"error": "Service unavailable"})
+        elif throttled:
+            outcome = "throttled"
+            self._reply(429, {"error": "Too many requests"}, {"Retry-After": str(behaviour.retry_after)})
+        else:
+            outcome = "ok"
+            self._reply(200, ANSWERS[name](text))
+        with self.server.stats_lock:
+            stats[outcome] += 1
+
+    do_GET = _answer
+    do_POST = _answer
+
+
+class ProviderServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients cancel calls, e.g. the losers of a race; that is not an error
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def start_server(port=0, **behaviour):
+    """
+    Starts the stand-ins on a background thread; keyword arguments are the
+    initial ProviderBehaviour of every provider.
+    Returns the server; its `url` is the base URL, `behaviours` maps provider
+    names to their ProviderBehaviour and `stats` counts requests per provider.
+    """
+    server = ProviderServer(("127.0.0.1", port), ProviderHandler)
+    server.behaviours = {name: ProviderBehaviour(**behaviour) for name in PROVIDERS}
+    server.stats = {}
+    server.stats_lock = threading.Lock()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, name="mock-providers", daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run local stand-ins of the summarization providers.")
+    parser.add_argument("--port", type=int, default=8791)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of calls answered with 503")
+    parser.add_argument("--tail-rate", type=float, default=0.0, help="Share of calls answered after --tail-ms")
+    parser.add_argument("--tail-ms", type=float, default=1000)
+    parser.add_argument("--down", action="append", default=[], choices=PROVIDERS, help="Provider answering only 503")
+    args = parser.parse_args(argv)
+    server = start_server(
+        args.port, latency_ms=args.latency_ms, error_rate=args.error_rate, tail_rate=args.tail_rate,
+        tail_ms=args.tail_ms
+    )
+    for name in args.down:
+        server.behaviours[name].down = True
+    print(f"Mock providers listening on {server.url}/<provider>")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
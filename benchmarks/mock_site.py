@@ -0,0 +1,90 @@
+"""
+Local web site serving the benchmark corpus.
+
+Usage:
+    python benchmarks/mock_site.py --port 8792 --latency-ms 20
+
+Serves every page of corpus.py under its name, e.g. /large. Anything after
+the name is ignored, so /large/3 and /large?run=2 are distinct URLs with
+the same content, which keeps caches out of a measurement. robots.txt
+allows everything. Answers after a fixed delay and counts the requests.
+"""
+import sys
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from corpus import SIZES, get_page
+
+
+class SiteHandler(BaseHTTPRequestHandler):
+    # Keep-alive, like real sites
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        name = self.path.strip("/").split("?")[0].split("/")[0]
+        with self.server.stats_lock:
+            self.server.stats["requests"] += 1
+        if name == "robots.txt":
+            body, content_type = b"User-agent: *\nAllow: /\n", "text/plain"
+        elif name in SIZES:
+            time.sleep(self.server.latency)
+            body, content_type = get_page(name), "text/html; charset=utf-8"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class SiteServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients cancel downloads, e.g. at their body limit; that is not an error
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def start_server(port=0, latency_ms=20):
+    """
+    Starts the site on a background thread.
+    Returns the server; its `url` is the base URL and `stats` counts requests.
+    """
+    # Build the pages before the first request is timed
+    for name in SIZES:
+        get_page(name)
+    server = SiteServer(("127.0.0.1", port), SiteHandler)
+    server.latency = latency_ms / 1000
+    server.stats = {"requests": 0}
+    server.stats_lock = threading.Lock()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, name="mock-site", daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the benchmark corpus locally.")
+    parser.add_argument("--port", type=int, default=8792)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    args = parser.parse_args(argv)
+    server = start_server(args.port, args.latency_ms)
+    print(f"Corpus served on {server.url}/<{'|'.join(SIZES)}>")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,296 @@
+"""
+Offline benchmark suite for the scrape paths.
+
+Usage:
+    python benchmarks/run_suite.py
+    python benchmarks/run_suite.py --concurrency 1,8,32 --requests 64 --only scraper,batch
+    python benchmarks/run_suite.py --compare benchmarks/results/<earlier run>.json
+
+Starts local stand-ins for everything the scrapers talk to: the corpus site
+of mock_site.py (small, medium and large pages), the five summarization
+providers of mock_providers.py and the OpenAI-compatible API of
+mock_llm.py, each with a configurable latency, in a child process so they
+do not compete with the measured code for the GIL. Then it measures the
+throughput and the latency percentiles of:
+- scraper: `run_scraper_async` on each page size, at each concurrency level;
+- batch: `run_batch` over a mix of the page sizes, at each concurrency level;
+- task: `task()`, the SmartScraperGraph path, given the corpus HTML so no
+  browser is involved, at each concurrency level. Skipped when
+  scrapegraphai cannot be imported.
+
+Every request uses a distinct URL and the caches live in a temporary
+directory, so nothing is served from a cache. The per-host and per-provider
+rate limits are lifted, since they would measure sleeping rather than
+code. The results, with the commit, the settings and the machine, are
+written as JSON to benchmarks/results/ (or --output), and --compare prints
+the change from an earlier result file.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import tempfile
+import subprocess
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+import mock_llm
+import mock_site
+import mock_providers
+from corpus import SIZES
+from timings import percentiles
+
+PROMPT = "List the service providers of every category"
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+SCENARIOS = ["scraper", "batch", "task"]
+# The providers of providers.PROVIDER_URLS, which is only imported once the stand-ins run
+PROVIDERS = ["DeepAI", "MeaningCloud", "Diffbot", "TextRazor", "Aylien"]
+
+
+def git_revision():
+    """Returns the current commit and whether the tree has uncommitted changes."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = bool(subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT, capture_output=True, text=True
+        ).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, dirty
+
+
+def _serve(connection, latencies):
+    """Runs the stand-ins until told to stop, in their own process so they do not share our GIL."""
+    servers = {
+        "site": mock_site.start_server(latency_ms=latencies["site"]),
+        "providers": mock_providers.start_server(latency_ms=latencies["providers"]),
+        "llm": mock_llm.start_server(latency_ms=latencies["llm"])
+    }
+    connection.send({name: server.url for name, server in servers.items()})
+    connection.recv()
+    for server in servers.values():
+        server.shutdown()
+
+
+def start_stand_ins(latencies):
+    """Starts the stand-ins in a child process. Returns their URLs and a function stopping them."""
+    connection, child_connection = multiprocessing.Pipe()
+    process = multiprocessing.Process(target=_serve, args=(child_connection, latencies), daemon=True)
+    process.start()
+    urls = connection.recv()
+
+    def stop():
+        connection.send("stop")
+        process.join(timeout=10)
+
+    return urls, stop
+
+
+def summarize(durations, wall, errors):
+    p50, p95, p99 = percentiles(durations)
+    return {
+        "requests": len(durations),
+        "errors": errors,
+        "wall_s": round(wall, 3),
+        "throughput_per_s": round(len(durations) / wall, 2) if wall else None,
+        "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+        "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+        "p99_ms": round(p99 * 1000, 1) if p99 is not None else None
+    }
+
+
+async def scrape_level(base_url, size, provider, concurrency, requests, run):
+    from scraper import run_scraper_async
+    limit = asyncio.Semaphore(concurrency)
+
+    async def scrape(number):
+        async with limit:
+            start_time = time.perf_counter()
+            result = await run_scraper_async(
+                f"{base_url}/{size}/{run}-{number}", PROMPT, provider, "key", "id", use_cache=False
+            )
+            return time.perf_counter() - start_time, "error" in result
+
+    start_time = time.perf_counter()
+    outcomes = await asyncio.gather(*(scrape(number) for number in range(requests)))
+    wall = time.perf_counter() - start_time
+    return summarize([duration for duration, _ in outcomes], wall, sum(failed for _, failed in outcomes))
+
+
+def bench_scraper(urls, levels, requests, provider):
+    import http_session
+    results = {}
+    for size in SIZES:
+        for concurrency in levels:
+            name = f"{size}/c{concurrency}"
+            results[name] = http_session.run(scrape_level(
+                urls["site"], size, provider, concurrency, requests, f"scraper-{name}"
+            ))
+            print(f"scraper {name}: {describe(results[name])}")
+    return results
+
+
+def bench_batch(urls, levels, requests, provider, directory):
+    import http_session
+    from batch import parse_jobs, run_batch
+
+    results = {}
+    sizes = list(SIZES)
+    for concurrency in levels:
+        lines = [f"{urls['site']}/{sizes[number % len(sizes)]}/batch-c{concurrency}-{number}" for number in range(requests)]
+        jobs = list(parse_jobs(lines, prompt=PROMPT, provider=provider))
+        output_path = os.path.join(directory, f"batch_c{concurrency}.jsonl")
+        records = []
+        summary = http_session.run(run_batch(
+            jobs, output_path, {provider: ("key", "id")}, concurrency=concurrency,
+            per_host=concurrency, on_result=records.append
+        ))
+        name = f"mixed/c{concurrency}"
+        results[name] = summarize([record["duration"] for record in records], summary["duration"], summary["failed"])
+        print(f"batch {name}: {describe(results[name])}")
+    return results
+
+
+def bench_task(urls, levels, requests):
+    try:
+        import scrapegraphai.graphs  # noqa: F401
+    except Exception as e:
+        print(f"task: skipped, scrapegraphai cannot be imported ({type(e).__name__}: {e})")
+        return {"skipped": f"scrapegraphai cannot be imported: {type(e).__name__}: {e}"}
+    from task import task
+    from corpus import get_page
+
+    results = {}
+    for size in SIZES:
+        html = get_page(size).decode("utf-8")
+        for concurrency in levels:
+            def run(number):
+                start_time = time.perf_counter()
+                try:
+                    # A distinct prompt per call keeps the graph's own caches out
+                    task("key", html, f"{PROMPT} ({number})", "gpt-4o-mini", base_url=urls["llm"], use_cache=False)
+                    return time.perf_counter() - start_time, False
+                except Exception:
+                    return time.perf_counter() - start_time, True
+
+            start_time = time.perf_counter()
+            with ThreadPoolExecutor(concurrency) as executor:
+                outcomes = list(executor.map(run, range(requests)))
+            wall = time.perf_counter() - start_time
+            name = f"{size}/c{concurrency}"
+            results[name] = summarize([duration for duration, _ in outcomes], wall, sum(failed for _, failed in outcomes))
+            print(f"task {name}: {describe(results[name])}")
+    return results
+
+
+def describe(result):
+    return (
+        f"{result['throughput_per_s']}/s, p50 {result['p50_ms']} ms, p95 {result['p95_ms']} ms, "
+        f"p99 {result['p99_ms']} ms, {result['errors']} errors"
+    )
+
+
+def compare(results, earlier):
+    """Prints the change of throughput and percentiles from an earlier result file."""
+    print(f"\nChange from {earlier.get('commit', '?')[:10]} to {(results.get('commit') or '?')[:10]}:")
+    for scenario, runs in results["results"].items():
+        for name, result in runs.items():
+            before = earlier.get("results", {}).get(scenario, {}).get(name)
+            if not isinstance(result, dict) or not isinstance(before, dict):
+                continue
+            changes = []
+            for metric in ("throughput_per_s", "p50_ms", "p95_ms", "p99_ms"):
+                old, new = before.get(metric), result.get(metric)
+                if old and new is not None:
+                    changes.append(f"{metric} {old} -> {new} ({(new - old) / old:+.0%})")
+            print(f"{scenario} {name}: {', '.join(changes)}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite.")
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=48, help="Requests per scenario and level")
+    parser.add_argument("--only", default=",".join(SCENARIOS), help="Comma-separated scenarios to run")
+    parser.add_argument("--provider", default="DeepAI", choices=PROVIDERS)
+    parser.add_argument("--site-latency-ms", type=float, default=20)
+    parser.add_argument("--provider-latency-ms", type=float, default=50)
+    parser.add_argument("--llm-latency-ms", type=float, default=300)
+    parser.add_argument("--output", help="Result file, benchmarks/results/<time>_<commit>.json by default")
+    parser.add_argument("--compare", help="Earlier result file to compare with")
+    args = parser.parse_args(argv)
+    levels = [int(level) for level in args.concurrency.split(",")]
+    scenarios = [name for name in args.only.split(",") if name]
+
+    urls, stop = start_stand_ins({
+        "site": args.site_latency_ms, "providers": args.provider_latency_ms, "llm": args.llm_latency_ms
+    })
+    directory = tempfile.mkdtemp(prefix="scraper-bench-")
+    # Read once by the project modules, so set before any of them is imported
+    settings = {
+        "SCRAPER_PROVIDER_BASE_URL": urls["providers"],
+        "SCRAPER_CACHE_PATH": os.path.join(directory, "results.db"),
+        "SCRAPER_FETCH_STORE_PATH": os.path.join(directory, "fetch.db"),
+        "SCRAPER_RESULT_STORE_PATH": os.path.join(directory, "store.db"),
+        "SCRAPER_HOST_RATE": "1000000",
+        "SCRAPER_HOST_BURST": "1000000",
+        "SCRAPER_PROVIDER_QPS": "1000000"
+    }
+    for name, value in settings.items():
+        os.environ.setdefault(name, value)
+
+    commit, dirty = git_revision()
+    results = {
+        "commit": commit,
+        "dirty": dirty,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "parameters": {
+            "concurrency": levels,
+            "requests": args.requests,
+            "provider": args.provider,
+            "site_latency_ms": args.site_latency_ms,
+            "provider_latency_ms": args.provider_latency_ms,
+            "llm_latency_ms": args.llm_latency_ms,
+            "page_bytes": dict(SIZES),
+            "environment": {name: value for name, value in os.environ.items()
+                            if name.startswith("SCRAPER_") and name != "SCRAPER_PROVIDER_BASE_URL"
+                            and not name.endswith(("_PATH", "_DIR"))}
+        },
+        "results": {}
+    }
+    if "scraper" in scenarios:
+        results["results"]["scraper"] = bench_scraper(urls, levels, args.requests, args.provider)
+    if "batch" in scenarios:
+        results["results"]["batch"] = bench_batch(urls, levels, args.requests, args.provider, directory)
+    if "task" in scenarios:
+        results["results"]["task"] = bench_task(urls, levels, args.requests)
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d_%H%M%S')}_{(commit or 'unknown')[:10]}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(results, json.load(f))
+    stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
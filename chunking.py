@@ -0,0 +1,131 @@
+import os
+import re
+import asyncio
+
+# Token budget of one provider request, overridable from the environment
+DEFAULT_CHUNK_TOKENS = int(os.environ.get("SCRAPER_CHUNK_TOKENS", 1000))
+# Chunks sent per page at most; text past them is left out and flagged.
+# Each chunk is a billable provider call, sent at once, so the default
+# stays within the provider gateway's default rate of 5 calls per second
+MAX_CHUNKS = int(os.environ.get("SCRAPER_MAX_CHUNKS", 4))
+# Typical characters per token of English text, used to size extraction
+CHARS_PER_TOKEN = 4
+
+_PIECES = re.compile(r"\w+|[^\w\s]")
+# Page text comes out of extraction with all whitespace collapsed to single
+# spaces, so sentence ends are the only boundaries left: a stop, possibly
+# closed by a quote or bracket, then a space and a capital or digit, which
+# leaves abbreviations such as "e.g. this" whole
+_SENTENCE_END = re.compile(r"(?:(?<=[.!?])|(?<=[.!?][\"')\]]))\s+(?=[\"'(\[]?[A-Z0-9])")
+
+
+def estimate_tokens(text):
+    """
+    Estimates the number of BPE tokens of a text without a tokenizer:
+    one per word or punctuation mark, plus one per 6 characters of long
+    words, which tokenizers split. Rough, so budgets should keep headroom.
+    """
+    pieces = _PIECES.findall(text)
+    return len(pieces) + sum(len(piece) for piece in pieces if len(piece) > 6) // 6
+
+
+def text_limit(max_tokens, max_chunks=MAX_CHUNKS):
+    """Characters of page text worth extracting for `max_chunks` chunks."""
+    return max_tokens * max_chunks * CHARS_PER_TOKEN
+
+
+def _units(text, max_tokens):
+    """Splits text into (piece, tokens) units no larger than `max_tokens`."""
+    for sentence in _SENTENCE_END.split(text):
+        tokens = estimate_tokens(sentence)
+        if tokens <= max_tokens:
+            if tokens:
+                yield sentence, tokens
+            continue
+        # A sentence over budget is split between words
+        words = []
+        count = 0
+        for word in sentence.split():
+            word_tokens = estimate_tokens(word)
+            if words and count + word_tokens > max_tokens:
+                yield " ".join(words), count
+                words, count = [], 0
+            words.append(word)
+            count += word_tokens
+        if words:
+            yield " ".join(words), count
+
+
+def split_text(text, max_tokens=DEFAULT_CHUNK_TOKENS):
+    """
+    Splits cleaned page text into chunks of at most `max_tokens` estimated
+    tokens, breaking between sentences, then between words.
+        Arguments:
+        - text (str): page text
+        - max_tokens (int): token budget of one chunk
+        Return:
+        - chunks (list of str)
+    """
+    chunks = []
+    current = []
+    count = 0
+    for piece, tokens in _units(text, max_tokens):
+        if current and count + tokens > max_tokens:
+            chunks.append(" ".join(current))
+            current, count = [], 0
+        current.append(piece)
+        count += tokens
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+async def map_chunks(chunks, func, concurrency=None):
+    """
+    Runs the coroutine function `func` on every chunk concurrently and
+    returns the results in chunk order. The first failure is raised.
+    """
+    limit = asyncio.Semaphore(concurrency or max(len(chunks), 1))
+
+    async def run(chunk):
+        async with limit:
+            return await func(chunk)
+
+    return await asyncio.gather(*(run(chunk) for chunk in chunks))
+
+
+def merge_results(results):
+    """
+    Merges the partial results of the chunks of one page key by key: equal
+    values are kept once, lists are concatenated and dicts are merged
+    recursively. Differing texts are joined by newlines when they are prose,
+    such as a summary; single-word values such as IDs, status codes or
+    timestamps are not text to join and, like numbers, keep the first.
+    """
+    if not results:
+        return None
+    merged = results[0]
+    for result in results[1:]:
+        merged = _merge(merged, result)
+    return merged
+
+
+def _merge(first, second):
+    if first == second or second is None:
+        return first
+    if first is None:
+        return second
+    if isinstance(first, dict) and isinstance(second, dict):
+        merged = dict(first)
+        for key, value in second.items():
+            merged[key] = _merge(merged[key], value) if key in merged else value
+        return merged
+    if isinstance(first, list) and isinstance(second, list):
+        return first + second
+    if isinstance(first, str) and isinstance(second, str) and _is_prose(first) and _is_prose(second):
+        return f"{first}\n{second}"
+    return first
+
+
+def _is_prose(text):
+    return len(text.split(maxsplit=1)) > 1
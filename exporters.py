@@ -0,0 +1,201 @@
+import io
+import csv
+import json
+import importlib.util
+
+# Export formats: file extension and MIME type
+EXPORT_FORMATS = {
+    "JSON": ("json", "application/json"),
+    "JSONL": ("jsonl", "application/jsonl"),
+    "CSV": ("csv", "text/csv"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet")
+}
+# Rows converted and written at a time by the columnar formats
+BATCH_ROWS = 5000
+
+
+def available_formats():
+    """Export formats usable here; Parquet needs the optional pyarrow package."""
+    formats = list(EXPORT_FORMATS)
+    if importlib.util.find_spec("pyarrow") is None:
+        formats.remove("Parquet")
+    return formats
+
+
+def iter_records(result):
+    """
+    Yields the rows of a graph or scrape result: the items of a list or of
+    a dict's only list, e.g. {"products": [...]}, the zipped values of a
+    dict of equally long lists (one column per key), or the result itself
+    as a single row.
+    """
+    if isinstance(result, list):
+        yield from result
+    elif isinstance(result, dict) and len(result) == 1 and isinstance(next(iter(result.values())), list):
+        yield from next(iter(result.values()))
+    elif isinstance(result, dict) and result and all(isinstance(value, list) for value in result.values()) \
+            and len({len(value) for value in result.values()}) == 1:
+        keys = list(result)
+        for values in zip(*result.values()):
+            yield dict(zip(keys, values))
+    else:
+        yield result
+
+
+def read_jsonl(path):
+    """Yields the records of a JSONL file, e.g. a batch output, one line at a time."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def flatten(value, prefix="", sep="."):
+    """
+    Yields the (column, value) pairs of a nested record: dict keys and the
+    indexes of lists of objects become dotted column names, lists of plain
+    values are kept as one JSON text cell.
+    """
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield from flatten(item, f"{prefix}{sep}{key}" if prefix else str(key), sep)
+    elif isinstance(value, list) and any(isinstance(item, (dict, list)) for item in value):
+        for index, item in enumerate(value):
+            yield from flatten(item, f"{prefix}{sep}{index}" if prefix else str(index), sep)
+    elif isinstance(value, list):
+        yield prefix or "value", json.dumps(value, ensure_ascii=False)
+    else:
+        yield prefix or "value", value
+
+
+def _kind(value):
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, int):
+        return "int"
+    if isinstance(value, float):
+        return "float"
+    return "str"
+
+
+def scan_columns(records):
+    """Returns the flattened columns of all records, in order of appearance, with their value kinds."""
+    columns = {}
+    for record in records():
+        for column, value in flatten(record):
+            kinds = columns.setdefault(column, set())
+            if value is not None:
+                kinds.add(_kind(value))
+    return columns
+
+
+def write_json(result, out):
+    """Streams a result as compact JSON."""
+    text = io.TextIOWrapper(out, encoding="utf-8")
+    json.dump(result, text, ensure_ascii=False, separators=(",", ":"))
+    text.detach()
+
+
+def write_json_array(records, out):
+    """Streams records as a compact JSON array."""
+    text = io.TextIOWrapper(out, encoding="utf-8")
+    text.write("[")
+    for number, record in enumerate(records()):
+        if number:
+            text.write(",")
+        json.dump(record, text, ensure_ascii=False, separators=(",", ":"))
+    text.write("]")
+    text.detach()
+
+
+def write_jsonl(records, out):
+    """Streams records as JSON lines."""
+    text = io.TextIOWrapper(out, encoding="utf-8")
+    for record in records():
+        text.write(json.dumps(record, ensure_ascii=False))
+        text.write("\n")
+    text.detach()
+
+
+def write_csv(records, out):
+    """Streams flattened records as CSV, one column per flattened key of any record."""
+    columns = scan_columns(records)
+    text = io.TextIOWrapper(out, encoding="utf-8", newline="")
+    writer = csv.DictWriter(text, fieldnames=list(columns) or ["value"])
+    writer.writeheader()
+    for record in records():
+        writer.writerow(dict(flatten(record)))
+    text.detach()
+
+
+def write_parquet(records, out):
+    """
+    Writes flattened records as Parquet, BATCH_ROWS rows per record batch.
+    Columns holding only numbers or booleans keep their type, mixed ones
+    are stored as text. Requires pyarrow.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Parquet export requires pyarrow: pip install pyarrow") from None
+
+    columns = scan_columns(records) or {"value": set()}
+    types = {}
+    for column, kinds in columns.items():
+        if kinds == {"bool"}:
+            types[column] = pa.bool_()
+        elif kinds == {"int"}:
+            types[column] = pa.int64()
+        elif kinds and kinds <= {"int", "float"}:
+            types[column] = pa.float64()
+        else:
+            types[column] = pa.string()
+    schema = pa.schema(list(types.items()))
+
+    def convert(column, value):
+        if value is None or types[column] != pa.string():
+            return value
+        return value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+
+    with pq.ParquetWriter(out, schema) as writer:
+        batch = {column: [] for column in types}
+        rows = 0
+        for record in records():
+            row = dict(flatten(record))
+            for column, values in batch.items():
+                values.append(convert(column, row.get(column)))
+            rows += 1
+            if rows == BATCH_ROWS:
+                writer.write_batch(pa.RecordBatch.from_pydict(batch, schema=schema))
+                batch = {column: [] for column in types}
+                rows = 0
+        if rows:
+            writer.write_batch(pa.RecordBatch.from_pydict(batch, schema=schema))
+
+
+def export(fmt, out, result=None, records=None):
+    """
+    Writes an export to a binary file object.
+        Arguments:
+        - fmt (str): a key of EXPORT_FORMATS
+        - out (file): binary file object to write to
+        - result: the result to export as JSON, and as rows by `iter_records`
+        - records (callable): returns a new iterator over the rows each time
+          it is called, e.g. `lambda: read_jsonl(path)`; the columnar formats
+          go over the rows twice, once for the columns and once to write
+    """
+    if records is None:
+        records = lambda: iter_records(result)
+    if fmt == "JSON" and result is not None:
+        write_json(result, out)
+    elif fmt == "JSON":
+        write_json_array(records, out)
+    elif fmt == "JSONL":
+        write_jsonl(records, out)
+    elif fmt == "CSV":
+        write_csv(records, out)
+    elif fmt == "Parquet":
+        write_parquet(records, out)
+    else:
+        raise ValueError(f"Unknown export format: {fmt}")
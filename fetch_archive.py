@@ -0,0 +1,262 @@
+import os
+import gzip
+import fcntl
+import time
+import uuid
+import asyncio
+import sqlite3
+import threading
+import functools
+import email.message
+from collections import OrderedDict, namedtuple
+
+from multidict import CIMultiDict
+
+import politeness
+
+# Archive mode and location, overridable from the environment:
+# "off", "record" (archive every page download) or "replay" (serve pages
+# from the archive only, never from the network)
+ARCHIVE_MODE = os.environ.get("SCRAPER_ARCHIVE_MODE", "off").strip().lower()
+ARCHIVE_DIR = os.environ.get("SCRAPER_ARCHIVE_DIR", "archive")
+# Replayed pages kept decompressed in memory
+MEMORY_BYTES = int(os.environ.get("SCRAPER_ARCHIVE_MEMORY_BYTES", 64 * 1024 * 1024))
+
+MODES = {"off", "record", "replay"}
+# Set by aiohttp for the wire format, which the archived body is no longer in
+_TRANSPORT_HEADERS = {"content-encoding", "transfer-encoding", "content-length"}
+
+ArchivedPage = namedtuple("ArchivedPage", ["url", "status", "reason", "headers", "body", "truncated"])
+
+
+def _warc_record(url, status, reason, headers, body, truncated):
+    """Returns a WARC/1.1 response record holding the HTTP response."""
+    lines = [f"HTTP/1.1 {status} {reason}"]
+    lines += [f"{name}: {value}" for name, value in headers if name.lower() not in _TRANSPORT_HEADERS]
+    lines.append(f"Content-Length: {len(body)}")
+    block = ("\r\n".join(lines) + "\r\n\r\n").encode("utf-8") + body
+    warc_headers = [
+        "WARC/1.1",
+        "WARC-Type: response",
+        f"WARC-Record-ID: <urn:uuid:{uuid.uuid4()}>",
+        f"WARC-Date: {time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())}",
+        f"WARC-Target-URI: {url}"
+    ]
+    if truncated:
+        warc_headers.append("WARC-Truncated: length")
+    warc_headers += ["Content-Type: application/http;msgtype=response", f"Content-Length: {len(block)}"]
+    return ("\r\n".join(warc_headers) + "\r\n\r\n").encode("utf-8") + block + b"\r\n\r\n"
+
+
+def _parse_headers(lines):
+    headers = []
+    for line in lines:
+        name, _, value = line.partition(":")
+        headers.append((name.strip(), value.strip()))
+    return headers
+
+
+def _parse_record(url, data):
+    """Returns the ArchivedPage of a decompressed WARC response record."""
+    warc_head, _, rest = data.partition(b"\r\n\r\n")
+    warc_headers = dict(_parse_headers(warc_head.decode("utf-8").split("\r\n")[1:]))
+    block = rest[:int(warc_headers["Content-Length"])]
+    http_head, _, body = block.partition(b"\r\n\r\n")
+    status_line, *header_lines = http_head.decode("utf-8").split("\r\n")
+    _, status, reason = (status_line.split(" ", 2) + [""])[:3]
+    return ArchivedPage(
+        url, int(status), reason, _parse_headers(header_lines), body, "WARC-Truncated" in warc_headers
+    )
+
+
+class FetchArchive:
+    """
+    Record/replay archive of page downloads, so an extraction can be rerun
+    over an earlier crawl without the network, at the same bytes every time.
+
+    Responses are appended as gzip-compressed WARC records to one file per
+    day (archive/YYYYMMDD.warc.gz), which standard WARC tools can read, and
+    a SQLite index maps each URL to the offset of its records. Replay serves
+    the latest record of a URL; recently replayed pages are kept in memory.
+    The archive is append-only, nothing is ever evicted from it.
+    """
+
+    def __init__(self, directory=ARCHIVE_DIR, mode=ARCHIVE_MODE, memory_bytes=MEMORY_BYTES):
+        if mode not in MODES:
+            raise ValueError(f"Unknown archive mode {mode!r}, expected one of {', '.join(sorted(MODES))}")
+        self.directory = directory
+        self.mode = mode
+        self.memory_bytes = memory_bytes
+        self._recent = OrderedDict()
+        self._recent_bytes = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(directory, "index.db"), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute('''CREATE TABLE IF NOT EXISTS records (
+                                url TEXT,
+                                file TEXT,
+                                offset INTEGER,
+                                length INTEGER,
+                                status INTEGER,
+                                size INTEGER,
+                                fetched REAL
+                            )''')
+        self._conn.execute("CREATE INDEX IF NOT EXISTS records_url ON records (url, fetched)")
+        self._conn.commit()
+
+    @property
+    def replaying(self):
+        return self.mode == "replay"
+
+    def put(self, url, status, reason, headers, body, truncated=False):
+        """Appends a response to today's archive file and indexes it."""
+        member = gzip.compress(_warc_record(url, status, reason, headers, body, truncated), mtime=0)
+        name = time.strftime("%Y%m%d") + ".warc.gz"
+        with self._lock:
+            try:
+                with open(os.path.join(self.directory, name), "ab") as f:
+                    # Worker processes append to the same file; the lock keeps
+                    # the offset valid until the member is written
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                    offset = f.seek(0, os.SEEK_END)
+                    f.write(member)
+                    f.flush()
+                self._conn.execute(
+                    "INSERT INTO records (url, file, offset, length, status, size, fetched) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (url, name, offset, len(member), status, len(body), time.time())
+                )
+                self._conn.commit()
+            except (OSError, sqlite3.Error) as e:
+                print(f"Could not archive {url}: {e}")
+
+    def get(self, url):
+        """Returns the latest ArchivedPage of `url`, or None if it was never recorded."""
+        with self._lock:
+            page = self._recent.get(url)
+            if page is not None:
+                self._recent.move_to_end(url)
+                return page
+            row = self._conn.execute(
+                "SELECT file, offset, length FROM records WHERE url = ? ORDER BY fetched DESC LIMIT 1", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        name, offset, length = row
+        with open(os.path.join(self.directory, name), "rb") as f:
+            f.seek(offset)
+            page = _parse_record(url, gzip.decompress(f.read(length)))
+        self._remember(page)
+        return page
+
+    def _remember(self, page):
+        with self._lock:
+            previous = self._recent.pop(page.url, None)
+            if previous is not None:
+                self._recent_bytes -= len(previous.body)
+            self._recent[page.url] = page
+            self._recent_bytes += len(page.body)
+            while self._recent_bytes > self.memory_bytes and self._recent:
+                _, dropped = self._recent.popitem(last=False)
+                self._recent_bytes -= len(dropped.body)
+
+    def stats(self):
+        """Returns the number of records, distinct URLs and archived body bytes."""
+        with self._lock:
+            records, urls, size = self._conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT url), COALESCE(SUM(size), 0) FROM records"
+            ).fetchone()
+        return {"records": records, "urls": urls, "bytes": size}
+
+    def recorder(self, url, response):
+        """Wraps an aiohttp response so its body is archived once it has been read."""
+        return RecordingResponse(self, url, response)
+
+
+class _ArchivedContent:
+    def __init__(self, body):
+        self._body = body
+
+    async def iter_chunked(self, size):
+        for start in range(0, len(self._body), size):
+            yield self._body[start:start + size]
+
+
+class ArchivedResponse:
+    """An archived page with the parts of the aiohttp response interface `fetch_page` reads."""
+
+    def __init__(self, page):
+        self.status = page.status
+        self.reason = page.reason
+        # Case-insensitive like aiohttp's, header names keep their wire case in the archive
+        self.headers = CIMultiDict(page.headers)
+        self.content = _ArchivedContent(page.body)
+        message = email.message.Message()
+        message["Content-Type"] = self.headers.get("Content-Type", "application/octet-stream")
+        self.content_type = message.get_content_type()
+        self.charset = message.get_param("charset")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+class _RecordingContent:
+    def __init__(self, content, chunks):
+        self._content = content
+        self._chunks = chunks
+
+    async def iter_chunked(self, size):
+        async for chunk in self._content.iter_chunked(size):
+            self._chunks.append(chunk)
+            yield chunk
+
+
+class RecordingResponse:
+    """
+    An aiohttp response whose body is archived when it is closed, as far as
+    it was read. Responses that failed, were throttled or were not modified
+    are not archived.
+    """
+
+    def __init__(self, archive, url, response):
+        self._archive = archive
+        self._url = url
+        self._response = response
+        self._chunks = []
+        self.content = _RecordingContent(response.content, self._chunks)
+
+    def __getattr__(self, name):
+        return getattr(self._response, name)
+
+    async def __aenter__(self):
+        await self._response.__aenter__()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        response = self._response
+        if exc_type is None and response.status != 304 and response.status not in politeness.RETRY_STATUSES:
+            # Compressing and appending the record runs on a thread, not the event loop
+            await asyncio.get_running_loop().run_in_executor(None, functools.partial(
+                self._archive.put, self._url, response.status, response.reason or "",
+                list(response.headers.items()), b"".join(self._chunks), truncated=not response.content.at_eof()
+            ))
+        return await response.__aexit__(exc_type, exc, tb)
+
+
+_archive = None
+_archive_lock = threading.Lock()
+
+
+def get_archive():
+    """Returns the process-wide fetch archive, or None when SCRAPER_ARCHIVE_MODE is off."""
+    global _archive
+    if ARCHIVE_MODE == "off":
+        return None
+    with _archive_lock:
+        if _archive is None:
+            _archive = FetchArchive()
+        return _archive
@@ -0,0 +1,140 @@
+import os
+import json
+import time
+import zlib
+import sqlite3
+import threading
+from collections import namedtuple
+
+# Store location and size budget, overridable from the environment
+STORE_PATH = os.environ.get("SCRAPER_FETCH_STORE_PATH", os.path.join("cache", "fetch.db"))
+MAX_BYTES = int(os.environ.get("SCRAPER_FETCH_STORE_MAX_BYTES", 512 * 1024 * 1024))
+
+
+class FetchRecord(namedtuple("FetchRecord", ["etag", "last_modified", "body_hash", "compressed", "parsed"])):
+    """What we know about the last successful download of a URL."""
+
+    __slots__ = ()
+
+    @property
+    def body(self):
+        """The stored body, decompressed on access."""
+        return zlib.decompress(self.compressed).decode("utf-8")
+
+
+class FetchStore:
+    """
+    Revalidation store for page downloads. Keeps the validators (ETag,
+    Last-Modified), a hash of the body, the compressed body and the parse
+    results of every fetched URL, so an unchanged page is neither downloaded
+    nor parsed again.
+    """
+
+    def __init__(self, path=STORE_PATH, max_bytes=MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute('''CREATE TABLE IF NOT EXISTS pages (
+                                url TEXT PRIMARY KEY,
+                                etag TEXT,
+                                last_modified TEXT,
+                                body_hash TEXT,
+                                body BLOB,
+                                parsed TEXT,
+                                size INTEGER,
+                                fetched REAL
+                            )''')
+        self._conn.execute("CREATE INDEX IF NOT EXISTS pages_fetched ON pages (fetched)")
+        self._conn.commit()
+
+    def get(self, url):
+        """Returns the FetchRecord of `url`, or None if it was never fetched."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, body_hash, body, parsed FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, body_hash, compressed, parsed = row
+        return FetchRecord(etag, last_modified, body_hash, compressed, json.loads(parsed))
+
+    @staticmethod
+    def conditional_headers(record):
+        """Returns the revalidation headers for a stored record."""
+        headers = {}
+        if record is not None:
+            if record.etag:
+                headers["If-None-Match"] = record.etag
+            if record.last_modified:
+                headers["If-Modified-Since"] = record.last_modified
+        return headers
+
+    def save(self, url, compressed, body_hash, etag=None, last_modified=None, parsed=None):
+        """
+        Stores a fresh download, given as a zlib-compressed UTF-8 body and the
+        `content_hash` of that body. Parse results are only kept if the body
+        is unchanged, since they were computed from the previous version.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body_hash, parsed FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+            if parsed is None:
+                parsed = json.loads(row[1]) if row is not None and row[0] == body_hash else {}
+            self._conn.execute(
+                '''INSERT OR REPLACE INTO pages (url, etag, last_modified, body_hash, body, parsed, size, fetched)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
+                (url, etag, last_modified, body_hash, compressed, json.dumps(parsed), len(compressed), time.time())
+            )
+            self._evict()
+            self._conn.commit()
+        return FetchRecord(etag, last_modified, body_hash, compressed, parsed)
+
+    def save_parsed(self, url, schema, parsed):
+        """Stores the parse result of `url` for a given schema."""
+        with self._lock:
+            row = self._conn.execute("SELECT parsed FROM pages WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                return
+            results = json.loads(row[0])
+            results[schema or ""] = parsed
+            self._conn.execute(
+                "UPDATE pages SET parsed = ? WHERE url = ?", (json.dumps(results), url)
+            )
+            self._conn.commit()
+
+    def touch(self, url):
+        """Marks `url` as revalidated now."""
+        with self._lock:
+            self._conn.execute("UPDATE pages SET fetched = ? WHERE url = ?", (time.time(), url))
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        stale = []
+        for url, size in self._conn.execute("SELECT url, size FROM pages ORDER BY fetched"):
+            if total <= self.max_bytes:
+                break
+            stale.append((url,))
+            total -= size
+        self._conn.executemany("DELETE FROM pages WHERE url = ?", stale)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Returns the process-wide fetch store."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = FetchStore()
+        return _store
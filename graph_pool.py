@@ -0,0 +1,133 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# Number of idle graphs kept across all configurations
+POOL_SIZE = int(os.environ.get("SCRAPER_GRAPH_POOL_SIZE", 8))
+
+
+def _describe(value):
+    # Clients and other objects in a config are identified by instance
+    return f"{type(value).__name__}@{id(value)}"
+
+
+def config_key(graph_class, config):
+    """
+    Returns the pool key of a graph configuration: the graph class, model,
+    API base and a fingerprint of the whole config. Credentials only enter
+    the key through the SHA-256 fingerprint, never in clear text.
+    """
+    llm = config.get("llm", {})
+    payload = json.dumps(config, sort_keys=True, default=_describe)
+    fingerprint = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    return (
+        graph_class.__name__,
+        llm.get("model"),
+        llm.get("openai_api_base") or llm.get("base_url"),
+        fingerprint
+    )
+
+
+class GraphPool:
+    """
+    Pool of built scrapegraphai graphs, keyed by configuration.
+
+    Building a graph creates its LLM client and nodes, which costs far more
+    than a run's own setup. A checked-out graph is used by one run at a time;
+    only its prompt and source are swapped before the run. Idle graphs beyond
+    `max_size` are dropped, least recently used first.
+    """
+
+    def __init__(self, max_size=POOL_SIZE):
+        self.max_size = max_size
+        self.built = 0
+        self.reused = 0
+        self._idle = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _take(self, key):
+        with self._lock:
+            graphs = self._idle.get(key)
+            if not graphs:
+                return None
+            graph = graphs.pop()
+            if not graphs:
+                del self._idle[key]
+            self.reused += 1
+            return graph
+
+    def _give_back(self, key, graph):
+        with self._lock:
+            self._idle.setdefault(key, []).append(graph)
+            self._idle.move_to_end(key)
+            while sum(len(graphs) for graphs in self._idle.values()) > self.max_size:
+                oldest = next(iter(self._idle))
+                self._idle[oldest].pop(0)
+                if not self._idle[oldest]:
+                    del self._idle[oldest]
+
+    @contextmanager
+    def checkout(self, graph_class, prompt, source, config, model_tokens=None):
+        """
+        Lends a graph for one run, building it on a miss.
+            Arguments:
+            - graph_class (type): e.g. SmartScraperGraph
+            - prompt (str): prompt of this run
+            - source (str): url or HTML of this run
+            - config (dict): graph configuration
+            - model_tokens (int): optional token budget of the chunks the graph
+              splits the page into, the model's full context by default
+            Return:
+            - graph, ready to `run()`; it goes back to the pool afterwards
+        """
+        key = config_key(graph_class, config)
+        graph = self._take(key)
+        if graph is None:
+            # The graph fills in defaults such as the temperature, so it gets its own copy
+            config = dict(config, llm=dict(config.get("llm", {})))
+            graph = graph_class(prompt=prompt, source=source, config=config)
+            with self._lock:
+                self.built += 1
+        else:
+            graph.prompt = prompt
+            graph.source = source
+            if hasattr(graph, "input_key"):
+                graph.input_key = "url" if source.startswith("http") else "local_dir"
+
+        # The budget is swapped per run too, so it stays out of the pool key
+        chunk_size = model_tokens or getattr(graph, "model_token", None)
+        if chunk_size and hasattr(graph, "graph"):
+            for node in graph.graph.nodes:
+                if hasattr(node, "chunk_size"):
+                    node.chunk_size = chunk_size
+
+        # A graph whose run raised is not trusted for the next one and is dropped
+        yield graph
+        graph.final_state = None
+        graph.execution_info = None
+        self._give_back(key, graph)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "idle": sum(len(graphs) for graphs in self._idle.values()),
+                "configs": len(self._idle),
+                "built": self.built,
+                "reused": self.reused
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_graph_pool():
+    """Returns the process-wide graph pool."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = GraphPool()
+        return _pool
@@ -1,34 +1,155 @@
 import os
-import json
+import sys
+import time
+import threading
+import subprocess
 
-import pandas as pd
 import streamlit as st
 
+try:
+    import fcntl
+except ImportError:
+    # Windows: installs are not serialized between processes
+    fcntl = None
+
+# Startup costs of this process in seconds, e.g. the playwright check
+STARTUP_TIMINGS = {}
+
+_install_lock = threading.Lock()
+_install_thread = None
+
+
+def _browsers_path():
+    """Directory playwright downloads its browsers into."""
+    path = os.environ.get("PLAYWRIGHT_BROWSERS_PATH")
+    if path and path != "0":
+        return path
+    if sys.platform.startswith("win"):
+        return os.path.join(os.environ.get("LOCALAPPDATA", os.path.expanduser("~")), "ms-playwright")
+    if sys.platform == "darwin":
+        return os.path.expanduser("~/Library/Caches/ms-playwright")
+    return os.path.expanduser("~/.cache/ms-playwright")
+
+
+def _marker_path():
+    """Marker written after a successful install, one per playwright version."""
+    from importlib.metadata import version, PackageNotFoundError
+    try:
+        playwright_version = version("playwright")
+    except PackageNotFoundError:
+        playwright_version = "unknown"
+    return os.path.join(_browsers_path(), f".scrapegraph-demo-{playwright_version}")
+
+
+def playwright_ready():
+    """Tells whether the browsers of the installed playwright version are in place."""
+    return os.path.exists(_marker_path())
+
+
+def ensure_playwright_browsers():
+    """
+    Installs the playwright browsers unless the version marker says they are
+    already there. Runs at container build and, if needed, once per process.
+    The app and the queue workers share the browsers directory, so a lock
+    file lets one process install while the others wait for it.
+    Returns True when the browsers are ready.
+    """
+    if playwright_ready():
+        return True
+    try:
+        os.makedirs(_browsers_path(), exist_ok=True)
+        lock = open(os.path.join(_browsers_path(), ".scrapegraph-demo-install.lock"), "w")
+    except OSError:
+        # No lock file without a writable browsers directory; let the install report it
+        return _install_browsers()
+    with lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        # Another process may have installed them while we waited
+        if playwright_ready():
+            return True
+        return _install_browsers()
+
+
+def _install_browsers():
+    start_time = time.perf_counter()
+    command = [sys.executable, "-m", "playwright", "install"]
+    command += os.environ.get("PLAYWRIGHT_INSTALL_ARGS", "").split()
+    completed = subprocess.run(command)
+    STARTUP_TIMINGS["playwright_install"] = time.perf_counter() - start_time
+    print(f"playwright install took {STARTUP_TIMINGS['playwright_install']:.2f}s")
+    if completed.returncode != 0:
+        return False
+    try:
+        with open(_marker_path(), "w") as f:
+            f.write(time.strftime("%Y-%m-%d %H:%M:%S"))
+    except OSError:
+        pass
+    return True
+
+
 def playwright_install():
     """
     Install playwright browsers
     https://discuss.streamlit.io/t/using-playwright-with-streamlit/28380/11
+
+    Streamlit calls this on every rerun, so only the first call of the process
+    does any work: a marker check, and a background install if it fails.
     """
-    with st.spinner("Setting up playwright 🎭"):
-        os.system("playwright install")
+    global _install_thread
+    with _install_lock:
+        if _install_thread is not None:
+            return
+        start_time = time.perf_counter()
+        _install_thread = threading.Thread(
+            target=ensure_playwright_browsers,
+            name="playwright-install",
+            daemon=True
+        )
+        if not playwright_ready():
+            _install_thread.start()
+        STARTUP_TIMINGS["playwright_check"] = time.perf_counter() - start_time
 
 
-def add_download_options(result: str):
+def add_download_options(result=None, key=None, file_name="scraped_data", records=None):
     """
-    Adds download buttons for graph result.
+    Adds an export format choice and download button for a result. Nothing
+    is serialized until the user asks for an export, which is then streamed
+    into memory once and kept for the following reruns.
+        Arguments:
+        - result: graph or scrape result
+        - key (str): identifies the result across reruns, e.g. its job ID
+        - file_name (str): download name, without extension
+        - records (callable): rows to export instead of those of `result`,
+          see `exporters.export`
     """
-    st.download_button(
-        label="Download JSON",
-        data=json.dumps(result, indent=4),
-        file_name="scraped_data.json",
-        mime="application/json"
-    )
-
-    df = pd.DataFrame(result)
-    csv = df.to_csv(index=False)
-    st.download_button(
-        label="Download CSV",
-        data=csv,
-        file_name="scraped_data.csv",
-        mime="text/csv"
-    )
+    # The exporters, and pyarrow for Parquet, are only loaded when used
+    import io
+    import exporters
+
+    key = f"export_{key or id(result)}"
+    fmt = st.selectbox("Export format", exporters.available_formats(), key=f"{key}_format")
+    prepared = st.session_state.get(key)
+    if st.button(f"Prepare {fmt} export", key=f"{key}_prepare"):
+        data = io.BytesIO()
+        with st.spinner(f"Exporting {fmt}"):
+            try:
+                exporters.export(fmt, data, result=result, records=records)
+            except Exception as e:
+                st.error(f"Export failed: {e}")
+                return
+        prepared = st.session_state[key] = (fmt, data)
+    if prepared is not None and prepared[0] == fmt:
+        extension, mime = exporters.EXPORT_FORMATS[fmt]
+        st.download_button(
+            label=f"Download {fmt}",
+            data=prepared[1],
+            file_name=f"{file_name}.{extension}",
+            mime=mime,
+            key=f"{key}_download"
+        )
+
+
+if __name__ == "__main__":
+    # Used at container build: python helper.py
+    sys.exit(0 if ensure_playwright_browsers() else 1)
@@ -0,0 +1,346 @@
+"""
+Pluggable HTML parsing backends with a single-pass schema extractor.
+
+The fastest installed backend is used by default: selectolax (lexbor),
+then lxml (with cssselect), then BeautifulSoup's pure-Python html.parser.
+Set SCRAPER_HTML_BACKEND to force one.
+"""
+import os
+import re
+from collections import defaultdict
+from html.parser import HTMLParser
+from importlib.util import find_spec
+
+# Backends in order of preference, with the modules each one needs. lxml
+# only matches CSS selectors with cssselect, without it the next backend is used
+BACKEND_MODULES = {
+    "selectolax": ("selectolax",),
+    "lxml": ("lxml", "cssselect"),
+    "html.parser": ("bs4",)
+}
+AVAILABLE_BACKENDS = [
+    name for name, modules in BACKEND_MODULES.items() if all(find_spec(module) for module in modules)
+]
+
+# Compound selectors such as `h1`, `.card`, `#main` or `div.card.active`
+# are matched during the single traversal; anything else goes to the backend
+_SIMPLE_SELECTOR = re.compile(r"^(?P<tag>[a-zA-Z][\w-]*|\*)?(?P<rest>(?:[.#][\w-]+)*)$")
+
+# Default length of the text preview sent to the providers
+PREVIEW_LENGTH = 1000
+
+# Elements whose content is never visible text
+_HIDDEN_TAGS = {"script", "style", "noscript", "template", "svg"}
+
+# Elements that separate words even without surrounding whitespace
+_BLOCK_TAGS = {
+    "address", "article", "aside", "blockquote", "br", "dd", "div", "dl", "dt",
+    "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr", "li",
+    "main", "nav", "ol", "p", "pre", "section", "table", "td", "th", "tr", "ul"
+}
+
+
+def default_backend():
+    """Returns the backend named by SCRAPER_HTML_BACKEND, else the fastest available one."""
+    backend = os.environ.get("SCRAPER_HTML_BACKEND")
+    if backend:
+        if backend not in AVAILABLE_BACKENDS:
+            if backend in BACKEND_MODULES:
+                modules = " and ".join(BACKEND_MODULES[backend])
+                raise ValueError(f"HTML backend {backend!r} is not installed, it needs {modules}")
+            raise ValueError(f"Unknown HTML backend {backend!r}")
+        return backend
+    return AVAILABLE_BACKENDS[0]
+
+
+def parse_selector(selector):
+    """
+    Splits a simple compound selector into (tag, id, classes).
+    Returns None for selectors the single-pass matcher does not handle.
+    """
+    match = _SIMPLE_SELECTOR.match(selector)
+    if not match or not selector:
+        return None
+    tag = (match.group("tag") or "*").lower()
+    element_id = None
+    classes = set()
+    for part in re.findall(r"[.#][\w-]+", match.group("rest")):
+        if part[0] == "#":
+            element_id = part[1:]
+        else:
+            classes.add(part[1:])
+    return tag, element_id, frozenset(classes)
+
+
+class PreviewExtractor(HTMLParser):
+    """
+    Incremental extractor for the page title and a visible-text preview.
+
+    Feed it the body chunk by chunk: it skips script/style and other hidden
+    content, collapses runs of whitespace and sets `done` once `limit`
+    characters of text are collected, after which further chunks are ignored.
+    No tree is built, so memory stays bounded by the preview length.
+    """
+
+    def __init__(self, limit=PREVIEW_LENGTH):
+        super().__init__(convert_charrefs=True)
+        self.limit = limit
+        self.done = False
+        self._title = []
+        self._parts = []
+        self._length = 0
+        self._hidden_depth = 0
+        self._in_title = False
+        self._title_seen = False
+        self._pending_space = False
+
+    @property
+    def title(self):
+        title = " ".join("".join(self._title).split())
+        return title or None
+
+    @property
+    def text(self):
+        return "".join(self._parts)[:self.limit]
+
+    def feed(self, data):
+        # Feed large chunks in slices so parsing stops soon after `done`
+        for start in range(0, len(data), 8192):
+            if self.done:
+                return
+            super().feed(data[start:start + 8192])
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "title" and not self._title_seen:
+            self._in_title = True
+        elif tag in _HIDDEN_TAGS:
+            self._hidden_depth += 1
+        elif tag in _BLOCK_TAGS:
+            self._pending_space = True
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in _BLOCK_TAGS:
+            self._pending_space = True
+
+    def handle_endtag(self, tag):
+        if tag == "title" and self._in_title:
+            self._in_title = False
+            self._title_seen = True
+        elif tag in _HIDDEN_TAGS:
+            self._hidden_depth = max(self._hidden_depth - 1, 0)
+        elif tag in _BLOCK_TAGS:
+            self._pending_space = True
+
+    def handle_data(self, data):
+        if self._in_title:
+            self._title.append(data)
+            return
+        if self._hidden_depth or self.done:
+            return
+        words = data.split()
+        if not words:
+            self._pending_space = True
+            return
+        if self._parts and (self._pending_space or data[0].isspace()):
+            self._parts.append(" ")
+            self._length += 1
+        text = " ".join(words)
+        self._parts.append(text)
+        self._length += len(text)
+        self._pending_space = data[-1].isspace()
+        if self._length >= self.limit:
+            self.done = True
+
+
+def extract_preview(chunks, limit=PREVIEW_LENGTH):
+    """
+    Returns (title, preview) from an iterable of text chunks, stopping as
+    soon as the preview is long enough.
+    """
+    extractor = PreviewExtractor(limit)
+    for chunk in chunks:
+        extractor.feed(chunk)
+        if extractor.done:
+            break
+    extractor.close()
+    return extractor.title, extractor.text
+
+
+def iter_chunks(text, size=64 * 1024):
+    """Splits an in-memory body into chunks for the incremental parsers."""
+    for start in range(0, len(text), size):
+        yield text[start:start + size]
+
+
+class Document:
+    """A parsed page. Backends implement the element walk and text access."""
+
+    title = None
+
+    def text(self):
+        """Returns the visible text of the whole document."""
+        raise NotImplementedError
+
+    def _iter_elements(self):
+        """Yields (tag, id, classes, element) for every element in document order."""
+        raise NotImplementedError
+
+    def _element_text(self, element):
+        """Returns the stripped text of an element, like BeautifulSoup's get_text(strip=True)."""
+        raise NotImplementedError
+
+    def _select(self, selector):
+        """Returns the elements matching a CSS selector the matcher cannot handle."""
+        raise NotImplementedError
+
+    def extract(self, selectors):
+        """
+        Collects the text of every element matching each selector.
+        Simple selectors are all matched in one walk over the tree.
+            Arguments:
+            - selectors (list of str): tag names or CSS selectors
+            Return:
+            - schema_data (dict): selector -> list of element texts
+        """
+        results = {selector: [] for selector in selectors}
+        by_tag = defaultdict(list)
+        complex_selectors = []
+        for selector in results:
+            parsed = parse_selector(selector)
+            if parsed is None:
+                complex_selectors.append(selector)
+            else:
+                by_tag[parsed[0]].append((selector, parsed[1], parsed[2]))
+
+        if by_tag:
+            any_tag = by_tag.get("*", [])
+            for tag, element_id, classes, element in self._iter_elements():
+                for selector, wanted_id, wanted_classes in by_tag.get(tag, []) + any_tag:
+                    if wanted_id is not None and wanted_id != element_id:
+                        continue
+                    if wanted_classes and not wanted_classes <= classes:
+                        continue
+                    results[selector].append(self._element_text(element))
+
+        for selector in complex_selectors:
+            try:
+                results[selector] = [self._element_text(el) for el in self._select(selector)]
+            except ImportError:
+                raise
+            except Exception:
+                # Not a valid CSS selector, it matches nothing
+                results[selector] = []
+        return results
+
+
+class SoupDocument(Document):
+    def __init__(self, html):
+        from bs4 import BeautifulSoup
+        self._soup = BeautifulSoup(html, "html.parser")
+        title = self._soup.title
+        self.title = str(title.string) if title and title.string else None
+
+    def text(self):
+        return self._soup.get_text()
+
+    def _iter_elements(self):
+        for element in self._soup.find_all(True):
+            yield (
+                element.name,
+                element.get("id"),
+                frozenset(element.get("class") or ()),
+                element
+            )
+
+    def _element_text(self, element):
+        return element.get_text(strip=True)
+
+    def _select(self, selector):
+        return self._soup.select(selector)
+
+
+class LxmlDocument(Document):
+    def __init__(self, html):
+        import lxml.html
+        if not html.strip():
+            html = "<html></html>"
+        elif html.lstrip().startswith("<?xml"):
+            # lxml refuses str input that carries an encoding declaration
+            html = html.encode("utf-8")
+        self._root = lxml.html.document_fromstring(html)
+        title = self._root.find(".//title")
+        self.title = title.text_content() if title is not None and title.text_content() else None
+
+    def text(self):
+        return self._root.text_content()
+
+    def _iter_elements(self):
+        for element in self._root.iter():
+            # Comments and processing instructions have a callable tag
+            if not isinstance(element.tag, str):
+                continue
+            yield (
+                element.tag,
+                element.get("id"),
+                frozenset((element.get("class") or "").split()),
+                element
+            )
+
+    def _element_text(self, element):
+        return "".join(part.strip() for part in element.itertext())
+
+    def _select(self, selector):
+        # Needs cssselect, which AVAILABLE_BACKENDS checks for
+        return self._root.cssselect(selector)
+
+
+class SelectolaxDocument(Document):
+    def __init__(self, html):
+        from selectolax.lexbor import LexborHTMLParser
+        self._tree = LexborHTMLParser(html)
+        title = self._tree.css_first("title")
+        self.title = title.text() if title is not None and title.text() else None
+
+    def text(self):
+        return self._tree.root.text() if self._tree.root is not None else ""
+
+    def _iter_elements(self):
+        root = self._tree.root
+        if root is None:
+            return
+        for node in root.traverse():
+            if node.tag.startswith("-"):
+                # -comment, -text and other pseudo nodes
+                continue
+            attributes = node.attributes
+            yield (
+                node.tag,
+                attributes.get("id"),
+                frozenset((attributes.get("class") or "").split()),
+                node
+            )
+
+    def _element_text(self, element):
+        return element.text(strip=True)
+
+    def _select(self, selector):
+        return self._tree.css(selector)
+
+
+DOCUMENT_CLASSES = {
+    "selectolax": SelectolaxDocument,
+    "lxml": LxmlDocument,
+    "html.parser": SoupDocument
+}
+
+
+def parse(html, backend=None):
+    """
+    Parses a page with the given backend, or the default one.
+        Arguments:
+        - html (str): page body
+        - backend (str): one of AVAILABLE_BACKENDS
+        Return:
+        - document (Document)
+    """
+    return DOCUMENT_CLASSES[backend or default_backend()](html)
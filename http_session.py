@@ -0,0 +1,103 @@
+import os
+import asyncio
+import atexit
+import threading
+
+from aiohttp import ClientSession, ClientTimeout, TCPConnector
+
+from timings import trace_config
+
+# Connection pool settings, overridable from the environment
+CONNECTION_LIMIT = int(os.environ.get("SCRAPER_CONNECTION_LIMIT", 100))
+LIMIT_PER_HOST = int(os.environ.get("SCRAPER_LIMIT_PER_HOST", 8))
+KEEPALIVE_TIMEOUT = float(os.environ.get("SCRAPER_KEEPALIVE_TIMEOUT", 30))
+DNS_CACHE_TTL = int(os.environ.get("SCRAPER_DNS_CACHE_TTL", 300))
+
+# Request timeouts in seconds
+TOTAL_TIMEOUT = float(os.environ.get("SCRAPER_TOTAL_TIMEOUT", 60))
+CONNECT_TIMEOUT = float(os.environ.get("SCRAPER_CONNECT_TIMEOUT", 10))
+READ_TIMEOUT = float(os.environ.get("SCRAPER_READ_TIMEOUT", 30))
+
+_lock = threading.Lock()
+_loop = None
+_session = None
+
+
+def get_loop():
+    """
+    Returns the process-wide event loop, starting it on a daemon thread
+    the first time it is needed.
+
+    Streamlit re-executes the script on every interaction and `asyncio.run`
+    creates a fresh loop each time, which would tie a session to a loop that
+    is about to be closed. Running one loop for the lifetime of the process
+    lets every rerun and every user session share the same connection pool.
+    """
+    global _loop
+    with _lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            thread = threading.Thread(
+                target=_loop.run_forever,
+                name="scraper-http-loop",
+                daemon=True
+            )
+            thread.start()
+        return _loop
+
+
+async def get_session():
+    """
+    Returns the shared `ClientSession`, creating it on first use.
+    Must be awaited from a coroutine running on `get_loop()`.
+    """
+    global _session
+    if _session is None or _session.closed:
+        connector = TCPConnector(
+            limit=CONNECTION_LIMIT,
+            limit_per_host=LIMIT_PER_HOST,
+            keepalive_timeout=KEEPALIVE_TIMEOUT,
+            ttl_dns_cache=DNS_CACHE_TTL,
+            use_dns_cache=True
+        )
+        timeout = ClientTimeout(
+            total=TOTAL_TIMEOUT,
+            connect=CONNECT_TIMEOUT,
+            sock_read=READ_TIMEOUT
+        )
+        _session = ClientSession(
+            connector=connector,
+            timeout=timeout,
+            trace_configs=[trace_config()]
+        )
+    return _session
+
+
+def submit(coro):
+    """Schedules a coroutine on the shared loop and returns its future."""
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
+
+
+def run(coro, timeout=None):
+    """
+    Runs a coroutine on the shared loop and blocks until it returns.
+    Use this instead of `asyncio.run` so the pooled session survives the call.
+    """
+    return submit(coro).result(timeout)
+
+
+async def _close_session():
+    if _session is not None and not _session.closed:
+        await _session.close()
+
+
+@atexit.register
+def close():
+    """Closes the shared session and stops the loop at interpreter shutdown."""
+    if _loop is None or _loop.is_closed() or not _loop.is_running():
+        return
+    try:
+        run(_close_session(), timeout=5)
+    except Exception:
+        pass
+    _loop.call_soon_threadsafe(_loop.stop)
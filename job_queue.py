@@ -0,0 +1,707 @@
+"""
+Job queue for scrapes, persisted in SQLite and drained by worker processes.
+
+Usage:
+    python job_queue.py --workers 4     # run a pool of workers
+    python job_queue.py --stats         # print the queue metrics
+
+The Streamlit pages submit jobs and get a job ID right away, then poll the
+job for progress and its result; the script thread never waits on a fetch,
+a graph run, speech synthesis or a batch. The app starts a pool of its own,
+the only workers its jobs' credentials are handed to.
+"""
+import os
+import sys
+import glob
+import json
+import time
+import uuid
+import atexit
+import signal
+import hashlib
+import socket
+import sqlite3
+import argparse
+import _thread
+import threading
+import subprocess
+import multiprocessing
+
+from timings import ScrapeTimer
+
+# Queue location and worker settings, overridable from the environment
+QUEUE_PATH = os.environ.get("SCRAPER_QUEUE_PATH", os.path.join("jobs", "queue.db"))
+WORKERS = int(os.environ.get("SCRAPER_QUEUE_WORKERS", 4))
+POLL_INTERVAL = float(os.environ.get("SCRAPER_QUEUE_POLL_INTERVAL", 0.2))
+# Finished jobs are dropped after this many days; their results stay in the result store
+RETENTION_DAYS = float(os.environ.get("SCRAPER_QUEUE_RETENTION_DAYS", 7))
+# Longest a worker waits for the secrets of a job it claimed to arrive from the app
+SECRETS_TIMEOUT = 5.0
+HEARTBEAT_INTERVAL = 2.0
+# A worker silent for this long is considered gone
+WORKER_TIMEOUT = 15.0
+
+FINISHED = {"done", "failed"}
+
+
+def code_version():
+    """
+    Returns a fingerprint of the app's modules. Jobs are only claimed by
+    workers running the same code as the app that submitted them.
+    """
+    digest = hashlib.sha256()
+    for path in sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), "*.py"))):
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+CODE_VERSION = code_version()
+
+
+class JobQueue:
+    """
+    Jobs and worker states stored in SQLite (WAL mode), shared by the app
+    and the worker processes. Secrets such as API keys never reach the
+    database: they are handed to the app's `pool` in memory, and the job
+    only records which pool holds them. A finished job only keeps the ID of
+    its run in the result store, and jobs finished more than
+    `retention_days` ago are dropped when the queue is opened.
+    """
+
+    def __init__(self, path=QUEUE_PATH, retention_days=RETENTION_DAYS):
+        self.path = path
+        # WorkerPool that jobs with secrets go to, set by get_job_queue
+        self.pool = None
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        # Deleted rows are overwritten, not left in free pages
+        self._conn.execute("PRAGMA secure_delete=ON")
+        self._conn.execute('''CREATE TABLE IF NOT EXISTS jobs (
+                                id TEXT PRIMARY KEY,
+                                kind TEXT,
+                                user TEXT,
+                                payload TEXT,
+                                pool TEXT,
+                                status TEXT,
+                                progress TEXT,
+                                worker TEXT,
+                                created REAL,
+                                started REAL,
+                                finished REAL,
+                                result TEXT,
+                                error TEXT,
+                                version TEXT,
+                                run_id TEXT
+                            )''')
+        self._conn.execute('''CREATE TABLE IF NOT EXISTS workers (
+                                name TEXT PRIMARY KEY,
+                                pid INTEGER,
+                                busy INTEGER,
+                                busy_seconds REAL,
+                                started REAL,
+                                heartbeat REAL,
+                                version TEXT,
+                                pool TEXT
+                            )''')
+        # Queues created before jobs and workers carried the code version and pool
+        for table in ("jobs", "workers"):
+            columns = [row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")]
+            for column in ("version", "pool"):
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} TEXT")
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")]
+        # Queues created when jobs kept a copy of their result; the result
+        # store has them under the job ID
+        if "run_id" not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN run_id TEXT")
+            self._conn.execute("UPDATE jobs SET run_id = id, result = NULL WHERE result IS NOT NULL")
+        # Queues created when secrets were stored with the job: wipe them,
+        # also from the write-ahead log
+        if "secrets" in columns and self._conn.execute(
+            "SELECT 1 FROM jobs WHERE secrets IS NOT NULL LIMIT 1"
+        ).fetchone():
+            self._conn.execute(
+                '''UPDATE jobs SET secrets = NULL, status = 'failed', progress = 'failed', finished = ?,
+                       error = 'This job was queued with stored credentials, which were removed'
+                   WHERE status = 'queued' AND secrets IS NOT NULL''',
+                (time.time(),)
+            )
+            self._conn.execute("UPDATE jobs SET secrets = NULL WHERE secrets IS NOT NULL")
+            self._conn.commit()
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created)")
+        if retention_days:
+            self._conn.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished < ?",
+                (time.time() - retention_days * 86400,)
+            )
+        self._conn.commit()
+
+    def submit(self, kind, payload, secrets=None, user=None):
+        """
+        Queues a job.
+            Arguments:
+            - kind (str): job type, a key of JOB_HANDLERS
+            - payload (dict): JSON-serializable job arguments
+            - secrets (dict): credentials, handed to the app's worker pool in
+              memory and never written to the database
+            - user (str): user that submitted the job
+            Return:
+            - job_id (str)
+        """
+        job_id = uuid.uuid4().hex
+        pool = None
+        if secrets:
+            if self.pool is None or not self.pool.running():
+                raise RuntimeError("Jobs with credentials need the app's worker pool, which is not running")
+            # Handed over first, so the secrets are there when a worker claims the job
+            self.pool.hand_over(job_id, secrets)
+            pool = self.pool.name
+        with self._lock:
+            self._conn.execute(
+                '''INSERT INTO jobs (id, kind, user, payload, pool, status, progress, created, version)
+                   VALUES (?, ?, ?, ?, ?, 'queued', 'queued', ?, ?)''',
+                (job_id, kind, user, json.dumps(payload), pool, time.time(), CODE_VERSION)
+            )
+            self._conn.commit()
+        return job_id
+
+    def claim(self, worker, pool=None):
+        """
+        Marks the oldest queued job of this code version as running on
+        `worker` and returns it, or None. Jobs whose secrets were handed to
+        a pool are only claimed by the workers of that pool.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                '''UPDATE jobs SET status = 'running', progress = 'started', worker = ?, started = ?
+                   WHERE id = (SELECT id FROM jobs WHERE status = 'queued' AND version = ?
+                                   AND (pool IS NULL OR pool = ?)
+                               ORDER BY created LIMIT 1)
+                   RETURNING id, kind, user, payload, pool''',
+                (worker, time.time(), CODE_VERSION, pool)
+            ).fetchone()
+            self._conn.commit()
+        if row is None:
+            return None
+        job_id, kind, user, payload, job_pool = row
+        return {
+            "id": job_id,
+            "kind": kind,
+            "user": user,
+            "payload": json.loads(payload),
+            "pool": job_pool,
+            "secrets": {}
+        }
+
+    def set_progress(self, job_id, progress):
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET progress = ? WHERE id = ?", (progress, job_id))
+            self._conn.commit()
+
+    def finish(self, job_id, run_id=None, error=None):
+        """Stores the ID of a job's run in the result store, or its error."""
+        with self._lock:
+            self._conn.execute(
+                '''UPDATE jobs SET status = ?, progress = ?, finished = ?, run_id = ?, error = ?
+                   WHERE id = ?''',
+                (
+                    "failed" if error is not None else "done",
+                    "failed" if error is not None else "done",
+                    time.time(),
+                    run_id,
+                    error,
+                    job_id
+                )
+            )
+            self._conn.commit()
+
+    def get(self, job_id):
+        """
+        Returns a job's status, progress, timestamps and result, or None.
+        The result of a finished job is loaded from the result store.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                '''SELECT id, kind, status, progress, worker, created, started, finished, run_id, error
+                   FROM jobs WHERE id = ?''',
+                (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        keys = ["id", "kind", "status", "progress", "worker", "created", "started", "finished", "run_id", "error"]
+        job = dict(zip(keys, row))
+        job["result"] = None
+        if job["run_id"] is not None:
+            from result_store import get_result_store
+            job["result"] = get_result_store().load(job["run_id"])
+        return job
+
+    def heartbeat(self, worker, busy, busy_seconds, pool=None):
+        with self._lock:
+            now = time.time()
+            self._conn.execute(
+                '''INSERT INTO workers (name, pid, busy, busy_seconds, started, heartbeat, version, pool)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (name) DO UPDATE SET busy = excluded.busy,
+                       busy_seconds = excluded.busy_seconds, heartbeat = excluded.heartbeat''',
+                (worker, os.getpid(), int(busy), busy_seconds, now, now, CODE_VERSION, pool)
+            )
+            self._conn.commit()
+
+    def remove_worker(self, worker):
+        with self._lock:
+            self._conn.execute("DELETE FROM workers WHERE name = ?", (worker,))
+            self._conn.commit()
+
+    def fail_orphans(self, live_pool=None):
+        """
+        Fails running jobs whose worker stopped, since their secrets are gone
+        and they cannot be retried, queued jobs of another code version that
+        no live worker can claim, and queued jobs whose secrets went with a
+        pool that stopped. `live_pool` names a pool that is starting up.
+        """
+        with self._lock:
+            self._conn.execute(
+                '''UPDATE jobs SET status = 'failed', progress = 'failed', finished = ?,
+                       error = 'The worker running this job stopped'
+                   WHERE status = 'running' AND worker NOT IN
+                       (SELECT name FROM workers WHERE heartbeat > ?)''',
+                (time.time(), time.time() - WORKER_TIMEOUT)
+            )
+            self._conn.execute(
+                '''UPDATE jobs SET status = 'failed', progress = 'failed', finished = ?,
+                       error = 'This job was queued by an earlier version of the app'
+                   WHERE status = 'queued' AND version IS NOT ? AND version NOT IN
+                       (SELECT version FROM workers WHERE heartbeat > ? AND version IS NOT NULL)''',
+                (time.time(), CODE_VERSION, time.time() - WORKER_TIMEOUT)
+            )
+            self._conn.execute(
+                '''UPDATE jobs SET status = 'failed', progress = 'failed', finished = ?,
+                       error = 'The worker pool holding the credentials of this job stopped'
+                   WHERE status = 'queued' AND pool IS NOT NULL AND pool IS NOT ? AND pool NOT IN
+                       (SELECT pool FROM workers WHERE heartbeat > ? AND pool IS NOT NULL)''',
+                (time.time(), live_pool, time.time() - WORKER_TIMEOUT)
+            )
+            self._conn.commit()
+
+    def live_workers(self):
+        """Returns the name, pid and code version of every worker with a recent heartbeat."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT name, pid, version FROM workers WHERE heartbeat > ?", (time.time() - WORKER_TIMEOUT,)
+            ).fetchall()
+
+    def metrics(self):
+        """
+        Returns the queue depth, running and finished job counts, the live
+        workers running this code version and their utilization: the share
+        of their lifetime spent on jobs, and the share busy right now. Live
+        workers of other versions are counted as `stale_workers`.
+        """
+        now = time.time()
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+            workers = self._conn.execute(
+                "SELECT busy, busy_seconds, started FROM workers WHERE heartbeat > ? AND version = ?",
+                (now - WORKER_TIMEOUT, CODE_VERSION)
+            ).fetchall()
+            stale = self._conn.execute(
+                "SELECT COUNT(*) FROM workers WHERE heartbeat > ? AND version IS NOT ?",
+                (now - WORKER_TIMEOUT, CODE_VERSION)
+            ).fetchone()[0]
+            oldest = self._conn.execute(
+                "SELECT MIN(created) FROM jobs WHERE status = 'queued'"
+            ).fetchone()[0]
+        uptime = sum(now - started for _, _, started in workers)
+        return {
+            "queued": counts.get("queued", 0),
+            "running": counts.get("running", 0),
+            "done": counts.get("done", 0),
+            "failed": counts.get("failed", 0),
+            "oldest_wait": round(now - oldest, 1) if oldest is not None else 0.0,
+            "workers": len(workers),
+            "stale_workers": stale,
+            "busy_workers": sum(busy for busy, _, _ in workers),
+            "utilization": round(sum(busy_seconds for _, busy_seconds, _ in workers) / uptime, 3) if uptime else 0.0
+        }
+
+
+class JobTimer(ScrapeTimer):
+    """ScrapeTimer that reports each finished stage as the job's progress."""
+
+    def __init__(self, report):
+        super().__init__()
+        self._report = report
+
+    def add(self, stage, seconds):
+        super().add(stage, seconds)
+        self._report(stage)
+
+
+def _log_scrape(job, timer, duration):
+    import log_writer
+    payload = job["payload"]
+    try:
+        writer = log_writer.get_log_writer()
+        writer.write(
+            time.strftime("%Y-%m-%d %H:%M:%S"), job["user"], payload["provider"],
+            payload["url"], payload["prompt"], round(duration, 2),
+            **log_writer.scrape_metrics(payload["url"], timer)
+        )
+    except sqlite3.Error as e:
+        print("Error inserting log:", e)
+
+
+def run_scrape_job(job, report):
+    """Runs a provider scrape, see `scraper.run_scraper_async`."""
+    import http_session
+    from scraper import run_scraper_async
+
+    payload, secrets = job["payload"], job["secrets"]
+    timer = JobTimer(lambda stage: report(f"{stage} done"))
+    start_time = time.time()
+    result = http_session.run(run_scraper_async(
+        payload["url"], payload["prompt"], payload["provider"],
+        secrets.get("api_key"), secrets.get("api_id"), payload.get("schema"), timer=timer,
+        mode=payload.get("mode", "single"), backups=secrets.get("backups")
+    ))
+    # Stored here rather than by the worker loop, so the serialize stage
+    # times the real encoding and write, and the log row comes after it
+    with timer.stage("serialize"):
+        job["run_id"] = _store_result(job, result)
+    _log_scrape(job, timer, time.time() - start_time)
+    return result
+
+
+def run_graph_task_job(job, report):
+    """Runs a SmartScraperGraph scrape, see `task.task`."""
+    from helper import ensure_playwright_browsers
+    from task import task
+
+    payload = job["payload"]
+    report("preparing browsers")
+    ensure_playwright_browsers()
+    report("running graph")
+    return task(
+        job["secrets"].get("api_key"), payload["url"], payload["prompt"], payload["model"],
+        base_url=payload.get("base_url")
+    )
+
+
+def run_bedrock_graph_job(job, report):
+    """Runs a SmartScraperGraph on an Amazon Bedrock model."""
+    from helper import ensure_playwright_browsers
+    from scrapegraphai.graphs import SmartScraperGraph
+    from graph_pool import get_graph_pool
+    from bedrock_clients import get_bedrock_client
+
+    payload = job["payload"]
+    report("preparing browsers")
+    ensure_playwright_browsers()
+    # Runs with the same region and credentials share one pooled client
+    config = {
+        "llm": {
+            "client": get_bedrock_client(payload["region"], **job["secrets"]),
+            "model": f"bedrock/{payload['model']}",
+            "temperature": payload["temperature"]
+        }
+    }
+    report("running graph")
+    with get_graph_pool().checkout(
+        SmartScraperGraph, payload["prompt"], payload["url"], config, model_tokens=payload.get("model_tokens")
+    ) as graph:
+        return graph.run()
+
+
+def run_speech_job(job, report):
+    """Reads out the answer about a page, see `text_to_speech.text_to_speech`."""
+    from text_to_speech import text_to_speech
+
+    payload = job["payload"]
+    report("answering")
+    # Segments land in the run directory of the job, where the page plays them
+    return text_to_speech(
+        job["secrets"].get("api_key"), payload["prompt"], payload["url"], base_url=payload.get("base_url"),
+        run_id=job["id"], on_answer=lambda answer: report("synthesizing speech"),
+        on_segment=lambda path, number: report(f"segment {number + 1} ready")
+    )
+
+
+def run_batch_job(job, report):
+    """Runs a batch of scrapes, see `batch.run_batch`."""
+    import http_session
+    from batch import run_batch
+
+    payload = job["payload"]
+    total = len(payload["jobs"])
+    state = {"done": 0, "reported": 0.0}
+
+    def on_result(record):
+        state["done"] += 1
+        # Runs on the event loop, so progress is written at most twice a second
+        if state["done"] == total or time.monotonic() - state["reported"] >= 0.5:
+            state["reported"] = time.monotonic()
+            report(f"{state['done']}/{total} pages scraped")
+
+    summary = http_session.run(run_batch(
+        payload["jobs"], payload["output_path"], job["secrets"]["credentials"],
+        concurrency=payload["concurrency"], per_host=payload["per_host"], on_result=on_result
+    ))
+    return dict(summary, output_path=payload["output_path"])
+
+
+def _store_result(job, result):
+    """
+    Keeps a job's result in the result store, where it can be downloaded and
+    queried, and returns its run ID. The job fails if it cannot be stored.
+    """
+    from result_store import get_result_store
+    payload = job["payload"]
+    get_result_store().save(
+        job["id"], result, kind=job["kind"], user=job["user"], url=payload.get("url"),
+        provider=payload.get("provider") or payload.get("model")
+    )
+    return job["id"]
+
+
+# Job kinds and the functions that run them
+JOB_HANDLERS = {
+    "scrape": run_scrape_job,
+    "graph_task": run_graph_task_job,
+    "bedrock_graph": run_bedrock_graph_job,
+    "speech": run_speech_job,
+    "batch": run_batch_job
+}
+
+
+def _take_secrets(secrets, job_id):
+    """Removes and returns the secrets handed over for a job, waiting a little for them to arrive."""
+    deadline = time.monotonic() + SECRETS_TIMEOUT
+    while True:
+        job_secrets = secrets.pop(job_id, None) if secrets is not None else None
+        if job_secrets is not None or time.monotonic() >= deadline:
+            return job_secrets
+        time.sleep(0.05)
+
+
+def worker_loop(path=QUEUE_PATH, name=None, stop=None, pool=None, secrets=None):
+    """
+    Claims and runs jobs until `stop` is set. Each job runs to completion
+    before the next is claimed; the worker's heartbeat and busy time are
+    kept up to date from a separate thread, also during long jobs. Workers
+    of a `pool` also claim its jobs, taking their credentials from the
+    `secrets` mapping the pool fills.
+    """
+    queue = JobQueue(path)
+    name = name or f"{socket.gethostname()}-{os.getpid()}"
+    stop = stop or threading.Event()
+    state = {"busy": False, "busy_seconds": 0.0, "since": None}
+
+    def beat():
+        while not stop.wait(HEARTBEAT_INTERVAL):
+            busy_seconds = state["busy_seconds"]
+            if state["since"] is not None:
+                busy_seconds += time.time() - state["since"]
+            queue.heartbeat(name, state["busy"], busy_seconds, pool)
+
+    queue.heartbeat(name, False, 0.0, pool)
+    threading.Thread(target=beat, name="job-heartbeat", daemon=True).start()
+    try:
+        while not stop.is_set():
+            job = queue.claim(name, pool)
+            if job is None:
+                stop.wait(POLL_INTERVAL)
+                continue
+            state["busy"], state["since"] = True, time.time()
+            try:
+                if job["pool"] is not None:
+                    job["secrets"] = _take_secrets(secrets, job["id"])
+                    if job["secrets"] is None:
+                        raise RuntimeError("The credentials of this job did not reach its worker")
+                handler = JOB_HANDLERS[job["kind"]]
+                result = handler(job, lambda progress: queue.set_progress(job["id"], progress))
+                # Handlers that store their result themselves set its run ID
+                run_id = job.get("run_id") or _store_result(job, result)
+                queue.finish(job["id"], run_id=run_id)
+            except Exception as e:
+                queue.finish(job["id"], error=str(e))
+            finally:
+                state["busy_seconds"] += time.time() - state["since"]
+                state["busy"], state["since"] = False, None
+    except KeyboardInterrupt:
+        pass
+    finally:
+        queue.remove_worker(name)
+        # Log rows are written in batches; the last one goes out now, since
+        # worker processes exit without running atexit handlers
+        if "log_writer" in sys.modules:
+            sys.modules["log_writer"].close_log_writer()
+
+
+def _worker_process(path, pool, secrets, count):
+    import politeness
+    import provider_gateway
+
+    # Terminating a worker lets it finish its log batch and sign off
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    # The pool's workers share the per-host and per-provider limits
+    politeness.share_limits(count)
+    provider_gateway.share_limits(count)
+    worker_loop(path, pool=pool, secrets=secrets)
+
+
+def _receive_secrets(secrets):
+    """Fills `secrets` with the job secrets the app writes to the pool's stdin, one JSON line per job."""
+    for line in sys.stdin:
+        entry = json.loads(line)
+        secrets[entry["id"]] = entry["secrets"]
+    # The app closed the pipe, or exited without stopping the pool
+    os.kill(os.getpid(), signal.SIGTERM)
+
+
+def run_workers(count=WORKERS, path=QUEUE_PATH, pool=None):
+    """
+    Runs `count` worker processes until interrupted or terminated. A pool
+    started by the app is named `pool` and receives the secrets of its jobs
+    on stdin; they are kept in the memory of a manager process shared by
+    its workers. The per-host and per-provider limits are divided between
+    the workers.
+    """
+    JobQueue(path).fail_orphans(live_pool=pool)
+    manager = secrets = None
+    if pool is not None:
+        manager = multiprocessing.Manager()
+        secrets = manager.dict()
+        threading.Thread(target=_receive_secrets, args=(secrets,), name="job-secrets", daemon=True).start()
+    processes = [
+        multiprocessing.Process(
+            target=_worker_process, args=(path, pool, secrets, count), name=f"job-worker-{number}", daemon=True
+        )
+        for number in range(count)
+    ]
+    for process in processes:
+        process.start()
+    # Stop the workers along with the pool, also when the app terminates it
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join(timeout=5)
+    finally:
+        if manager is not None:
+            manager.shutdown()
+
+
+class WorkerPool:
+    """
+    Worker pool subprocess started by the app. Job secrets are written to
+    its stdin and only ever held in memory; the pool stops when the app
+    stops it or exits.
+    """
+
+    def __init__(self, path=QUEUE_PATH, count=WORKERS):
+        self.name = uuid.uuid4().hex
+        self._lock = threading.Lock()
+        self.process = subprocess.Popen(
+            [
+                sys.executable, os.path.abspath(__file__), "--workers", str(count),
+                "--queue", os.path.abspath(path), "--pool", self.name
+            ],
+            stdin=subprocess.PIPE
+        )
+
+    def running(self):
+        return self.process.poll() is None
+
+    def hand_over(self, job_id, secrets):
+        """Sends the secrets of a job to the pool."""
+        line = json.dumps({"id": job_id, "secrets": secrets}) + "\n"
+        with self._lock:
+            try:
+                self.process.stdin.write(line.encode("utf-8"))
+                self.process.stdin.flush()
+            except (OSError, ValueError) as e:
+                raise RuntimeError(f"The worker pool stopped: {e}") from e
+
+    def stop(self):
+        """Stops the pool with its workers."""
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+
+
+_queue = None
+_pool = None
+_queue_lock = threading.Lock()
+
+
+def stop_stale_workers(queue):
+    """
+    Terminates the live workers on this host that run another code version,
+    e.g. left running by an app that was killed before it could stop them.
+    Their pool exits once its workers are gone.
+    """
+    host = socket.gethostname()
+    for name, pid, version in queue.live_workers():
+        if version != CODE_VERSION and name.startswith(f"{host}-"):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError:
+                pass
+            queue.remove_worker(name)
+
+
+def get_job_queue():
+    """
+    Returns the process-wide job queue. Unless SCRAPER_QUEUE_WORKERS is 0,
+    the app's own worker pool is started in a subprocess, after stopping the
+    workers of older versions, and restarted if it stopped. Jobs with
+    credentials run on this pool only. The pool is stopped when the app exits.
+    """
+    global _queue, _pool
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue()
+        if WORKERS > 0 and (_pool is None or not _pool.running()):
+            stop_stale_workers(_queue)
+            _queue.fail_orphans()
+            _pool = WorkerPool(_queue.path)
+            _queue.pool = _pool
+            atexit.register(_pool.stop)
+        return _queue
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the scrape job workers.")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="number of worker processes")
+    parser.add_argument("--queue", default=QUEUE_PATH, help="queue database")
+    parser.add_argument("--pool", help="name of the pool, when started by the app")
+    parser.add_argument("--stats", action="store_true", help="print the queue metrics and exit")
+    args = parser.parse_args(argv)
+    if args.stats:
+        print(json.dumps(JobQueue(args.queue).metrics()))
+        return 0
+    run_workers(args.workers, args.queue, args.pool)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
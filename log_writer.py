@@ -0,0 +1,224 @@
+import os
+import json
+import time
+import queue
+import atexit
+import sqlite3
+import threading
+from urllib.parse import urlsplit
+
+# Define the database file path
+LOGS_DIR = "logs"
+DB_PATH = os.path.join(LOGS_DIR, "user_logs.db")
+
+# Columns of the logs table, in insert order
+LOG_COLUMNS = ["timestamp", "user", "provider", "url", "prompt", "duration"]
+
+# Per-scrape measurements stored next to each log row, with their types
+METRIC_COLUMNS = {
+    "domain": "TEXT",
+    "status": "INTEGER",
+    "provider_status": "INTEGER",
+    "bytes": "INTEGER",
+    "cache": "TEXT",
+    "timings": "TEXT"
+}
+
+
+def scrape_metrics(url, timer):
+    """Returns the METRIC_COLUMNS values of a scrape from its ScrapeTimer."""
+    return {
+        "domain": urlsplit(url).hostname,
+        "status": timer.status,
+        "provider_status": timer.provider_status,
+        "bytes": timer.bytes,
+        "cache": timer.cache,
+        "timings": timer.as_dict()
+    }
+
+
+class LogWriter:
+    """
+    Batched writer for the usage log.
+
+    A single background thread owns the SQLite connection (in WAL mode),
+    drains queued entries and inserts them in one transaction per batch,
+    so scrapes never wait on a commit or contend for the database lock.
+    """
+
+    def __init__(self, path=DB_PATH, batch_size=200, flush_interval=1.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._ready = threading.Event()
+        self._error = None
+        # Per-row commit cost of the last batch, in milliseconds
+        self.row_write_ms = 0.0
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._error is not None:
+            raise self._error
+
+    def write(self, timestamp, user, provider, url, prompt, duration, **metrics):
+        """
+        Queues one log entry; it is written with the next batch.
+        `metrics` fills the METRIC_COLUMNS, `timings` being a dict of stage
+        timings in milliseconds. Since the row is committed later, its
+        `log_write` timing is the per-row cost of the most recent batch.
+        """
+        if metrics.get("timings") is not None:
+            timings = dict(metrics["timings"])
+            timings.setdefault("log_write", round(self.row_write_ms, 3))
+            metrics["timings"] = json.dumps(timings)
+        self._queue.put(
+            (timestamp, user, provider, url, prompt, duration)
+            + tuple(metrics.get(column) for column in METRIC_COLUMNS)
+        )
+
+    def flush(self, timeout=None):
+        """Blocks until every entry queued so far has been committed."""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout=5):
+        """Flushes pending entries and stops the writer thread."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout)
+
+    def _connect(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute('''CREATE TABLE IF NOT EXISTS logs (
+                            id INTEGER PRIMARY KEY AUTOINCREMENT,
+                            timestamp TEXT,
+                            user TEXT,
+                            provider TEXT,
+                            url TEXT,
+                            prompt TEXT,
+                            duration REAL
+                        )''')
+        # Databases created before the metric columns existed get them added
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(logs)")}
+        for column, column_type in METRIC_COLUMNS.items():
+            if column not in existing:
+                conn.execute(f"ALTER TABLE logs ADD COLUMN {column} {column_type}")
+        conn.execute("CREATE INDEX IF NOT EXISTS logs_timestamp ON logs (timestamp)")
+        conn.execute("CREATE INDEX IF NOT EXISTS logs_user ON logs (user)")
+        conn.execute("CREATE INDEX IF NOT EXISTS logs_provider ON logs (provider)")
+        conn.execute("CREATE INDEX IF NOT EXISTS logs_domain ON logs (domain)")
+        conn.commit()
+        return conn
+
+    def _insert(self, conn, rows):
+        if not rows:
+            return
+        columns = LOG_COLUMNS + list(METRIC_COLUMNS)
+        start_time = time.perf_counter()
+        try:
+            with conn:
+                conn.executemany(
+                    f'''INSERT INTO logs ({", ".join(columns)})
+                        VALUES ({", ".join("?" for _ in columns)})''',
+                    rows
+                )
+            self.row_write_ms = (time.perf_counter() - start_time) * 1000 / len(rows)
+        except sqlite3.Error as e:
+            print(f"Error inserting {len(rows)} log entries:", e)
+
+    def _run(self):
+        try:
+            conn = self._connect()
+        except sqlite3.Error as e:
+            self._error = e
+            self._ready.set()
+            return
+        self._ready.set()
+
+        running = True
+        while running:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            # Gather whatever else is already queued into the same batch
+            rows, waiters = [], []
+            while True:
+                if item is None:
+                    running = False
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    rows.append(item)
+                if len(rows) >= self.batch_size:
+                    self._insert(conn, rows)
+                    rows = []
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            self._insert(conn, rows)
+            for waiter in waiters:
+                waiter.set()
+
+        conn.close()
+
+
+def read_recent_logs(limit=5000, path=DB_PATH):
+    """
+    Returns the most recent log rows that carry timings, newest first.
+    Uses its own read-only connection, WAL lets it run alongside the writer.
+    """
+    if not os.path.exists(path):
+        return []
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=30)
+    try:
+        rows = conn.execute(
+            '''SELECT timestamp, provider, domain, duration, status, bytes, cache, timings
+               FROM logs WHERE timings IS NOT NULL
+               ORDER BY id DESC LIMIT ?''',
+            (limit,)
+        ).fetchall()
+    except sqlite3.OperationalError:
+        # The writer has not migrated this database yet
+        return []
+    finally:
+        conn.close()
+    keys = ["timestamp", "provider", "domain", "duration", "status", "bytes", "cache", "timings"]
+    logs = [dict(zip(keys, row)) for row in rows]
+    for log in logs:
+        log["timings"] = json.loads(log["timings"])
+    return logs
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_log_writer():
+    """Returns the process-wide log writer, starting it on first use."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = LogWriter()
+            atexit.register(_writer.close)
+        return _writer
+
+
+def close_log_writer():
+    """
+    Flushes and stops the process-wide log writer, if it was started. For
+    processes that exit without running atexit handlers, e.g. queue workers.
+    """
+    with _writer_lock:
+        if _writer is not None:
+            _writer.close()
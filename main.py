@@ -2,14 +2,18 @@
 import sys
 import asyncio
 import os
-import requests
 import streamlit as st
 import time
 import json
-import sqlite3
-from helper import playwright_install
-from aiohttp import ClientSession
-from bs4 import BeautifulSoup
+from helper import playwright_install, add_download_options
+from exporters import read_jsonl
+from providers import PROVIDER_URLS
+from result_cache import get_cache
+from log_writer import read_recent_logs
+from job_queue import get_job_queue, FINISHED
+from result_store import get_result_store
+from timings import STAGES, latency_table
+from batch import parse_jobs, DEFAULT_CONCURRENCY, DEFAULT_PER_HOST
 
 # Set up the event loop
 if sys.platform.startswith("win"):
@@ -27,53 +31,8 @@ st.set_page_config(page_title="Scrapegraph-ai demo", page_icon="🕷")
 # Install playwright browsers
 playwright_install()
 
-# Check and create logs directory if it doesn't exist
-logs_dir = "logs"
-if not os.path.exists(logs_dir):
-    os.makedirs(logs_dir)
-
-# Define the database file path
-db_path = os.path.join(logs_dir, "user_logs.db")
-
-# Function to initialize the database
-def init_db():
-    conn = sqlite3.connect(db_path)  # Connect to the database
-    c = conn.cursor()
-    
-    # Create logs table if it doesn't exist
-    c.execute('''CREATE TABLE IF NOT EXISTS logs (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp TEXT,
-                    user TEXT,
-                    provider TEXT,
-                    url TEXT,
-                    prompt TEXT,
-                    duration REAL
-                )''')
-    conn.commit()
-    conn.close()  # Close the connection
-
-# Initialize the database
-try:
-    init_db()
-    print("Database initialized successfully.")
-except sqlite3.OperationalError as e:
-    print("Operational error while initializing the database:", e)
-
-# Function to insert a log entry
-def insert_log(timestamp, user, provider, url, prompt, duration):
-    try:
-        conn = sqlite3.connect("logs/user_logs.db")
-        cursor = conn.cursor()
-        cursor.execute('''INSERT INTO logs (timestamp, user, provider, url, prompt, duration)
-                          VALUES (?, ?, ?, ?, ?, ?)''',
-                       (timestamp, user, provider, url, prompt, duration))
-        conn.commit()
-    except Exception as e:
-        st.error(f"Error inserting log: {e}")
-    finally:
-        conn.close()  # Close the connection
-
+# Batch results are streamed into this directory
+results_dir = "results"
 
 # Sidebar content
 with st.sidebar:
@@ -92,6 +51,23 @@ with st.sidebar:
     st.write("You want to suggest tips or improvements? Contact me through email to mvincig11@gmail.com")
     st.markdown("""---""")
     st.write("Follow our [Github page](https://github.com/ScrapeGraphAI)")
+    st.markdown("""---""")
+    cache_stats = get_cache().stats()
+    st.write("# Result cache")
+    hits_col, misses_col = st.columns(2)
+    hits_col.metric("Hits", cache_stats["hits"])
+    misses_col.metric("Misses", cache_stats["misses"])
+    st.caption(f"{cache_stats['entries']} entries, {cache_stats['bytes'] / 1024:.0f} KB")
+    st.markdown("""---""")
+    queue_stats = get_job_queue().metrics()
+    st.write("# Job queue")
+    queued_col, running_col = st.columns(2)
+    queued_col.metric("Queued", queue_stats["queued"])
+    running_col.metric("Running", queue_stats["running"])
+    st.caption(
+        f"{queue_stats['workers']} workers, {queue_stats['busy_workers']} busy, "
+        f"{queue_stats['utilization']:.0%} utilization"
+    )
 
 # Main app content
 st.title("Scrapegraph-ai")
@@ -103,14 +79,7 @@ st.title('Scrapegraph-api')
 st.write("### Refill at this page [Github page](https://scrapegraphai.com)")
 
 # AI provider selection
-ai_providers = {
-    "DeepAI": "https://api.deepai.org/api/summarization",
-    "MeaningCloud": "https://api.meaningcloud.com/summarization-1.0",
-    "Diffbot": "https://api.diffbot.com/v3/article",
-    "TextRazor": "https://api.textrazor.com",
-    "Aylien": "https://api.aylien.com/api/v1/summarize"
-}
-selected_provider = st.selectbox('Select AI Provider', list(ai_providers.keys()))
+selected_provider = st.selectbox('Select AI Provider', list(PROVIDER_URLS.keys()))
 
 # Session user auth
 if 'authenticated' not in st.session_state:
@@ -143,6 +112,26 @@ else:
     api_id = st.text_input('Enter your Aylien Application ID:')
     api_key = st.text_input('Enter your Aylien API key:', type="password")
 
+# Several providers per run: the first answer wins, or backups are only
+# asked when the selected provider is slower than usual
+provider_modes = {
+    "Selected provider only": "single",
+    "Fastest of several providers": "fastest",
+    "Hedged: ask a backup when slow": "hedged"
+}
+provider_mode = provider_modes[st.radio('Provider mode', list(provider_modes.keys()), horizontal=True)]
+backups = {}
+if provider_mode != "single":
+    backup_names = st.multiselect(
+        'Backup providers, in order of preference:',
+        [name for name in PROVIDER_URLS if name != selected_provider]
+    )
+    for name in backup_names:
+        backup_id = st.text_input(f'Enter your {name} Application ID:') if name == "Aylien" else None
+        backup_key = st.text_input(f'Enter your {name} API key:', type="password")
+        if backup_key and (name != "Aylien" or backup_id):
+            backups[name] = (backup_key, backup_id)
+
 # Get the URL, prompt, and optional schema from the user
 url = st.text_input('Enter the URL to scrape:')
 prompt = st.text_input('Enter your prompt:')
@@ -162,96 +151,182 @@ def validate_input(selected_provider, url, prompt, api_key, api_id=None):
             return False, f"Error: For {selected_provider}, the API key is required."
     return True, ""
 
-# Async scraper using aiohttp + BeautifulSoup
-async def run_scraper_async(url, prompt, headers, schema=None):
-    async with ClientSession() as session:
-        try:
-            async with session.get(url) as response:
-                html = await response.text()
-                soup = BeautifulSoup(html, 'html.parser')
-                preview_text = soup.get_text()[:1000]
-
-                # Basic local scraping
-                result = {
-                    "provider": selected_provider,
-                    "prompt": prompt,
-                    "title": soup.title.string if soup.title else "No title",
-                    "schema_data": {},
-                    "length": len(html),
-                    "preview": preview_text
-                }
-
-                if schema:
-                    result["schema_data"] = {
-                        key.strip(): [el.get_text(strip=True) for el in soup.find_all(key.strip())]
-                        for key in schema.split(',') if key.strip()
-                    }
-
-                # Send preview to selected provider API
-                provider_url = ai_providers[selected_provider]
-
-                # Request payloads differ by provider
-                if selected_provider == "DeepAI":
-                    api_response = requests.post(provider_url, data={"text": preview_text}, headers=headers)
-                    result["api_result"] = api_response.json()
-                elif selected_provider == "MeaningCloud":
-                    api_response = requests.post(provider_url, data={"key": api_key, "txt": preview_text, "sentences": 5})
-                    result["api_result"] = api_response.json()
-                elif selected_provider == "Diffbot":
-                    params = {"token": api_key, "url": url, "discussion": "false"}
-                    api_response = requests.get(provider_url, params=params)
-                    result["api_result"] = api_response.json()
-                elif selected_provider == "TextRazor":
-                    headers.update({"x-textrazor-key": api_key})
-                    api_response = requests.post(provider_url, data={"text": preview_text, "extractors": "entities,topics"}, headers=headers)
-                    result["api_result"] = api_response.json()
-                elif selected_provider == "Aylien":
-                    headers.update({"X-AYLIEN-TextAPI-Application-ID": api_id, "X-AYLIEN-TextAPI-Application-Key": api_key})
-                    api_response = requests.post(provider_url, data={"text": preview_text}, headers=headers)
-                    result["api_result"] = api_response.json()
-
-                return result
-
-        except Exception as e:
-            return {"error": str(e)}
-
-# Start scraping on button press
+# Start scraping on button press: the scrape runs on a queue worker
 if st.button('Start Scraping'):
     is_valid, error_message = validate_input(selected_provider, url, prompt, api_key, api_id)
     if not is_valid:
         st.error(error_message)
+    elif provider_mode != "single" and not backups:
+        st.error("Error: Add at least one backup provider with its credentials.")
     else:
-        start_time = time.time()
-        headers = {"Authorization": f"Bearer {api_key}"} if selected_provider not in ["TextRazor", "Aylien"] else {}
-
-        with st.spinner("Scraping in progress. Please wait..."):
-            try:
-                result = asyncio.run(run_scraper_async(url, prompt, headers, schema))
-                duration = time.time() - start_time
-
-                st.success("Scraping completed successfully!")
-                st.toast(f"Done in {duration:.2f} seconds", icon='✅')
-
-                st.write("Result:")
-                st.write(result)
-
-                json_filename = "scrape_result.json"
-                with open(json_filename, "w", encoding="utf-8") as f:
-                    json.dump(result, f, ensure_ascii=False, indent=2)
-
-                with open(json_filename, "rb") as f:
-                    st.download_button("Download JSON Result", data=f, file_name=json_filename, mime="application/json")
-
-                insert_log(
-                    time.strftime("%Y-%m-%d %H:%M:%S"),
-                    st.session_state.username,
-                    selected_provider,
-                    url,
-                    prompt,
-                    round(duration, 2)
+        st.session_state.scrape_job = get_job_queue().submit(
+            "scrape",
+            {"url": url, "prompt": prompt, "provider": selected_provider, "schema": schema or None,
+             "mode": provider_mode},
+            secrets={"api_key": api_key, "api_id": api_id, "backups": backups},
+            user=st.session_state.username
+        )
+
+
+def show_scrape_job(job):
+    """Shows the progress of a scrape job, or its result once it is done."""
+    if job["status"] == "queued":
+        st.info(f"Job {job['id'][:8]} is queued, {time.time() - job['created']:.0f}s so far.")
+    elif job["status"] == "running":
+        st.info(f"Scraping in progress ({job['progress']}), {time.time() - job['started']:.1f}s so far.")
+    elif job["status"] == "failed":
+        st.error(f"Unexpected error occurred: {job['error']}")
+    else:
+        result = job["result"]
+        st.success("Scraping completed successfully!")
+        st.write("Result:")
+        st.write(result)
+
+        if st.session_state.get("announced_job") != job["id"]:
+            st.toast(f"Done in {job['finished'] - job['started']:.2f} seconds", icon='✅')
+            st.session_state.announced_job = job["id"]
+
+        # The worker stored the result under the job ID, already serialized
+        data = get_result_store().load_json(job["id"]) or json.dumps(result, ensure_ascii=False).encode("utf-8")
+        st.download_button(
+            "Download JSON Result", data=data, file_name=f"scrape_result_{job['id'][:8]}.json",
+            mime="application/json"
+        )
+
+
+# Polls the queue while the job is pending, without rerunning the whole page
+@st.fragment(run_every=1.0)
+def scrape_job_progress(job_id):
+    job = get_job_queue().get(job_id)
+    show_scrape_job(job)
+    if job["status"] in FINISHED:
+        st.rerun()
+
+
+if st.session_state.get("scrape_job"):
+    job = get_job_queue().get(st.session_state.scrape_job)
+    if job is None:
+        st.session_state.scrape_job = None
+    elif job["status"] in FINISHED:
+        show_scrape_job(job)
+    else:
+        scrape_job_progress(job["id"])
+
+# Earlier results of this user, served from the result store
+with st.expander("Past results"):
+    past_url = st.text_input("Only results for the URL:", key="past_url")
+    runs = get_result_store().query(user=st.session_state.username, url=past_url or None, limit=50)
+    if not runs:
+        st.write("No stored results yet.")
+    else:
+        labels = {
+            f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(run['created']))} {run['kind']} "
+            f"{run['url'] or ''} ({run['provider'] or '-'})": run["run_id"]
+            for run in runs
+        }
+        run_id = labels[st.selectbox("Result", list(labels.keys()))]
+        st.download_button(
+            "Download selected result", data=get_result_store().load_json(run_id),
+            file_name=f"scrape_result_{run_id[:8]}.json", mime="application/json"
+        )
+
+
+def show_batch_job(job):
+    """Shows the progress of a batch job, or its summary once it is done."""
+    if job["status"] == "queued":
+        st.info(f"Batch {job['id'][:8]} is queued, {time.time() - job['created']:.0f}s so far.")
+    elif job["status"] == "running":
+        # Progress reads "<done>/<total> pages scraped" once the first page is done
+        done, _, total = job["progress"].partition(" ")[0].partition("/")
+        fraction = int(done) / int(total) if done.isdigit() and total.isdigit() else 0.0
+        st.progress(fraction, text=job["progress"])
+    elif job["status"] == "failed":
+        st.error(f"Unexpected error occurred: {job['error']}")
+    else:
+        summary = job["result"]
+        st.progress(1.0, text=f"{summary['jobs']}/{summary['jobs']} pages scraped")
+        st.success(f"Batch completed in {summary['duration']:.2f} seconds, {summary['failed']} failed.")
+        st.session_state.batch_output = summary["output_path"]
+
+
+# Polls the queue while the batch is pending, without rerunning the whole page
+@st.fragment(run_every=1.0)
+def batch_job_progress(job_id):
+    job = get_job_queue().get(job_id)
+    show_batch_job(job)
+    if job["status"] in FINISHED:
+        st.rerun()
+
+
+# Batch scraping from an uploaded URL list or JSONL file
+with st.expander("Batch scraping"):
+    batch_file = st.file_uploader("Upload a URL list or a JSONL file", type=["txt", "jsonl"])
+    concurrency = st.slider("Concurrent scrapes", min_value=1, max_value=100, value=DEFAULT_CONCURRENCY)
+    per_host = st.slider("Concurrent scrapes per host", min_value=1, max_value=20, value=DEFAULT_PER_HOST)
+
+    if st.button('Start Batch'):
+        if batch_file is None:
+            st.error("Error: Upload a file with the URLs to scrape.")
+        elif not api_key or (selected_provider == "Aylien" and not api_id):
+            st.error(f"Error: The {selected_provider} credentials are required.")
+        else:
+            lines = batch_file.getvalue().decode("utf-8", errors="replace").splitlines()
+            # Invalid lines are skipped and listed; the valid ones still run
+            errors = []
+            jobs = list(parse_jobs(lines, prompt=prompt, schema=schema or None, provider=selected_provider, errors=errors))
+            if errors:
+                shown = "\n".join(f"- {error}" for error in errors[:20])
+                more = f"\n- and {len(errors) - 20} more" if len(errors) > 20 else ""
+                st.warning(f"Skipped {len(errors)} invalid lines:\n{shown}{more}")
+
+            if not jobs:
+                st.error("Error: The file has no valid URLs to scrape.")
+            else:
+                os.makedirs(results_dir, exist_ok=True)
+                output_path = os.path.abspath(os.path.join(
+                    results_dir,
+                    f"batch_{st.session_state.username}_{time.strftime('%Y%m%d_%H%M%S')}.jsonl"
+                ))
+                # The batch runs on a queue worker while this page polls its progress
+                st.session_state.batch_output = None
+                st.session_state.batch_job = get_job_queue().submit(
+                    "batch",
+                    {"jobs": jobs, "output_path": output_path, "concurrency": concurrency, "per_host": per_host},
+                    secrets={"credentials": {selected_provider: (api_key, api_id)}},
+                    user=st.session_state.username
                 )
 
-            except Exception as e:
-                st.error(f"Unexpected error occurred: {str(e)}")
+    if st.session_state.get("batch_job"):
+        job = get_job_queue().get(st.session_state.batch_job)
+        if job is None:
+            st.session_state.batch_job = None
+        elif job["status"] in FINISHED:
+            show_batch_job(job)
+        else:
+            batch_job_progress(job["id"])
+
+    # The batch output is read line by line, and only for the chosen export
+    batch_output = st.session_state.get("batch_output")
+    if batch_output and os.path.exists(batch_output):
+        st.write(f"Batch results: `{os.path.basename(batch_output)}`")
+        add_download_options(
+            key=batch_output,
+            file_name=os.path.splitext(os.path.basename(batch_output))[0],
+            records=lambda: read_jsonl(batch_output)
+        )
+
+# Latency percentiles from the logged stage timings
+with st.expander("Latency"):
+    recent_logs = read_recent_logs()
+    if not recent_logs:
+        st.write("No timed scrapes logged yet.")
+    else:
+        stage = st.selectbox("Stage", ["total"] + STAGES)
+        stage = None if stage == "total" else stage
+        st.write(f"Last {len(recent_logs)} scrapes")
+        st.write("#### Per provider")
+        st.dataframe(latency_table(recent_logs, "provider", stage), use_container_width=True)
+        st.write("#### Per domain")
+        st.dataframe(latency_table(recent_logs, "domain", stage), use_container_width=True)
 
 left_co2, *_, cent_co2, last_co2, last_c3 = st.columns([1] * 18)
@@ -5,6 +5,7 @@ import os
 import requests
 import streamlit as st
 from helper import playwright_install
+from provider_gateway import get_gateway, CircuitOpenError, DeadlineExceeded
 
 # Set up the event loop
 if sys.platform.startswith("win"):
@@ -88,12 +89,16 @@ def scrape_with_deepai(url, prompt, schema, api_key):
     data = {"text": f"URL: {url}, Prompt: {prompt}, Schema: {schema}"}
     
     try:
-        response = requests.post(api_url, headers=headers, json=data)
+        response = get_gateway("DeepAI").call_sync(
+            lambda timeout: requests.post(api_url, headers=headers, json=data, timeout=timeout)
+        )
         response.raise_for_status()
         return response.json().get('output', "No output received.")
     except requests.exceptions.HTTPError as http_err:
 
         return f"HTTP error occurred: {http_err.response.status_code} - {http_err.response.text}"
+    except (CircuitOpenError, DeadlineExceeded) as err:
+        return f"Provider unavailable: {err}"
     except requests.exceptions.RequestException as req_err:
         return f"Request failed: {req_err}"
 
@@ -108,11 +113,15 @@ def scrape_with_meaningcloud(url, prompt, schema, api_key):
     }
     
     try:
-        response = requests.post(api_url, headers=headers, json=data)
+        response = get_gateway("MeaningCloud").call_sync(
+            lambda timeout: requests.post(api_url, headers=headers, json=data, timeout=timeout)
+        )
         response.raise_for_status()
         return response.json().get('summary', "No summary received.")
     except requests.exceptions.HTTPError as http_err:
         return f"HTTP error occurred: {http_err.response.status_code} - {http_err.response.text}"
+    except (CircuitOpenError, DeadlineExceeded) as err:
+        return f"Provider unavailable: {err}"
     except requests.exceptions.RequestException as req_err:
         return f"Request failed: {req_err}"
 
@@ -125,11 +134,15 @@ def scrape_with_diffbot(url, prompt, schema, api_key):
     }
     
     try:
-        response = requests.get(api_url, params=params)
+        response = get_gateway("Diffbot").call_sync(
+            lambda timeout: requests.get(api_url, params=params, timeout=timeout)
+        )
         response.raise_for_status()
         return response.json().get('objects', [{}])[0].get('text', "No text received.")
     except requests.exceptions.HTTPError as http_err:
         return f"HTTP error occurred: {http_err.response.status_code} - {http_err.response.text}"
+    except (CircuitOpenError, DeadlineExceeded) as err:
+        return f"Provider unavailable: {err}"
     except requests.exceptions.RequestException as req_err:
         return f"Request failed: {req_err}"
 
@@ -142,11 +155,15 @@ def scrape_with_textrazor(url, prompt, schema, api_key):
     }
     
     try:
-        response = requests.post(api_url, headers=headers, json=data)
+        response = get_gateway("TextRazor").call_sync(
+            lambda timeout: requests.post(api_url, headers=headers, json=data, timeout=timeout)
+        )
         response.raise_for_status()
         return response.json().get('response', {}).get('entities', [])
     except requests.exceptions.HTTPError as http_err:
         return f"HTTP error occurred: {http_err.response.status_code} - {http_err.response.text}"
+    except (CircuitOpenError, DeadlineExceeded) as err:
+        return f"Provider unavailable: {err}"
     except requests.exceptions.RequestException as req_err:
         return f"Request failed: {req_err}"
 
@@ -163,11 +180,15 @@ def scrape_with_aylien(url, prompt, schema, api_id, api_key):
     }
     
     try:
-        response = requests.get(api_url, headers=headers, params=params)
+        response = get_gateway("Aylien").call_sync(
+            lambda timeout: requests.get(api_url, headers=headers, params=params, timeout=timeout)
+        )
         response.raise_for_status()
         return response.json().get('summary', "No summary received.")
     except requests.exceptions.HTTPError as http_err:
         return f"HTTP error occurred: {http_err.response.status_code} - {http_err.response.text}"
+    except (CircuitOpenError, DeadlineExceeded) as err:
+        return f"Provider unavailable: {err}"
     except requests.exceptions.RequestException as req_err:
         return f"Request failed: {req_err}"
 
@@ -7,19 +7,17 @@ Bedrock Scrapper with ScrapeGraphAI
 """
 
 import os
-import boto3
+import time
 
 import streamlit as st
 
-from scrapegraphai.graphs import SmartScraperGraph
 from scrapegraphai.helpers import models_tokens
 
-from langchain_core.exceptions import OutputParserException
-
 from helper import (
 	playwright_install,
 	add_download_options
 )
+from job_queue import get_job_queue, FINISHED
 
 SUPPORTED_AWS_REGIONS = [
     "us-east-1",
@@ -35,7 +33,6 @@ SUPPORTED_AWS_REGIONS = [
 ]
 
 DEFAULT_TEXT_MODEL = "anthropic.claude-3-haiku-20240307-v1:0"
-DEFAULT_EMBEDDINGS_MODEL = "amazon.titan-embed-text-v1"
 
 if 'AWS_DEFAULT_REGION' not in os.environ:
     os.environ['AWS_DEFAULT_REGION'] = SUPPORTED_AWS_REGIONS[0]
@@ -67,17 +64,11 @@ temperature = st.sidebar.slider(
 
 model_tokens = st.sidebar.slider(
     label="> Model Tokens",
-    min_value=0,
+    min_value=1024,
     max_value=models_tokens['bedrock'][llm],
     value=models_tokens['bedrock'][llm]
 )
 
-embedder = st.selectbox(
-    label="Select embedder",
-    options=embed_models,
-    index=embed_models.index(DEFAULT_EMBEDDINGS_MODEL)
-)
-
 with st.expander("Set up AWS credentials 🔑", expanded=False):
     st.markdown("❗ Use [temporary security credentials](https://docs.aws.amazon.com/IAM/latest/UserGuide/id_credentials_temp.html) whenever possible")
     with st.form("AWS Credentials", clear_on_submit=True):
@@ -90,13 +81,14 @@ with st.expander("Set up AWS credentials 🔑", expanded=False):
         )
         submitted = st.form_submit_button("Submit")
         if submitted:
-            session = boto3.Session(
-                aws_access_key_id=aws_access_key_id,
-                aws_secret_access_key=aws_secret_access_key,
-                aws_session_token=aws_session_token,
-                region_name=region_name
-            )
-            st.session_state.client = session.client("bedrock-runtime")
+            # Passed to the queue workers as job secrets; runs with the same
+            # region and credentials share one pooled client there
+            st.session_state.aws_region = region_name
+            st.session_state.aws_credentials = {
+                "aws_access_key_id": aws_access_key_id,
+                "aws_secret_access_key": aws_secret_access_key,
+                "aws_session_token": aws_session_token
+            }
             st.info("AWS credentials updated!")
 
 source = st.text_input(
@@ -109,47 +101,57 @@ prompt = st.text_area(
     value="List me all the projects with their description."
 )
 
-# 1. Define graph configuration
-if 'client' not in st.session_state:
-    st.session_state.client = None
-
-config = {
-    "llm": {
-        "provider": "amazon_bedrock",
-        "model": "claude-instant",  # or "anthropic.claude-v1", etc.
-        "region": "us-east-1",
-        "aws_access_key_id": "your_key",
-        "aws_secret_access_key": "your_secret"
-    },
-    "embeddings": {
-        "client": st.session_state.client,
-        "model": f"bedrock/{embedder}"
-    }
-}
-
-
-# 2. Create graph instance
-graph = SmartScraperGraph(
-    prompt=prompt,
-    source=source,
-    config=config
-)
-
-# 3. Scrape away!
+# 1. Scrape away! The graph runs on a queue worker
 def run():
-    """Execute graph and return result"""
-    st.session_state.output = None
-    try:
-        st.session_state.output = graph.run()
-    except OutputParserException as ex:
-        st.error(ex)
+    """Submit the graph run as a queue job"""
+    st.session_state.bedrock_job = get_job_queue().submit(
+        "bedrock_graph",
+        {
+            "url": source,
+            "prompt": prompt,
+            "model": llm,
+            "temperature": temperature,
+            "model_tokens": model_tokens,
+            # Without submitted credentials, the default chain of the default region is used
+            "region": st.session_state.get("aws_region", os.environ['AWS_DEFAULT_REGION'])
+        },
+        secrets=st.session_state.get("aws_credentials", {})
+    )
 
 run = st.button(
     label="Run",
     on_click=run
 )
 
-if st.session_state.get('output', None):
-    st.write("### Output")
-    st.write(st.session_state.output)
-    add_download_options(st.session_state.output)
+
+def show_bedrock_job(job):
+    """Shows the progress of a graph job, or its output once it is done."""
+    if job["status"] == "queued":
+        st.info(f"Job {job['id'][:8]} is queued, {time.time() - job['created']:.0f}s so far.")
+    elif job["status"] == "running":
+        st.info(f"Scraping in progress ({job['progress']}), {time.time() - job['started']:.1f}s so far.")
+    elif job["status"] == "failed":
+        st.error(job["error"])
+    elif job["result"]:
+        st.write("### Output")
+        st.write(job["result"])
+        add_download_options(job["result"], key=job["id"])
+
+
+# Polls the queue while the job is pending, without rerunning the whole page
+@st.fragment(run_every=1.0)
+def bedrock_job_progress(job_id):
+    job = get_job_queue().get(job_id)
+    show_bedrock_job(job)
+    if job["status"] in FINISHED:
+        st.rerun()
+
+
+if st.session_state.get("bedrock_job"):
+    job = get_job_queue().get(st.session_state.bedrock_job)
+    if job is None:
+        st.session_state.bedrock_job = None
+    elif job["status"] in FINISHED:
+        show_bedrock_job(job)
+    else:
+        bedrock_job_progress(job["id"])
@@ -1,4 +1,5 @@
 import sys
+import time
 import asyncio
 
 if sys.platform.startswith("win"):
@@ -14,8 +15,19 @@ else:
         pass
 
 import streamlit as st
-from task import task
-from text_to_speech import text_to_speech
+from helper import playwright_install, add_download_options
+from result_cache import get_cache
+from job_queue import get_job_queue, FINISHED
+from text_to_speech import read_run
+from audio_cache import get_audio_cache
+
+# Install playwright browsers in the background if they are missing
+playwright_install()
+
+cache_stats = get_cache().stats()
+st.sidebar.caption(f"Result cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
+audio_stats = get_audio_cache().stats()
+st.sidebar.caption(f"Audio cache: {audio_stats['entries']} speeches, {audio_stats['bytes'] / 1e6:.1f} MB")
 
 key = st.text_input("Openai API key", type="password")
 model = st.radio(
@@ -35,19 +47,103 @@ if st.button("Run the program", type="primary"):
         st.write("Scraping phase started ...")
 
         if model == "text-to-speech":
-            res = text_to_speech(key, prompt, link_to_scrape)
-            st.write(res["answer"])
-            st.audio(res["audio"])
+            # The speech is answered and synthesized on a queue worker
+            st.session_state.graph_job = None
+            st.session_state.speech_job = get_job_queue().submit(
+                "speech",
+                {"url": link_to_scrape, "prompt": prompt, "base_url": url or None},
+                secrets={"api_key": key}
+            )
         else:
-            # Pass url only if it's provided
-            if url:
-                graph_result = task(key, link_to_scrape, prompt, model, base_url=url)
-            else:
-                graph_result = task(key, link_to_scrape, prompt, model)
-
-            print(graph_result)
-            st.write("# Answer")
-            st.write(graph_result)
-
-            if graph_result:
-                add_download_options(graph_result)
\ No newline at end of file
+            # The graph runs on a queue worker; pass url only if it's provided
+            st.session_state.speech_job = None
+            st.session_state.graph_job = get_job_queue().submit(
+                "graph_task",
+                {"url": link_to_scrape, "prompt": prompt, "model": model, "base_url": url or None},
+                secrets={"api_key": key}
+            )
+
+
+def show_graph_job(job):
+    """Shows the progress of a graph job, or its answer once it is done."""
+    if job["status"] == "queued":
+        st.info(f"Job {job['id'][:8]} is queued, {time.time() - job['created']:.0f}s so far.")
+    elif job["status"] == "running":
+        st.info(f"Scraping in progress ({job['progress']}), {time.time() - job['started']:.1f}s so far.")
+    elif job["status"] == "failed":
+        st.error(job["error"])
+    else:
+        graph_result = job["result"]
+        st.write("# Answer")
+        st.write(graph_result)
+
+        if graph_result:
+            add_download_options(graph_result, key=job["id"])
+
+
+def play(path, autoplay=False):
+    """Plays an MP3 file, unless it is gone, e.g. removed by a finished run."""
+    try:
+        with open(path, "rb") as f:
+            st.audio(f.read(), format="audio/mpeg", autoplay=autoplay)
+    except OSError:
+        pass
+
+
+def show_speech_job(job):
+    """Shows the answer and the segments synthesized so far, or the whole speech once it is done."""
+    if job["status"] == "queued":
+        st.info(f"Job {job['id'][:8]} is queued, {time.time() - job['created']:.0f}s so far.")
+    elif job["status"] == "running":
+        st.info(f"Speech in progress ({job['progress']}), {time.time() - job['started']:.1f}s so far.")
+        # Segments play as soon as they are synthesized, the first one automatically
+        answer, segments = read_run(job["id"])
+        if answer is not None:
+            st.write(answer)
+        for number, path in enumerate(segments):
+            play(path, autoplay=number == 0)
+    elif job["status"] == "failed":
+        st.error(job["error"])
+    else:
+        speech = job["result"]
+        st.write(speech["answer"])
+        if not speech["cached"]:
+            st.write("Whole answer:")
+        play(speech["audio"], autoplay=speech["cached"])
+
+
+# Polls the queue while the job is pending, without rerunning the whole page
+@st.fragment(run_every=1.0)
+def graph_job_progress(job_id):
+    job = get_job_queue().get(job_id)
+    show_graph_job(job)
+    if job["status"] in FINISHED:
+        st.rerun()
+
+
+@st.fragment(run_every=1.0)
+def speech_job_progress(job_id):
+    job = get_job_queue().get(job_id)
+    show_speech_job(job)
+    if job["status"] in FINISHED:
+        st.rerun()
+
+
+if st.session_state.get("graph_job"):
+    job = get_job_queue().get(st.session_state.graph_job)
+    if job is None:
+        st.session_state.graph_job = None
+    elif job["status"] in FINISHED:
+        show_graph_job(job)
+    else:
+        graph_job_progress(job["id"])
+
+
+if st.session_state.get("speech_job"):
+    job = get_job_queue().get(st.session_state.speech_job)
+    if job is None:
+        st.session_state.speech_job = None
+    elif job["status"] in FINISHED:
+        show_speech_job(job)
+    else:
+        speech_job_progress(job["id"])
@@ -0,0 +1,203 @@
+import os
+import time
+import asyncio
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+# Request rate per host, overridable from the environment
+HOST_RATE = float(os.environ.get("SCRAPER_HOST_RATE", 2.0))
+HOST_BURST = float(os.environ.get("SCRAPER_HOST_BURST", 4))
+# The rate a host is slowed down to at most after repeated throttling
+MIN_HOST_RATE = 0.1
+
+# robots.txt handling
+RESPECT_ROBOTS = os.environ.get("SCRAPER_RESPECT_ROBOTS", "1") != "0"
+ROBOTS_AGENT = os.environ.get("SCRAPER_ROBOTS_AGENT", "*")
+ROBOTS_TTL = float(os.environ.get("SCRAPER_ROBOTS_TTL", 3600))
+ROBOTS_TIMEOUT = 5.0
+
+# Throttled responses are retried this many times, if the wait is short enough
+RETRY_STATUSES = {429, 503}
+MAX_RETRIES = int(os.environ.get("SCRAPER_FETCH_RETRIES", 2))
+MAX_RETRY_AFTER = float(os.environ.get("SCRAPER_MAX_RETRY_AFTER", 30))
+
+
+def parse_retry_after(value):
+    """Returns the seconds to wait from a Retry-After header (delay or HTTP date), or None."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class HostBucket:
+    """
+    Token bucket of one host. Tokens refill at `rate` per second up to
+    `burst`; a request that finds no token reserves the next one, so waiting
+    requests are served in arrival order. `blocked_until` holds every request
+    back after a Retry-After.
+    """
+
+    def __init__(self, rate, burst):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def reserve(self):
+        """Takes a token and returns how long to wait before using it."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        return max(wait, self.blocked_until - now)
+
+    def throttled(self, delay):
+        """Backs off after a 429/503: halves the rate and blocks for `delay` seconds."""
+        self.rate = max(self.rate / 2, MIN_HOST_RATE)
+        self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+
+    def succeeded(self):
+        """Recovers the rate step by step after throttling."""
+        if self.rate < self.max_rate:
+            self.rate = min(self.rate + self.max_rate / 10, self.max_rate)
+
+
+class PolitenessScheduler:
+    """
+    Per-host request scheduler for the shared event loop: a token bucket
+    per host, slowed down to the robots.txt Crawl-delay or Request-rate,
+    and Retry-After handling with multiplicative back-off. robots.txt files
+    are cached in memory for ROBOTS_TTL seconds.
+    """
+
+    def __init__(self, rate=HOST_RATE, burst=HOST_BURST, respect_robots=RESPECT_ROBOTS):
+        self.rate = rate
+        self.burst = burst
+        self.respect_robots = respect_robots
+        self.waited = 0.0
+        self.throttles = 0
+        self._buckets = {}
+        self._robots = {}
+
+    async def _robots_delay(self, session, origin):
+        """Returns the robots.txt delay between requests to `origin`, or None."""
+        cached = self._robots.get(origin)
+        if cached is not None and (isinstance(cached, asyncio.Future) or cached[1] > time.monotonic()):
+            if isinstance(cached, asyncio.Future):
+                return await asyncio.shield(cached)
+            return cached[0]
+
+        # Concurrent requests to a new host share one robots.txt download
+        future = asyncio.get_running_loop().create_future()
+        self._robots[origin] = future
+        delay = None
+        try:
+            # Imported here so the scheduler can be used without aiohttp
+            from aiohttp import ClientTimeout
+            async with session.get(f"{origin}/robots.txt", timeout=ClientTimeout(total=ROBOTS_TIMEOUT)) as response:
+                if response.status == 200:
+                    parser = RobotFileParser()
+                    parser.parse((await response.text(errors="replace")).splitlines())
+                    delay = parser.crawl_delay(ROBOTS_AGENT)
+                    request_rate = parser.request_rate(ROBOTS_AGENT)
+                    if request_rate is not None and request_rate.requests:
+                        delay = max(delay or 0, request_rate.seconds / request_rate.requests)
+        except Exception:
+            # No robots.txt is no restriction
+            pass
+        finally:
+            delay = float(delay) if delay else None
+            self._robots[origin] = (delay, time.monotonic() + ROBOTS_TTL)
+            future.set_result(delay)
+        return delay
+
+    async def _bucket(self, session, url):
+        parts = urlsplit(url)
+        host = parts.netloc.lower()
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            rate = self.rate
+            if self.respect_robots and session is not None:
+                delay = await self._robots_delay(session, f"{parts.scheme}://{host}")
+                if delay:
+                    rate = min(rate, 1 / delay)
+            # Another request may have created it while robots.txt was read
+            bucket = self._buckets.setdefault(host, HostBucket(rate, self.burst if rate == self.rate else 1))
+        return bucket
+
+    async def acquire(self, session, url):
+        """Waits until a request to the host of `url` is allowed; returns the seconds waited."""
+        bucket = await self._bucket(session, url)
+        wait = bucket.reserve()
+        if wait > 0:
+            self.waited += wait
+            await asyncio.sleep(wait)
+        return wait
+
+    async def get(self, session, url, timer=None, **kwargs):
+        """
+        Sends a GET once the host allows it and returns the response.
+        429/503 answers back the host off for their Retry-After (or an
+        exponential default) and are retried while the wait is at most
+        MAX_RETRY_AFTER; the last response is returned either way.
+        Time spent waiting is recorded as the `wait` stage of `timer`.
+        """
+        for attempt in range(MAX_RETRIES + 1):
+            wait = await self.acquire(session, url)
+            if timer is not None:
+                timer.add("wait", wait)
+            response = await session.get(url, **kwargs)
+            bucket = await self._bucket(session, url)
+            if response.status not in RETRY_STATUSES:
+                bucket.succeeded()
+                return response
+
+            self.throttles += 1
+            delay = parse_retry_after(response.headers.get("Retry-After"))
+            if delay is None:
+                delay = 2 ** attempt
+            bucket.throttled(delay)
+            if attempt == MAX_RETRIES or delay > MAX_RETRY_AFTER:
+                return response
+            response.release()
+        return response
+
+    def stats(self):
+        return {
+            "hosts": len(self._buckets),
+            "waited": round(self.waited, 3),
+            "throttles": self.throttles,
+            "slowed_hosts": sum(1 for bucket in self._buckets.values() if bucket.rate < bucket.max_rate)
+        }
+
+
+_scheduler = None
+
+
+def get_scheduler():
+    """Returns the process-wide scheduler. Use it from the shared event loop only."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = PolitenessScheduler(HOST_RATE, HOST_BURST)
+    return _scheduler
+
+
+def share_limits(processes):
+    """
+    Divides the per-host rate and burst between `processes` processes that
+    fetch at the same time, e.g. queue workers, so that together they keep
+    to SCRAPER_HOST_RATE. Call it before the first fetch.
+    """
+    global HOST_RATE, HOST_BURST
+    HOST_RATE = HOST_RATE / processes
+    HOST_BURST = max(HOST_BURST / processes, 1)
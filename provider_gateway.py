@@ -0,0 +1,354 @@
+import os
+import sys
+import time
+import random
+import asyncio
+import threading
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+
+from politeness import parse_retry_after
+from timings import percentiles
+
+# Limits of every provider, overridable from the environment
+CONCURRENCY = int(os.environ.get("SCRAPER_PROVIDER_CONCURRENCY", 8))
+QPS = float(os.environ.get("SCRAPER_PROVIDER_QPS", 5))
+DEADLINE = float(os.environ.get("SCRAPER_PROVIDER_DEADLINE", 30))
+MAX_RETRIES = int(os.environ.get("SCRAPER_PROVIDER_RETRIES", 3))
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 8.0
+# Consecutive failures that open the circuit, and how long it stays open
+FAILURE_THRESHOLD = int(os.environ.get("SCRAPER_PROVIDER_FAILURES", 5))
+RESET_TIMEOUT = float(os.environ.get("SCRAPER_PROVIDER_RESET", 30))
+# Latencies of recent successful calls kept per provider, and how many are
+# needed before their p95 replaces the default hedging delay
+LATENCY_SAMPLES = 200
+MIN_LATENCY_SAMPLES = 20
+HEDGE_DELAY = float(os.environ.get("SCRAPER_HEDGE_DELAY", 2.0))
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling a provider that has been failing."""
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a provider call, retries included, runs out of time."""
+
+
+def is_transient(error):
+    """
+    Tells whether a failed call is worth retrying: throttling (429), server
+    errors (5xx), timeouts and connection failures. Errors carrying a
+    `status`, like ProviderError, are judged by it.
+    """
+    status = getattr(error, "status", None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError)):
+        return True
+    # requests' invalid-URL errors are OSErrors too, but retrying cannot fix them
+    if isinstance(error, OSError) and not isinstance(error, ValueError):
+        return True
+    aiohttp = sys.modules.get("aiohttp")
+    return aiohttp is not None and isinstance(error, aiohttp.ClientConnectionError)
+
+
+def backoff_delay(attempt, retry_after=None):
+    """Exponential backoff with full jitter, at least the provider's Retry-After."""
+    delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+    return max(delay, retry_after or 0.0)
+
+
+class RateLimiter:
+    """Thread-safe token bucket; callers reserve a slot and sleep the returned time."""
+
+    def __init__(self, qps, burst=None):
+        self.qps = qps
+        self.burst = burst or max(qps, 1)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.qps)
+            self.updated = now
+            self.tokens -= 1
+            return -self.tokens / self.qps if self.tokens < 0 else 0.0
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive transient failures and
+    rejects calls for `reset_timeout` seconds. Then a single trial call is
+    let through (half-open): success closes the circuit, failure opens it
+    again, and so does a trial call that ends without an outcome, e.g.
+    because it was cancelled, so the next one is let through after another
+    `reset_timeout`.
+    """
+
+    def __init__(self, failure_threshold=FAILURE_THRESHOLD, reset_timeout=RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened = 0.0
+        self._lock = threading.Lock()
+
+    def before_call(self, name):
+        """Admits a call or raises CircuitOpenError. Returns True when the call is the half-open trial."""
+        with self._lock:
+            if self.state == "open":
+                if time.monotonic() - self.opened < self.reset_timeout:
+                    raise CircuitOpenError(f"{name} is failing, calls are paused for up to {self.reset_timeout:.0f}s")
+                self.state = "half_open"
+                return True
+            if self.state == "half_open":
+                raise CircuitOpenError(f"{name} is being probed after failures, try again shortly")
+            return False
+
+    def abandon(self):
+        """Opens the circuit again after a trial call that ended without an outcome."""
+        with self._lock:
+            if self.state == "half_open":
+                self.state = "open"
+                self.opened = time.monotonic()
+
+    def record(self, error=None):
+        """Records a call outcome; `error` is None on success."""
+        with self._lock:
+            if error is None or not is_transient(error) or getattr(error, "status", None) == 429:
+                # The provider answered: client errors and throttling do not mean it is down
+                if error is None or self.state == "half_open":
+                    self.state, self.failures = "closed", 0
+                return
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.state = "open"
+                self.opened = time.monotonic()
+
+
+class ProviderGateway:
+    """
+    Guards the calls to one provider: at most `concurrency` in flight and
+    `qps` started per second, transient failures retried with jittered
+    exponential backoff, a hard `deadline` for the call including retries,
+    and a circuit breaker that fails fast while the provider is down.
+    Usable from the shared event loop (`call`) and from threads (`call_sync`).
+    """
+
+    def __init__(self, name, concurrency=CONCURRENCY, qps=QPS, deadline=DEADLINE, retries=MAX_RETRIES):
+        self.name = name
+        self.concurrency = concurrency
+        self.deadline = deadline
+        self.retries = retries
+        self.limiter = RateLimiter(qps)
+        self.breaker = CircuitBreaker()
+        self.counters = {"calls": 0, "retries": 0, "failures": 0, "rejected": 0, "in_flight": 0}
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+        self._thread_slots = threading.BoundedSemaphore(concurrency)
+        self._loop_slots = {}
+        self._lock = threading.Lock()
+
+    def _count(self, counter, change=1):
+        with self._lock:
+            self.counters[counter] += change
+
+    def _succeeded(self, start_time):
+        self.breaker.record()
+        with self._lock:
+            self.latencies.append(time.monotonic() - start_time)
+
+    def latency_p95(self):
+        """Returns the p95 latency of recent successful calls, or None without enough of them."""
+        with self._lock:
+            if len(self.latencies) < MIN_LATENCY_SAMPLES:
+                return None
+            return percentiles(list(self.latencies))[1]
+
+    def hedge_delay(self):
+        """Seconds to wait on this provider before asking a backup: its p95, or HEDGE_DELAY."""
+        p95 = self.latency_p95()
+        return HEDGE_DELAY if p95 is None else p95
+
+    def _expired(self):
+        self._count("failures")
+        return DeadlineExceeded(f"{self.name} did not answer within {self.deadline:.0f}s")
+
+    @asynccontextmanager
+    async def _async_slot(self, deadline):
+        loop = asyncio.get_running_loop()
+        slots = self._loop_slots.get(loop)
+        if slots is None:
+            slots = self._loop_slots.setdefault(loop, asyncio.Semaphore(self.concurrency))
+        # Time spent queueing for a slot counts against the deadline
+        try:
+            await asyncio.wait_for(slots.acquire(), max(deadline - time.monotonic(), 0))
+        except asyncio.TimeoutError:
+            raise self._expired() from None
+        self._count("in_flight")
+        try:
+            yield
+        finally:
+            self._count("in_flight", -1)
+            slots.release()
+
+    @contextmanager
+    def _thread_slot(self, deadline):
+        if not self._thread_slots.acquire(timeout=max(deadline - time.monotonic(), 0)):
+            raise self._expired()
+        self._count("in_flight")
+        try:
+            yield
+        finally:
+            self._count("in_flight", -1)
+            self._thread_slots.release()
+
+    @contextmanager
+    def _attempt(self, deadline, wait):
+        """
+        Admits one attempt for the enclosed block, or raises if it cannot start,
+        or wait `wait` seconds, within its deadline or while the circuit is open.
+        """
+        if time.monotonic() + wait >= deadline:
+            raise self._expired()
+        try:
+            probe = self.breaker.before_call(self.name)
+        except CircuitOpenError:
+            self._count("rejected")
+            raise
+        try:
+            yield
+        finally:
+            # A trial call that was cancelled, or otherwise left without recording
+            # its outcome, must not leave the circuit half-open for good
+            if probe:
+                self.breaker.abandon()
+
+    def _failed(self, error, attempt, deadline):
+        """Records a failure and returns the backoff before the next attempt, or None to give up."""
+        self.breaker.record(error)
+        self._count("failures")
+        if attempt >= self.retries or not is_transient(error):
+            return None
+        delay = backoff_delay(attempt, getattr(error, "retry_after", None))
+        if time.monotonic() + delay >= deadline:
+            return None
+        self._count("retries")
+        return delay
+
+    async def call(self, send):
+        """
+        Calls a provider from a coroutine.
+            Arguments:
+            - send (callable): coroutine function taking the seconds left
+              before the deadline and returning the provider's answer; it
+              raises on failures, e.g. ProviderError for error statuses
+            Return:
+            - the answer of the first successful attempt
+        """
+        start_time = time.monotonic()
+        deadline = start_time + self.deadline
+        self._count("calls")
+        async with self._async_slot(deadline):
+            for attempt in range(self.retries + 1):
+                wait = self.limiter.reserve()
+                with self._attempt(deadline, wait):
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+                    remaining = deadline - time.monotonic()
+                    try:
+                        result = await asyncio.wait_for(send(remaining), remaining)
+                    except asyncio.TimeoutError:
+                        # The deadline is spent, there is no time left to retry
+                        error = self._expired()
+                        self.breaker.record(error)
+                        raise error from None
+                    except Exception as e:
+                        delay = self._failed(e, attempt, deadline)
+                        if delay is None:
+                            raise
+                    else:
+                        self._succeeded(start_time)
+                        return result
+                await asyncio.sleep(delay)
+
+    def call_sync(self, send, retry_statuses=(429, 500, 502, 503, 504)):
+        """
+        Calls a provider from a thread, e.g. with requests.
+            Arguments:
+            - send (callable): takes the seconds left before the deadline (to
+              pass as a timeout) and returns a response with `status_code`
+            - retry_statuses (tuple): statuses that are retried
+            Return:
+            - the last response, successful or not
+        """
+        start_time = time.monotonic()
+        deadline = start_time + self.deadline
+        self._count("calls")
+        with self._thread_slot(deadline):
+            for attempt in range(self.retries + 1):
+                wait = self.limiter.reserve()
+                with self._attempt(deadline, wait):
+                    if wait > 0:
+                        time.sleep(wait)
+                    try:
+                        response = send(max(deadline - time.monotonic(), 0.001))
+                    except Exception as e:
+                        delay = self._failed(e, attempt, deadline)
+                        if delay is None:
+                            raise
+                    else:
+                        if response.status_code not in retry_statuses:
+                            self._succeeded(start_time)
+                            return response
+                        delay = self._failed(_StatusError(response), attempt, deadline)
+                        if delay is None:
+                            return response
+                time.sleep(delay)
+            return response
+
+    def stats(self):
+        p95 = self.latency_p95()
+        with self._lock:
+            return dict(self.counters, state=self.breaker.state, p95_ms=None if p95 is None else round(p95 * 1000))
+
+
+class _StatusError(Exception):
+    """A retryable status of a sync response, with its Retry-After."""
+
+    def __init__(self, response):
+        super().__init__(f"HTTP {response.status_code}")
+        self.status = response.status_code
+        self.retry_after = parse_retry_after(response.headers.get("Retry-After"))
+
+
+_gateways = {}
+_gateways_lock = threading.Lock()
+
+
+def get_gateway(provider):
+    """Returns the process-wide gateway of a provider."""
+    with _gateways_lock:
+        if provider not in _gateways:
+            _gateways[provider] = ProviderGateway(provider, concurrency=CONCURRENCY, qps=QPS)
+        return _gateways[provider]
+
+
+def share_limits(processes):
+    """
+    Divides the concurrency and rate limits of every provider between
+    `processes` processes that call them at the same time, e.g. queue
+    workers, so that together they keep to the configured limits. Circuit
+    breakers stay per process. Call it before the first provider call.
+    """
+    global CONCURRENCY, QPS
+    CONCURRENCY = max(CONCURRENCY // processes, 1)
+    QPS = QPS / processes
+
+
+def gateway_stats():
+    """Returns the counters and circuit state of every provider used so far."""
+    with _gateways_lock:
+        return {name: gateway.stats() for name, gateway in _gateways.items()}
@@ -0,0 +1,168 @@
+import os
+
+
+class ProviderError(Exception):
+    """Raised when a provider answers with an HTTP error status."""
+
+    def __init__(self, provider, status, body, retry_after=None):
+        super().__init__(f"{provider} returned HTTP {status}: {body[:200]}")
+        self.provider = provider
+        self.status = status
+        self.body = body
+        # Seconds the provider asked to wait before retrying, if it said
+        self.retry_after = retry_after
+
+
+# Summarization endpoints of the supported AI providers
+PROVIDER_URLS = {
+    "DeepAI": "https://api.deepai.org/api/summarization",
+    "MeaningCloud": "https://api.meaningcloud.com/summarization-1.0",
+    "Diffbot": "https://api.diffbot.com/v3/article",
+    "TextRazor": "https://api.textrazor.com",
+    "Aylien": "https://api.aylien.com/api/v1/summarize"
+}
+
+# Points every provider at `{base}/{provider name in lower case}` instead,
+# e.g. at local mock servers
+BASE_URL = os.environ.get("SCRAPER_PROVIDER_BASE_URL")
+if BASE_URL:
+    PROVIDER_URLS = {name: f"{BASE_URL.rstrip('/')}/{name.lower()}" for name in PROVIDER_URLS}
+
+# Providers that fetch the page themselves and only get its URL
+URL_PROVIDERS = {"Diffbot"}
+
+
+def build_request(provider, text, url, api_key, api_id=None):
+    """
+    Builds the HTTP request for a provider call.
+        Arguments:
+        - provider (str): name of the provider, a key of PROVIDER_URLS
+        - text (str): page text to send to the provider
+        - url (str): url of the scraped page
+        - api_key (str): provider API key
+        - api_id (str): application ID, only used by Aylien
+        Return:
+        - (method, endpoint, kwargs): arguments for `ClientSession.request`
+    """
+    endpoint = PROVIDER_URLS[provider]
+
+    # Request payloads differ by provider
+    if provider == "DeepAI":
+        return "POST", endpoint, {
+            "data": {"text": text},
+            "headers": {"Authorization": f"Bearer {api_key}"}
+        }
+    if provider == "MeaningCloud":
+        return "POST", endpoint, {
+            "data": {"key": api_key, "txt": text, "sentences": 5}
+        }
+    if provider == "Diffbot":
+        return "GET", endpoint, {
+            "params": {"token": api_key, "url": url, "discussion": "false"}
+        }
+    if provider == "TextRazor":
+        return "POST", endpoint, {
+            "data": {"text": text, "extractors": "entities,topics"},
+            "headers": {"x-textrazor-key": api_key}
+        }
+    if provider == "Aylien":
+        return "POST", endpoint, {
+            "data": {"text": text},
+            "headers": {
+                "X-AYLIEN-TextAPI-Application-ID": api_id,
+                "X-AYLIEN-TextAPI-Application-Key": api_key
+            }
+        }
+    raise ValueError(f"Unknown provider: {provider}")
+
+
+async def call_provider(provider, text, url, api_key, api_id=None, session=None, timer=None):
+    """
+    Sends text to a provider over the shared connection pool and returns
+    the decoded JSON response. Raises ProviderError on HTTP error statuses,
+    so failed calls are never mistaken for (and cached as) results.
+    Calls go through the provider's gateway, which limits their rate,
+    retries transient failures and raises CircuitOpenError while the
+    provider is down. The response status is recorded on `timer` when one
+    is given.
+    """
+    # Imported here so PROVIDER_URLS can be read without loading aiohttp
+    from aiohttp import ClientTimeout
+    from provider_gateway import get_gateway
+    from politeness import parse_retry_after
+    if session is None:
+        import http_session
+        session = await http_session.get_session()
+    method, endpoint, kwargs = build_request(provider, text, url, api_key, api_id)
+
+    async def send(remaining):
+        async with session.request(method, endpoint, timeout=ClientTimeout(total=remaining), **kwargs) as response:
+            if timer is not None:
+                timer.provider_status = response.status
+            if response.status >= 400:
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                raise ProviderError(provider, response.status, await response.text(), retry_after)
+            # Providers do not always label their JSON responses correctly
+            return await response.json(content_type=None)
+
+    return await get_gateway(provider).call(send)
+
+
+# Ways to use several providers for one call: all at once, or backups only
+# when the provider before them is slower than its usual p95
+RACE_MODES = {"fastest", "hedged"}
+
+
+async def race_providers(providers, text, url, credentials, mode="hedged", session=None, timer=None):
+    """
+    Sends the same text to several providers and returns the first
+    successful answer, cancelling the calls still running.
+        Arguments:
+        - providers (list of str): providers in order of preference
+        - text (str): page text to send
+        - url (str): url of the scraped page
+        - credentials (dict): provider name -> (api_key, api_id)
+        - mode (str): "fastest" calls every provider at once; "hedged" calls
+          the next provider only once the previous one has taken longer
+          than its observed p95 latency, or has failed
+        - session, timer: as for `call_provider`
+        Return:
+        - (provider, answer) of the first provider that succeeded; when all
+          fail, the first failure is raised
+    """
+    import asyncio
+    from provider_gateway import get_gateway
+
+    async def attempt(provider):
+        api_key, api_id = credentials[provider]
+        return provider, await call_provider(provider, text, url, api_key, api_id, session=session, timer=timer)
+
+    waiting = list(providers)
+    running = set()
+    errors = []
+    try:
+        while waiting or running:
+            delay = None
+            if waiting:
+                provider = waiting.pop(0)
+                running.add(asyncio.ensure_future(attempt(provider)))
+                if waiting:
+                    delay = 0 if mode == "fastest" else get_gateway(provider).hedge_delay()
+            done, running = await asyncio.wait(running, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+            answer = None
+            # Every failure is retrieved, so none is reported as unhandled
+            for task in done:
+                if task.exception() is not None:
+                    errors.append(task.exception())
+                elif answer is None:
+                    answer = task.result()
+            if answer is not None:
+                return answer
+        raise errors[0]
+    finally:
+        for task in running:
+            task.cancel()
+        # Let the losers unwind, so their gateways have recorded the
+        # cancellation, e.g. reopened a circuit whose trial call lost
+        if running:
+            await asyncio.wait(running)
@@ -0,0 +1,174 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# Cache location and limits, overridable from the environment
+CACHE_PATH = os.environ.get("SCRAPER_CACHE_PATH", os.path.join("cache", "results.db"))
+DEFAULT_TTL = float(os.environ.get("SCRAPER_CACHE_TTL", 24 * 3600))
+MAX_BYTES = int(os.environ.get("SCRAPER_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# Marks `put` calls that use the cache's own TTL
+_DEFAULT_TTL = object()
+
+
+def normalize_url(url):
+    """
+    Normalizes a URL so trivially different spellings share a cache entry:
+    lowercase scheme and host, no default port, no fragment, sorted query.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    netloc = (parts.hostname or "").lower()
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        netloc = f"{netloc}:{parts.port}"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, netloc, parts.path or "/", query, ""))
+
+
+def content_hash(data):
+    """Returns the SHA-256 hex digest of a page body (str or bytes)."""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+def make_key(url, prompt, schema=None, provider=None, page_hash=None):
+    """
+    Builds the cache key of a scrape.
+        Arguments:
+        - url (str): url to scrape, normalized before hashing
+        - prompt (str): prompt
+        - schema (str): optional schema
+        - provider (str): provider or model that produced the result
+        - page_hash (str): optional hash of the fetched content, so a
+          changed page maps to a different entry
+        Return:
+        - key (str): SHA-256 hex digest
+    """
+    payload = json.dumps([
+        normalize_url(url),
+        (prompt or "").strip(),
+        (schema or "").strip(),
+        provider,
+        page_hash
+    ])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    Persistent result cache stored in SQLite, with a TTL per entry and
+    least-recently-used eviction once the stored values exceed `max_bytes`.
+    Entries stored with `ttl=None` never expire and are only evicted by size,
+    which suits content-addressed keys. Hits and misses are counted in the
+    database, so the counts cover every process using the cache, e.g. the
+    job queue workers.
+    """
+
+    def __init__(self, path=CACHE_PATH, ttl=DEFAULT_TTL, max_bytes=MAX_BYTES):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute('''CREATE TABLE IF NOT EXISTS results (
+                                key TEXT PRIMARY KEY,
+                                value TEXT,
+                                size INTEGER,
+                                expires REAL,
+                                accessed REAL
+                            )''')
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER)")
+        self._conn.execute("INSERT OR IGNORE INTO counters (name, value) VALUES ('hits', 0), ('misses', 0)")
+        self._conn.commit()
+
+    def _count(self, name):
+        self._conn.execute("UPDATE counters SET value = value + 1 WHERE name = ?", (name,))
+
+    def get(self, key):
+        """Returns the cached value for `key`, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (row[1] is not None and now > row[1]):
+                if row is not None:
+                    self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                self._count("misses")
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE results SET accessed = ? WHERE key = ?", (now, key))
+            self._count("hits")
+            self._conn.commit()
+        return json.loads(row[0])
+
+    def put(self, key, value, ttl=_DEFAULT_TTL):
+        """
+        Stores a JSON-serializable value and evicts old entries if needed.
+        `ttl` defaults to the cache TTL; None stores the entry without expiry.
+        """
+        data = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+        now = time.time()
+        if ttl is _DEFAULT_TTL:
+            ttl = self.ttl
+        expires = None if ttl is None else now + ttl
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, size, expires, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, data, len(data), expires, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        self._conn.execute("DELETE FROM results WHERE expires < ?", (time.time(),))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        stale = []
+        for key, size in self._conn.execute("SELECT key, size FROM results ORDER BY accessed"):
+            if total <= self.max_bytes:
+                break
+            stale.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM results WHERE key = ?", stale)
+
+    def stats(self):
+        """Returns the hit/miss counters of all processes and the cache size."""
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results"
+            ).fetchone()
+            counters = dict(self._conn.execute("SELECT name, value FROM counters"))
+        return {"hits": counters["hits"], "misses": counters["misses"], "entries": entries, "bytes": size}
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM results")
+            self._conn.commit()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Returns the process-wide result cache."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache()
+        return _cache
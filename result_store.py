@@ -0,0 +1,132 @@
+import os
+import json
+import time
+import zlib
+import sqlite3
+import threading
+
+# Store location and retention, overridable from the environment
+STORE_PATH = os.environ.get("SCRAPER_RESULT_STORE_PATH", os.path.join("results", "results.db"))
+RETENTION_DAYS = float(os.environ.get("SCRAPER_RESULT_RETENTION_DAYS", 30))
+
+
+def encode_result(result):
+    """Returns a result as compact, zlib-compressed UTF-8 JSON."""
+    data = json.dumps(result, ensure_ascii=False, separators=(",", ":"))
+    return zlib.compress(data.encode("utf-8"))
+
+
+class ResultStore:
+    """
+    Results of scrape runs, keyed by run ID (the job ID). Each result is kept
+    as one compressed JSON blob next to the user, URL and provider of the
+    run, so concurrent users never share a file and downloads are served
+    without re-serializing. Runs older than `retention_days` are dropped
+    when the store is opened.
+    """
+
+    def __init__(self, path=STORE_PATH, retention_days=RETENTION_DAYS):
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute('''CREATE TABLE IF NOT EXISTS runs (
+                                run_id TEXT PRIMARY KEY,
+                                kind TEXT,
+                                user TEXT,
+                                url TEXT,
+                                provider TEXT,
+                                created REAL,
+                                size INTEGER,
+                                result BLOB
+                            )''')
+        self._conn.execute("CREATE INDEX IF NOT EXISTS runs_user ON runs (user, created)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS runs_url ON runs (url, created)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS runs_created ON runs (created)")
+        if retention_days:
+            self._conn.execute("DELETE FROM runs WHERE created < ?", (time.time() - retention_days * 86400,))
+        self._conn.commit()
+
+    def save(self, run_id, result, kind="scrape", user=None, url=None, provider=None):
+        """
+        Stores the result of a run, replacing any earlier one of the same ID.
+            Arguments:
+            - run_id (str): ID of the run, e.g. its job ID
+            - result: JSON-serializable result
+            - kind, user, url, provider (str): what the result can be queried by
+            Return:
+            - size (int): bytes stored
+        """
+        compressed = encode_result(result)
+        with self._lock:
+            self._conn.execute(
+                '''INSERT OR REPLACE INTO runs (run_id, kind, user, url, provider, created, size, result)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
+                (run_id, kind, user, url, provider, time.time(), len(compressed), compressed)
+            )
+            self._conn.commit()
+        return len(compressed)
+
+    def load_json(self, run_id):
+        """Returns the result of a run as UTF-8 JSON bytes, ready to download, or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT result FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        return zlib.decompress(row[0]) if row is not None else None
+
+    def load(self, run_id):
+        """Returns the result of a run, or None."""
+        data = self.load_json(run_id)
+        return json.loads(data) if data is not None else None
+
+    def query(self, user=None, url=None, since=None, until=None, kind=None, limit=100):
+        """
+        Lists stored runs, newest first, without their results.
+            Arguments:
+            - user, url, kind (str): only runs with these values
+            - since, until (float): only runs created in this time range
+            - limit (int): maximum number of runs
+            Return:
+            - runs (list of dict): run_id, kind, user, url, provider, created, size
+        """
+        filters = []
+        values = []
+        for column, value in (("user", user), ("url", url), ("kind", kind)):
+            if value is not None:
+                filters.append(f"{column} = ?")
+                values.append(value)
+        if since is not None:
+            filters.append("created >= ?")
+            values.append(since)
+        if until is not None:
+            filters.append("created < ?")
+            values.append(until)
+        where = f"WHERE {' AND '.join(filters)}" if filters else ""
+        with self._lock:
+            rows = self._conn.execute(
+                f'''SELECT run_id, kind, user, url, provider, created, size FROM runs {where}
+                    ORDER BY created DESC LIMIT ?''',
+                (*values, limit)
+            ).fetchall()
+        keys = ["run_id", "kind", "user", "url", "provider", "created", "size"]
+        return [dict(zip(keys, row)) for row in rows]
+
+    def delete(self, run_id):
+        with self._lock:
+            self._conn.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+            self._conn.commit()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_result_store():
+    """Returns the process-wide result store."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ResultStore()
+        return _store
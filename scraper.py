@@ -0,0 +1,343 @@
+import os
+import re
+import time
+import zlib
+import asyncio
+import codecs
+import hashlib
+import functools
+from collections import namedtuple
+
+import http_session
+import html_parsing
+import result_cache
+import fetch_store
+import fetch_archive
+import chunking
+import politeness
+from providers import call_provider, race_providers, URL_PROVIDERS, RACE_MODES
+from timings import ScrapeTimer
+
+# Download limits, overridable from the environment
+MAX_BODY_BYTES = int(os.environ.get("SCRAPER_MAX_BODY_BYTES", 5 * 1024 * 1024))
+CHUNK_SIZE = int(os.environ.get("SCRAPER_CHUNK_SIZE", 64 * 1024))
+
+# Content types we are willing to download and parse
+HTML_CONTENT_TYPES = {"text/html", "application/xhtml+xml", "text/plain"}
+
+_META_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?([\w.:-]+)""", re.IGNORECASE)
+
+# A downloaded page. `body` is only kept when the caller asks for it
+FetchedPage = namedtuple(
+    "FetchedPage",
+    ["body", "body_hash", "length", "title", "preview", "parsed", "truncated", "text"]
+)
+
+
+class FetchError(Exception):
+    """Raised when a page is not something we can scrape."""
+
+
+async def _off_loop(func, *args, **kwargs):
+    """Runs blocking store or archive I/O in the loop's default executor, so other fetches keep going."""
+    return await asyncio.get_running_loop().run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+
+def _sniff_charset(response, head):
+    """Returns the body charset from the headers, a <meta> tag, or UTF-8."""
+    candidates = [response.charset]
+    match = _META_CHARSET.search(head[:4096])
+    if match:
+        candidates.append(match.group(1).decode("ascii", "ignore"))
+    for charset in candidates:
+        if not charset:
+            continue
+        try:
+            return codecs.lookup(charset).name
+        except LookupError:
+            pass
+    return "utf-8"
+
+
+async def fetch_page(session, url, use_store=True, keep_body=False, timer=None,
+                     text_limit=html_parsing.PREVIEW_LENGTH):
+    """
+    Streams a page in chunks, revalidating it with If-None-Match/If-Modified-Since
+    when the fetch store already holds a copy. The request goes through the
+    politeness scheduler, which paces requests per host. With
+    SCRAPER_ARCHIVE_MODE=record the response is also written to the fetch
+    archive; with "replay" it is served from the archive and the network is
+    never used.
+
+    The content type is checked before any of the body is read, the body is
+    cut at MAX_BODY_BYTES, and each chunk goes straight to the preview
+    extractor, the hash and the compressed copy for the store, so the page
+    is only held in memory as a whole when `keep_body` is set.
+        Arguments:
+        - session (ClientSession): session to fetch with
+        - url (str): url to fetch
+        - use_store (bool): revalidate against and update the fetch store
+        - keep_body (bool): return the decoded body, e.g. for schema extraction
+        - timer (ScrapeTimer): optional timer for the network, download and parse stages
+        - text_limit (int): characters of visible text to extract, at least the preview
+        Return:
+        - page (FetchedPage): `preview` is the start of `text`
+    """
+    timer = timer if timer is not None else ScrapeTimer()
+    store = fetch_store.get_store() if use_store else None
+    record = await _off_loop(store.get, url) if store is not None else None
+    archive = fetch_archive.get_archive()
+    # The archive holds whole responses, so it is not revalidated against
+    headers = fetch_store.FetchStore.conditional_headers(record) if archive is None else {}
+
+    if archive is not None and archive.replaying:
+        archived = await _off_loop(archive.get, url)
+        if archived is None:
+            raise FetchError(f"{url} is not in the fetch archive")
+        timer.status = archived.status
+        response = fetch_archive.ArchivedResponse(archived)
+    else:
+        # Requests wait for their host's rate limit and back off on 429/503
+        response = await politeness.get_scheduler().get(
+            session, url, timer=timer, headers=headers, trace_request_ctx=timer
+        )
+        if archive is not None:
+            response = archive.recorder(url, response)
+    async with response:
+        if response.status in politeness.RETRY_STATUSES:
+            raise FetchError(f"The site is throttling requests (HTTP {response.status}), try again later")
+        if response.status == 304 and record is not None:
+            await _off_loop(store.touch, url)
+            timer.cache = "revalidated"
+            # Decompressed on access
+            body = await _off_loop(getattr, record, "body")
+            with timer.stage("parse"):
+                title, text = html_parsing.extract_preview(html_parsing.iter_chunks(body), text_limit)
+            return FetchedPage(
+                body if keep_body else None, record.body_hash, len(body),
+                title, text[:html_parsing.PREVIEW_LENGTH], record.parsed, False, text
+            )
+
+        declared_type = "Content-Type" in response.headers
+        if declared_type and response.content_type not in HTML_CONTENT_TYPES:
+            raise FetchError(f"Unsupported content type: {response.content_type}")
+
+        extractor = html_parsing.PreviewExtractor(text_limit)
+        hasher = hashlib.sha256()
+        compressor = zlib.compressobj() if store is not None else None
+        compressed = []
+        body_parts = [] if keep_body else None
+        decoder = None
+        length = 0
+        truncated = False
+        parse_time = 0.0
+        download_start = time.perf_counter()
+
+        async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+            if decoder is None:
+                if not declared_type and chunk.lstrip(b"\xef\xbb\xbf \t\r\n")[:1] != b"<":
+                    raise FetchError("Response does not look like HTML")
+                decoder = codecs.getincrementaldecoder(_sniff_charset(response, chunk))("replace")
+            if length + len(chunk) > MAX_BODY_BYTES:
+                chunk = chunk[:MAX_BODY_BYTES - length]
+                truncated = True
+            length += len(chunk)
+
+            text = decoder.decode(chunk)
+            # Hash and store the UTF-8 form so it matches content_hash(body)
+            data = text.encode("utf-8")
+            hasher.update(data)
+            if compressor is not None:
+                compressed.append(compressor.compress(data))
+            if body_parts is not None:
+                body_parts.append(text)
+            parse_start = time.perf_counter()
+            extractor.feed(text)
+            parse_time += time.perf_counter() - parse_start
+
+            if truncated:
+                break
+
+        # The preview extraction runs inline, keep it out of the download stage
+        timer.add("download", time.perf_counter() - download_start - parse_time)
+        timer.add("parse", parse_time)
+
+        status = response.status
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+
+    if decoder is not None:
+        tail = decoder.decode(b"", final=True)
+        data = tail.encode("utf-8")
+        hasher.update(data)
+        if compressor is not None:
+            compressed.append(compressor.compress(data))
+        if body_parts is not None:
+            body_parts.append(tail)
+        extractor.feed(tail)
+    extractor.close()
+    timer.bytes = length
+
+    body_hash = hasher.hexdigest()
+    parsed = {}
+    # Truncated bodies are not worth revalidating against
+    if compressor is not None and status == 200 and not truncated:
+        compressed.append(compressor.flush())
+        record = await _off_loop(
+            store.save, url, b"".join(compressed), body_hash,
+            etag=etag, last_modified=last_modified
+        )
+        parsed = record.parsed
+
+    return FetchedPage(
+        "".join(body_parts) if body_parts is not None else None,
+        body_hash, length, extractor.title, extractor.text[:html_parsing.PREVIEW_LENGTH],
+        parsed, truncated, extractor.text
+    )
+
+
+def load_page(url, use_store=True):
+    """
+    Fetches a page with its body from synchronous code, over the shared session.
+        Arguments:
+        - url (str): url to fetch
+        - use_store (bool): revalidate against and update the fetch store
+        Return:
+        - page (FetchedPage)
+    """
+    async def fetch():
+        session = await http_session.get_session()
+        return await fetch_page(session, url, use_store=use_store, keep_body=True)
+
+    return http_session.run(fetch())
+
+
+def extract_schema(html, schema, timer=None):
+    """
+    Extracts the schema data from a page.
+        Arguments:
+        - html (str): page body
+        - schema (str): comma-separated list of tags or CSS selectors
+        - timer (ScrapeTimer): optional timer for the parse and extract stages
+        Return:
+        - schema_data (dict): selector -> list of element texts
+    """
+    timer = timer if timer is not None else ScrapeTimer()
+    with timer.stage("parse"):
+        document = html_parsing.parse(html)
+    # All requested tags and selectors are collected in one traversal
+    with timer.stage("extract"):
+        return document.extract([key.strip() for key in schema.split(',') if key.strip()])
+
+
+async def run_scraper_async(url, prompt, provider, api_key, api_id=None, schema=None, use_cache=True, timer=None,
+                            chunk_tokens=chunking.DEFAULT_CHUNK_TOKENS, mode="single", backups=None):
+    """
+    Scrapes a page over the shared aiohttp session and summarizes it with a provider.
+        Arguments:
+        - url (str): url to scrape
+        - prompt (str): prompt
+        - provider (str): name of the AI provider
+        - api_key (str): provider API key
+        - api_id (str): application ID, only used by Aylien
+        - schema (str): optional comma-separated list of tags to extract
+        - use_cache (bool): use the result cache and the fetch store
+        - timer (ScrapeTimer): optional timer filled with the stage timings
+        - chunk_tokens (int): token budget of one provider request; longer page
+          text is split into chunks that are sent concurrently, unless one of
+          the providers fetches the page itself, then all get the preview
+        - mode (str): "single" uses `provider` only; "fastest" or "hedged"
+          also send each chunk to the `backups` and keep the first answer,
+          see `providers.race_providers`
+        - backups (dict): backup provider name -> (api_key, api_id), in order
+          of preference
+        Return:
+        - result (dict): scrape result, or {"error": ...} on failure
+    """
+    timer = timer if timer is not None else ScrapeTimer()
+    racers = [provider]
+    if mode in RACE_MODES and backups:
+        racers += [name for name in backups if name != provider]
+    credentials = {**(backups or {}), provider: (api_key, api_id)}
+    # Raced results may come from any of the providers, so they are cached apart
+    cache_provider = provider if len(racers) == 1 else f"{mode}:{','.join(racers)}"
+
+    cache = result_cache.get_cache() if use_cache else None
+    timer.cache = "miss" if cache is not None else "bypass"
+    if cache is not None:
+        cached = await _off_loop(cache.get, result_cache.make_key(url, prompt, schema, cache_provider))
+        if cached is not None:
+            timer.cache = "hit"
+            return cached
+
+    session = await http_session.get_session()
+    try:
+        # Providers that read the page text get as much of it as the chunks
+        # can hold. Providers that fetch the page themselves cannot answer
+        # for a chunk, so when one of them takes part all get the preview
+        text_limit = html_parsing.PREVIEW_LENGTH
+        chunked = not any(name in URL_PROVIDERS for name in racers)
+        if chunked:
+            text_limit = max(text_limit, chunking.text_limit(chunk_tokens))
+        page = await fetch_page(
+            session, url, use_store=use_cache, keep_body=bool(schema), timer=timer, text_limit=text_limit
+        )
+
+        # Results keyed by page content never go stale, so an unchanged page
+        # reuses its result even after the URL entry has expired
+        page_key = result_cache.make_key(url, prompt, schema, cache_provider, page.body_hash)
+        if cache is not None:
+            cached = await _off_loop(cache.get, page_key)
+            if cached is not None:
+                timer.cache = "page_hit"
+                await _off_loop(cache.put, result_cache.make_key(url, prompt, schema, cache_provider), cached)
+                return cached
+
+        # Reuse the parse results of an unchanged body
+        parsed = page.parsed.get(schema or "")
+        if parsed is None:
+            parsed = {
+                "title": page.title or "No title",
+                "schema_data": extract_schema(page.body, schema, timer) if schema else {},
+                "length": page.length,
+                "preview": page.preview
+            }
+            if use_cache:
+                await _off_loop(fetch_store.get_store().save_parsed, url, schema, parsed)
+
+        # Basic local scraping
+        result = {"provider": provider, "prompt": prompt, **parsed}
+        chunks = [page.preview]
+        truncated = page.truncated
+        if chunked:
+            chunks = chunking.split_text(page.text, chunk_tokens) or [page.preview]
+            truncated = truncated or len(page.text) >= text_limit or len(chunks) > chunking.MAX_CHUNKS
+            chunks = chunks[:chunking.MAX_CHUNKS]
+        if truncated:
+            result["truncated"] = True
+
+        # Send the page text to the selected provider API, all chunks at once
+        with timer.stage("provider"):
+            if len(racers) == 1:
+                api_results = await chunking.map_chunks(
+                    chunks,
+                    lambda chunk: call_provider(racers[0], chunk, url, *credentials[racers[0]], session=session, timer=timer)
+                )
+            else:
+                answers = await chunking.map_chunks(
+                    chunks,
+                    lambda chunk: race_providers(racers, chunk, url, credentials, mode, session=session, timer=timer)
+                )
+                api_results = [answer for _, answer in answers]
+                result["provider"] = ", ".join(sorted({name for name, _ in answers}))
+        result["api_result"] = chunking.merge_results(api_results)
+        if len(chunks) > 1:
+            result["chunks"] = len(chunks)
+
+        if cache is not None:
+            await _off_loop(cache.put, result_cache.make_key(url, prompt, schema, cache_provider), result)
+            await _off_loop(cache.put, page_key, result, ttl=None)
+        return result
+
+    except Exception as e:
+        return {"error": str(e)}
@@ -1,6 +1,8 @@
-from scrapegraphai.graphs import SmartScraperGraph
+import result_cache
+import fetch_archive
 
-def task(key:str, url:str, prompt:str, model:str, base_url=None):
+
+def task(key:str, url:str, prompt:str, model:str, base_url=None, use_cache=True, model_tokens=None):
     """ 
     Task that execute the scraping:
         Arguments:
@@ -8,36 +10,51 @@ def task(key:str, url:str, prompt:str, model:str, base_url=None):
         - url (str): url to scrape 
         - prompt (str): prompt
         - model (str): name of the model
+        - base_url (str): optional OpenAI-compatible API base
+        - use_cache (bool): serve and store results in the result cache
+        - model_tokens (int): optional token budget per chunk of the page,
+          the model's context size from models_tokens by default
         Return:
         - results_df["output"] (dict): result as a dictionary
         - results_df (pd.Dataframe()): result as padnas df
     """ 
-    if base_url is not None:
-        graph_config = {
-            "llm": {
-                "api_key": key,
-                "model": model,
-            },
-        }
-    else: 
-        graph_config = {
+    cache = result_cache.get_cache() if use_cache else None
+    cache_key = result_cache.make_key(url, prompt, provider=f"{model}@{base_url or 'openai'}")
+    if cache is not None:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    graph_config = {
         "llm": {
             "api_key": key,
             "model": model,
-            "openai_api_base": base_url,
         },
-}
+    }
+    if base_url is not None:
+        graph_config["llm"]["openai_api_base"] = base_url
+
+    # The graph downloads URLs with its own loader, past the fetch archive, so
+    # while archiving it is given the page as recorded or replayed instead
+    source = url
+    if url.startswith("http") and fetch_archive.get_archive() is not None:
+        from scraper import load_page
+        source = load_page(url).body
 
     # ************************************************
-    # Create the SmartScraperGraph instance and run it
+    # Borrow a SmartScraperGraph for this config and run it
     # ************************************************
 
-    smart_scraper_graph = SmartScraperGraph(
-        prompt=prompt,
-        # also accepts a string with the already downloaded HTML code
-        source=url,
-        config=graph_config
-    )
+    # scrapegraphai is only loaded when a graph actually runs
+    from scrapegraphai.graphs import SmartScraperGraph
+    from graph_pool import get_graph_pool
 
-    result = smart_scraper_graph.run()
+    # also accepts a string with the already downloaded HTML code as source
+    # Pages over the budget are split into chunks the graph answers in parallel and merges
+    with get_graph_pool().checkout(
+        SmartScraperGraph, prompt, source, graph_config, model_tokens=model_tokens
+    ) as smart_scraper_graph:
+        result = smart_scraper_graph.run()
+    if cache is not None and result:
+        cache.put(cache_key, result)
     return result
\ No newline at end of file
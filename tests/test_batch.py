@@ -0,0 +1,30 @@
+import json
+
+import pytest
+
+from batch import parse_jobs
+
+
+def test_invalid_lines_are_reported_with_their_numbers_and_skipped():
+    lines = [
+        "https://example.com/a",
+        json.dumps({"request_id": "user-001", "title": "No URL", "body": "..."}),
+        '{"url": "https://example.com/b", ',
+        "not a url",
+        "",
+        json.dumps({"request_id": "7", "url": "https://example.com/c", "prompt": "Own prompt"}),
+        "[1, 2]"
+    ]
+    errors = []
+    jobs = list(parse_jobs(lines, prompt="Default", provider="DeepAI", errors=errors))
+
+    assert [(job["request_id"], job["url"], job["prompt"]) for job in jobs] == [
+        ("1", "https://example.com/a", "Default"),
+        ("7", "https://example.com/c", "Own prompt")
+    ]
+    assert [error.split(":")[0] for error in errors] == ["line 2", "line 3", "line 4", "line 7"]
+
+
+def test_invalid_line_raises_without_an_error_list():
+    with pytest.raises(ValueError, match="line 1: no \"url\""):
+        list(parse_jobs([json.dumps({"title": "No URL"})]))
@@ -0,0 +1,35 @@
+import chunking
+import html_parsing
+
+
+def test_split_text_breaks_between_sentences_of_extracted_text():
+    html = "<h1>Title</h1>" + "".join(f"<p>Sentence number {i} is here.</p>" for i in range(40))
+    _, text = html_parsing.extract_preview([html], 100000)
+
+    chunks = chunking.split_text(text, 30)
+    assert len(chunks) > 1
+    for chunk in chunks[1:]:
+        assert chunk.startswith("Sentence number ")
+    for chunk in chunks[:-1]:
+        assert chunk.endswith("is here.")
+
+
+def test_split_text_keeps_abbreviations_whole():
+    chunks = chunking.split_text("Some fruit, e.g. apples and pears. Nothing else.", 12)
+    assert chunks == ["Some fruit, e.g. apples and pears.", "Nothing else."]
+
+
+def test_merge_results_merges_per_key():
+    merged = chunking.merge_results([
+        {"id": "a1b2", "output": "First part of the summary.", "status": {"code": "0"}, "time": 0.2,
+         "entities": [{"id": 1}]},
+        {"id": "c3d4", "output": "Second part of the summary.", "status": {"code": "0"}, "time": 0.3,
+         "entities": [{"id": 2}]}
+    ])
+    assert merged == {
+        "id": "a1b2",
+        "output": "First part of the summary.\nSecond part of the summary.",
+        "status": {"code": "0"},
+        "time": 0.2,
+        "entities": [{"id": 1}, {"id": 2}]
+    }
@@ -0,0 +1,16 @@
+import fetch_archive
+
+
+def test_replayed_headers_are_case_insensitive(tmp_path):
+    archive = fetch_archive.FetchArchive(str(tmp_path), mode="record")
+    archive.put(
+        "http://example.com/", 200, "OK",
+        [("content-type", "text/html; charset=windows-1251"), ("etag", '"abc"')], "Привет".encode("cp1251")
+    )
+
+    replay = fetch_archive.FetchArchive(str(tmp_path), mode="replay")
+    response = fetch_archive.ArchivedResponse(replay.get("http://example.com/"))
+    assert "Content-Type" in response.headers
+    assert response.headers.get("ETag") == '"abc"'
+    assert response.content_type == "text/html"
+    assert response.charset == "windows-1251"
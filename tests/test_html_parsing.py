@@ -0,0 +1,14 @@
+import pytest
+
+import html_parsing
+
+
+def test_lxml_backend_needs_cssselect(monkeypatch):
+    monkeypatch.setenv("SCRAPER_HTML_BACKEND", "lxml")
+    if "lxml" in html_parsing.AVAILABLE_BACKENDS:
+        assert html_parsing.default_backend() == "lxml"
+        document = html_parsing.parse("<div><p>one</p><span><p>two</p></span></div>")
+        assert document.extract(["div > p"]) == {"div > p": ["one"]}
+    else:
+        with pytest.raises(ValueError, match="cssselect"):
+            html_parsing.default_backend()
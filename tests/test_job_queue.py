@@ -0,0 +1,92 @@
+import time
+import sqlite3
+import threading
+
+import job_queue
+import result_store
+
+
+def test_finished_jobs_keep_only_their_run_id(tmp_path, monkeypatch):
+    monkeypatch.setattr(result_store, "_store", result_store.ResultStore(str(tmp_path / "results.db")))
+    monkeypatch.setitem(job_queue.JOB_HANDLERS, "echo", lambda job, report: {"answer": job["payload"]["text"]})
+    path = str(tmp_path / "queue.db")
+    queue = job_queue.JobQueue(path)
+    job_id = queue.submit("echo", {"text": "hello"})
+
+    stop = threading.Event()
+    worker = threading.Thread(target=job_queue.worker_loop, args=(path, "test-worker", stop))
+    worker.start()
+    try:
+        deadline = time.monotonic() + 5
+        while queue.get(job_id)["status"] not in job_queue.FINISHED and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        stop.set()
+        worker.join()
+
+    job = queue.get(job_id)
+    assert job["status"] == "done"
+    assert job["result"] == {"answer": "hello"}
+    row = sqlite3.connect(path).execute("SELECT result, run_id FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    assert row == (None, job_id)
+
+
+def test_old_finished_jobs_are_dropped(tmp_path):
+    path = str(tmp_path / "queue.db")
+    queue = job_queue.JobQueue(path)
+    old = queue.submit("scrape", {})
+    recent = queue.submit("scrape", {})
+    queue.finish(old, error="failed")
+    queue.finish(recent, error="failed")
+    queue._conn.execute("UPDATE jobs SET finished = ? WHERE id = ?", (time.time() - 8 * 86400, old))
+    queue._conn.commit()
+
+    queue = job_queue.JobQueue(path, retention_days=7)
+    assert queue.get(old) is None
+    assert queue.get(recent)["status"] == "failed"
+
+
+class MemoryPool:
+    """Stands in for the app's worker pool, holding handed-over secrets in a dict."""
+
+    name = "test-pool"
+
+    def __init__(self):
+        self.secrets = {}
+
+    def running(self):
+        return True
+
+    def hand_over(self, job_id, secrets):
+        self.secrets[job_id] = secrets
+
+
+def test_secrets_reach_the_pool_without_touching_the_database(tmp_path, monkeypatch):
+    monkeypatch.setattr(result_store, "_store", result_store.ResultStore(str(tmp_path / "results.db")))
+    monkeypatch.setitem(job_queue.JOB_HANDLERS, "echo", lambda job, report: job["secrets"])
+    path = str(tmp_path / "queue.db")
+    queue = job_queue.JobQueue(path)
+    queue.pool = MemoryPool()
+    job_id = queue.submit("echo", {}, secrets={"api_key": "sk-very-secret"})
+
+    # Workers outside the pool leave the job alone
+    assert queue.claim("outsider") is None
+
+    stop = threading.Event()
+    worker = threading.Thread(
+        target=job_queue.worker_loop, args=(path, "pool-worker", stop),
+        kwargs={"pool": "test-pool", "secrets": queue.pool.secrets}
+    )
+    worker.start()
+    try:
+        deadline = time.monotonic() + 5
+        while queue.get(job_id)["status"] not in job_queue.FINISHED and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        stop.set()
+        worker.join()
+
+    assert queue.get(job_id)["result"] == {"api_key": "sk-very-secret"}
+    assert queue.pool.secrets == {}
+    queue._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    assert b"sk-very-secret" not in (tmp_path / "queue.db").read_bytes()
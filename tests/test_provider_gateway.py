@@ -0,0 +1,71 @@
+import time
+import asyncio
+
+import pytest
+
+from provider_gateway import ProviderGateway, CircuitOpenError
+
+
+def half_open_gateway(reset_timeout=0.05):
+    """A gateway whose circuit is open and due for its trial call."""
+    gateway = ProviderGateway("Test", qps=1000, retries=0)
+    gateway.breaker.reset_timeout = reset_timeout
+    gateway.breaker.state = "open"
+    gateway.breaker.opened = time.monotonic() - reset_timeout
+    return gateway
+
+
+async def answer(remaining):
+    return "answer"
+
+
+async def hang(remaining):
+    await asyncio.sleep(3600)
+
+
+def test_cancelled_probe_reopens_the_circuit():
+    gateway = half_open_gateway()
+
+    async def scenario():
+        probe = asyncio.ensure_future(gateway.call(hang))
+        await asyncio.sleep(0.01)
+        assert gateway.breaker.state == "half_open"
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+        assert gateway.breaker.state == "open"
+
+        # Rejected until the next cooldown, then probed again
+        with pytest.raises(CircuitOpenError):
+            await gateway.call(answer)
+        await asyncio.sleep(gateway.breaker.reset_timeout)
+        return await gateway.call(answer)
+
+    assert asyncio.run(scenario()) == "answer"
+    assert gateway.breaker.state == "closed"
+
+
+def test_interrupted_sync_probe_reopens_the_circuit():
+    gateway = half_open_gateway()
+
+    def interrupt(timeout):
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        gateway.call_sync(interrupt)
+    assert gateway.breaker.state == "open"
+
+
+def test_failed_probe_reopens_and_successful_probe_closes():
+    gateway = half_open_gateway()
+
+    async def fail(remaining):
+        raise ConnectionError("down")
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(gateway.call(fail))
+    assert gateway.breaker.state == "open"
+
+    time.sleep(gateway.breaker.reset_timeout)
+    assert asyncio.run(gateway.call(answer)) == "answer"
+    assert gateway.breaker.state == "closed"
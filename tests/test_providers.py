@@ -0,0 +1,41 @@
+import time
+import asyncio
+
+import providers
+import provider_gateway
+
+
+def test_half_open_backup_losing_a_race_is_probed_again(monkeypatch):
+    gateways = {
+        "Primary": provider_gateway.ProviderGateway("Primary", qps=1000, retries=0),
+        "Backup": provider_gateway.ProviderGateway("Backup", qps=1000, retries=0)
+    }
+    backup = gateways["Backup"].breaker
+    backup.reset_timeout = 0.05
+    backup.state = "open"
+    backup.opened = time.monotonic() - backup.reset_timeout
+    monkeypatch.setattr(provider_gateway, "get_gateway", gateways.__getitem__)
+
+    delays = {"Primary": 0.01, "Backup": 3600}
+
+    async def call_provider(provider, text, url, api_key, api_id=None, session=None, timer=None):
+        async def send(remaining):
+            await asyncio.sleep(delays[provider])
+            return {"output": provider}
+        return await gateways[provider].call(send)
+
+    monkeypatch.setattr(providers, "call_provider", call_provider)
+    credentials = {"Primary": ("key", None), "Backup": ("key", None)}
+
+    async def scenario():
+        winner = await providers.race_providers(["Primary", "Backup"], "text", "url", credentials, mode="fastest")
+        assert winner == ("Primary", {"output": "Primary"})
+        # The backup's trial call was cancelled: its circuit is open, not stuck half-open
+        assert backup.state == "open"
+
+        await asyncio.sleep(backup.reset_timeout)
+        delays["Backup"] = 0
+        return await call_provider("Backup", "text", "url", "key")
+
+    assert asyncio.run(scenario()) == {"output": "Backup"}
+    assert backup.state == "closed"
@@ -0,0 +1,14 @@
+from result_cache import ResultCache
+
+
+def test_hits_and_misses_are_shared_between_instances(tmp_path):
+    # Each process, e.g. a queue worker and the Streamlit app, has its own instance
+    path = str(tmp_path / "results.db")
+    worker, app = ResultCache(path), ResultCache(path)
+
+    assert worker.get("key") is None
+    worker.put("key", {"answer": 42})
+    assert worker.get("key") == {"answer": 42}
+
+    stats = app.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
@@ -0,0 +1,36 @@
+import asyncio
+
+import scraper
+import providers
+
+
+def test_race_with_a_url_provider_sends_the_preview_to_all(monkeypatch):
+    text = " ".join(f"Sentence number {i} is here." for i in range(2000))
+    page = scraper.FetchedPage(None, "hash", len(text), "Title", text[:1000], {}, False, text)
+
+    async def fetch_page(session, url, **kwargs):
+        return page
+
+    calls = []
+
+    async def call_provider(provider, text, url, api_key, api_id=None, session=None, timer=None):
+        calls.append((provider, text))
+        await asyncio.sleep(0.01 if provider == "Diffbot" else 0.05)
+        return {"output": provider}
+
+    async def get_session():
+        return None
+
+    monkeypatch.setattr(scraper, "fetch_page", fetch_page)
+    monkeypatch.setattr(scraper.http_session, "get_session", get_session)
+    monkeypatch.setattr(providers, "call_provider", call_provider)
+
+    result = asyncio.run(scraper.run_scraper_async(
+        "http://example.com/", "Summarize", "Diffbot", "key", use_cache=False,
+        mode="fastest", backups={"DeepAI": ("key", None)}
+    ))
+    assert {provider for provider, _ in calls} == {"Diffbot", "DeepAI"}
+    assert all(sent == page.preview for _, sent in calls)
+    assert result["provider"] == "Diffbot"
+    assert result["api_result"] == {"output": "Diffbot"}
+    assert "chunks" not in result
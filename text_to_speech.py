@@ -1,20 +1,140 @@
-from scrapegraphai.graphs import SpeechGraph
+import os
+import uuid
+import shutil
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 
-def text_to_speech(api_key: str, prompt: str, url: str):
-    """Reads text after the prompt from a given URL.
+import chunking
+from audio_cache import get_audio_cache, make_key
+
+# Speech settings, overridable from the environment
+TTS_MODEL = os.environ.get("SCRAPER_TTS_MODEL", "tts-1")
+TTS_VOICE = os.environ.get("SCRAPER_TTS_VOICE", "alloy")
+ANSWER_MODEL = os.environ.get("SCRAPER_TTS_ANSWER_MODEL", "gpt-4o-mini")
+# The answer is read out in segments of this many tokens, synthesized a few
+# at a time, so the first one plays while the rest are still synthesized
+SEGMENT_TOKENS = 80
+SYNTHESIS_CONCURRENCY = 3
+AUDIO_CHUNK_BYTES = 16 * 1024
+# Each run synthesizes into its own directory under this one, where the
+# answer and the finished segments can be read while it is still running
+RUNS_DIR = os.path.join("cache", "audio_runs")
+ANSWER_FILE = "answer.txt"
+
+
+def _load_page(url):
+    """Returns the HTML of `url` and the hash of its content, through the fetch store."""
+    if not url.startswith("http"):
+        return url, hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    from scraper import load_page
+    page = load_page(url)
+    return page.body, page.body_hash
+
+
+def _answer_text(answer):
+    """The text to read out of a graph answer such as {"content": "..."}."""
+    if isinstance(answer, dict) and len(answer) == 1:
+        answer = next(iter(answer.values()))
+    return answer if isinstance(answer, str) else str(answer)
+
+
+def _synthesize(client, text, path, model, voice):
+    """Streams the speech of `text` into an MP3 file and returns its path."""
+    partial = path + ".part"
+    with client.audio.speech.with_streaming_response.create(
+        model=model, voice=voice, input=text, response_format="mp3"
+    ) as response:
+        with open(partial, "wb") as f:
+            for chunk in response.iter_bytes(AUDIO_CHUNK_BYTES):
+                f.write(chunk)
+    # Readers of the run directory only ever see whole segments
+    os.replace(partial, path)
+    return path
+
+
+def read_run(run_id):
+    """
+    Returns what a running synthesis has produced so far: the answer text,
+    or None before it is known, and the paths of the segments that are
+    ready, in order. Both disappear once the run has finished.
+    """
+    run_dir = os.path.join(RUNS_DIR, run_id)
+    try:
+        with open(os.path.join(run_dir, ANSWER_FILE), encoding="utf-8") as f:
+            answer = f.read()
+    except OSError:
+        return None, []
+    segments = []
+    while os.path.exists(os.path.join(run_dir, f"segment_{len(segments):03d}.mp3")):
+        segments.append(os.path.join(run_dir, f"segment_{len(segments):03d}.mp3"))
+    return answer, segments
+
+
+def text_to_speech(api_key: str, prompt: str, url: str, voice=TTS_VOICE, model=TTS_MODEL,
+                   answer_model=ANSWER_MODEL, base_url=None, on_answer=None, on_segment=None, run_id=None):
+    """Reads out the answer to the prompt about a given URL.
+
+    Speeches are cached by page content, prompt, voice and models, so an
+    unchanged page is neither answered nor synthesized again.
 
     Args:
         - api_key (str): OpenAI API key
         - prompt (str): Prompt to use
         - url (str): URL to scrape
+        - voice (str): TTS voice
+        - model (str): TTS model
+        - answer_model (str): model answering the prompt
+        - base_url (str): optional OpenAI-compatible API base
+        - on_answer (callable): called with the answer text once it is known
+        - on_segment (callable): called with the path and number of each
+          audio segment, in order, as soon as it is synthesized
+        - run_id (str): name of the run directory, see `read_run`; a
+          random one by default
     Returns:
-        - str: Path to the generated audio file
+        - dict: "answer" text, "audio" path of the whole MP3 file and
+          whether it was "cached"
     """
-    llm_config = {"api_key": api_key}
-    
-    # Define the name of the audio file
-    audio_file = "audio_result.mp3"
-
-    # Create and run the speech summary graph
-    speech_summary_graph = SpeechGraph(prompt, url, llm_config, audio_file)
-    return speech_summary_graph.run()
\ No newline at end of file
+    page, content_hash = _load_page(url)
+    cache = get_audio_cache()
+    key = make_key(content_hash, prompt, voice, model, answer_model)
+    cached = cache.get(key)
+    if cached is not None:
+        audio, answer = cached
+        if on_answer is not None:
+            on_answer(answer)
+        return {"answer": answer, "audio": audio, "cached": True}
+
+    # The page was already downloaded, so the graph reads its HTML
+    from task import task
+    answer = _answer_text(task(api_key, page, prompt, answer_model, base_url=base_url, use_cache=False))
+    if on_answer is not None:
+        on_answer(answer)
+
+    # openai is only loaded when speech is actually synthesized
+    from openai import OpenAI
+    client = OpenAI(api_key=api_key, base_url=base_url)
+
+    run_dir = os.path.join(RUNS_DIR, run_id or uuid.uuid4().hex)
+    os.makedirs(run_dir)
+    try:
+        with open(os.path.join(run_dir, ANSWER_FILE), "w", encoding="utf-8") as f:
+            f.write(answer)
+        segments = chunking.split_text(answer, SEGMENT_TOKENS) or [answer]
+        audio = os.path.join(run_dir, "speech.mp3")
+        with ThreadPoolExecutor(SYNTHESIS_CONCURRENCY) as executor, open(audio, "wb") as whole:
+            futures = [
+                executor.submit(_synthesize, client, text, os.path.join(run_dir, f"segment_{number:03d}.mp3"), model, voice)
+                for number, text in enumerate(segments)
+            ]
+            # MP3 frames concatenate, so the whole file is the segments end to end
+            for number, future in enumerate(futures):
+                path = future.result()
+                if on_segment is not None:
+                    on_segment(path, number)
+                with open(path, "rb") as segment:
+                    shutil.copyfileobj(segment, whole)
+        audio = cache.put(key, audio, answer)
+    finally:
+        shutil.rmtree(run_dir, ignore_errors=True)
+    return {"answer": answer, "audio": audio, "cached": False}
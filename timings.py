@@ -0,0 +1,159 @@
+import time
+import statistics
+from contextlib import contextmanager
+
+# Stages of a scrape, in pipeline order
+STAGES = ["wait", "dns", "connect", "ttfb", "download", "parse", "extract", "provider", "serialize", "log_write"]
+
+
+class ScrapeTimer:
+    """
+    Per-stage timings of one scrape, plus the byte count, status codes and
+    cache outcome. Network stages are filled in by the aiohttp trace hooks
+    of `trace_config()` when the timer is passed as `trace_request_ctx`.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.bytes = None
+        self.status = None
+        self.provider_status = None
+        self.cache = None
+        self._marks = {}
+
+    def add(self, stage, seconds):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, name):
+        """Times the enclosed block as `name`."""
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start_time)
+
+    def mark(self, name):
+        self._marks[name] = time.perf_counter()
+
+    def since(self, name):
+        """Seconds since a mark, or None if it was never set."""
+        if name not in self._marks:
+            return None
+        return time.perf_counter() - self._marks[name]
+
+    def as_dict(self):
+        """Stage timings in milliseconds, in pipeline order."""
+        return {
+            stage: round(self.stages[stage] * 1000, 2)
+            for stage in STAGES if stage in self.stages
+        }
+
+
+def _timer(trace_config_ctx):
+    timer = trace_config_ctx.trace_request_ctx
+    return timer if isinstance(timer, ScrapeTimer) else None
+
+
+async def _on_request_start(session, ctx, params):
+    timer = _timer(ctx)
+    if timer is not None:
+        timer.mark("request")
+        timer.mark("ready")
+
+
+async def _on_dns_start(session, ctx, params):
+    timer = _timer(ctx)
+    if timer is not None:
+        timer.mark("dns")
+
+
+async def _on_dns_end(session, ctx, params):
+    timer = _timer(ctx)
+    if timer is not None and timer.since("dns") is not None:
+        timer.add("dns", timer.since("dns"))
+
+
+async def _on_connection_start(session, ctx, params):
+    timer = _timer(ctx)
+    if timer is not None:
+        timer.mark("connect")
+
+
+async def _on_connection_end(session, ctx, params):
+    timer = _timer(ctx)
+    if timer is not None and timer.since("connect") is not None:
+        # Includes the DNS lookup and TLS handshake of a new connection
+        timer.add("connect", timer.since("connect"))
+        timer.mark("ready")
+
+
+async def _on_connection_reused(session, ctx, params):
+    timer = _timer(ctx)
+    if timer is not None:
+        timer.mark("ready")
+
+
+async def _on_request_end(session, ctx, params):
+    # Fired once the response headers are in
+    timer = _timer(ctx)
+    if timer is not None:
+        timer.add("ttfb", timer.since("ready"))
+        timer.status = params.response.status
+
+
+def trace_config():
+    """Returns the aiohttp TraceConfig that feeds ScrapeTimer network stages."""
+    # Imported here so the UI can use the timers without loading aiohttp
+    from aiohttp import TraceConfig
+    config = TraceConfig()
+    config.on_request_start.append(_on_request_start)
+    config.on_dns_resolvehost_start.append(_on_dns_start)
+    config.on_dns_resolvehost_end.append(_on_dns_end)
+    config.on_connection_create_start.append(_on_connection_start)
+    config.on_connection_create_end.append(_on_connection_end)
+    config.on_connection_reuseconn.append(_on_connection_reused)
+    config.on_request_end.append(_on_request_end)
+    return config
+
+
+def percentiles(values):
+    """Returns the p50, p95 and p99 of a list of numbers."""
+    if not values:
+        return None, None, None
+    if len(values) == 1:
+        return values[0], values[0], values[0]
+    cuts = statistics.quantiles(values, n=100, method="inclusive")
+    return cuts[49], cuts[94], cuts[98]
+
+
+def latency_table(rows, group_by, stage=None):
+    """
+    Summarizes latencies per group for the Streamlit panel.
+        Arguments:
+        - rows (list of dict): log rows with `duration` and `timings`
+        - group_by (str): row field to group on, e.g. "provider" or "domain"
+        - stage (str): a stage name, or None for the total duration
+        Return:
+        - table (list of dict): one row per group with count and percentiles in ms
+    """
+    groups = {}
+    for row in rows:
+        if stage is None:
+            value = row["duration"] * 1000 if row["duration"] is not None else None
+        else:
+            value = (row["timings"] or {}).get(stage)
+        if value is not None:
+            groups.setdefault(row[group_by] or "unknown", []).append(value)
+
+    table = []
+    for group, values in sorted(groups.items()):
+        p50, p95, p99 = percentiles(values)
+        table.append({
+            group_by: group,
+            "count": len(values),
+            "p50 (ms)": round(p50, 1),
+            "p95 (ms)": round(p95, 1),
+            "p99 (ms)": round(p99, 1)
+        })
+    return table